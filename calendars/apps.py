@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CalendarsConfig(AppConfig):
     name = 'calendars'
+
+    def ready(self):
+        import calendars.signals
@@ -70,8 +70,8 @@ class CalendarMeetingSerializer(CalendarSerializer):
 
     class Meta:
         model = Meeting
-        fields = ('id', 'type', 'topic', 'date', 'start_time', 'end_time', 'creator', 'members', 'full_start_time',
-                  'full_end_time', 'is_past', 'time')
+        fields = ('id', 'type', 'topic', 'date', 'start_time', 'end_time', 'recurrence', 'creator', 'members',
+                  'full_start_time', 'full_end_time', 'is_past', 'time')
         read_only_fields = fields
 
     def get_type(self, obj):
@@ -1,17 +1,82 @@
+import heapq
+import time
 from datetime import datetime, timedelta
+from operator import itemgetter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Q
+from rest_framework.utils.encoders import JSONEncoder
+
+from final_project.metrics import incr
 
 from tasks.models import Task
 from meetings.models import Meeting
+from meetings.services import MeetingService
 from .serializers import CalendarTaskSerializer, CalendarMeetingSerializer
 
 
 class CalendarService:
     @staticmethod
-    def get_calendar_data(user, date_str=None, start_str=None, end_str=None):
+    def _version_key(user_id):
+        return f'calendar:version:{user_id}'
+
+    @staticmethod
+    def _set_is_past(data):
         """
-        Возвращает данные календаря за день или диапазон дат
+        Проставляет признак is_past событиям на момент ответа
+        """
+        now = timezone.now()
+        for event in data['events']:
+            event['is_past'] = event.get('full_end_time', event['time']) < now
+        return data
+
+    @staticmethod
+    def get_cached_calendar_data(user, date_str=None, start_str=None, end_str=None):
+        """
+        Возвращает данные календаря из кэша или вычисляет и кэширует их.
+        Признак is_past зависит от текущего времени и не кэшируется
+        """
+        if not settings.SHARED_CACHE:
+            return CalendarService.get_calendar_data(user, date_str=date_str, start_str=start_str, end_str=end_str)
+        version_key = CalendarService._version_key(user.pk)
+        version = cache.get(version_key)
+        if version is None:
+            version = time.time_ns()
+            cache.set(version_key, version, timeout=None)
+        key = f'calendar:{user.pk}:{version}:{date_str}:{start_str}:{end_str}'
+        data = cache.get(key)
+        if data is not None:
+            incr('calendar_cache_hit')
+            return CalendarService._set_is_past(data)
+        incr('calendar_cache_miss')
+        data = CalendarService.get_calendar_data(user, date_str=date_str, start_str=start_str, end_str=end_str)
+        for event in data['events']:
+            event.pop('is_past', None)
+        cache.set(key, data, timeout=settings.CALENDAR_CACHE_TIMEOUT)
+        return CalendarService._set_is_past(data)
+
+    @staticmethod
+    def invalidate_calendars(user_ids):
+        """
+        Сброс кэша календаря пользователей сразу и после фиксации транзакции
+        """
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return
+
+        def bump_versions():
+            version = time.time_ns()
+            cache.set_many({CalendarService._version_key(user_id): version for user_id in user_ids}, timeout=None)
+
+        bump_versions()
+        transaction.on_commit(bump_versions)
+
+    @staticmethod
+    def _get_period(date_str=None, start_str=None, end_str=None):
+        """
+        Возвращает границы и подпись периода календаря
         """
         if date_str and (start_str or end_str):
             raise ValueError('Используйте либо date, либо start+end')
@@ -27,24 +92,58 @@ class CalendarService:
                 start_dt = timezone.make_aware(datetime.strptime(start_str, '%Y-%m-%d'))
                 end_dt = timezone.make_aware(datetime.strptime(end_str, '%Y-%m-%d')) + timedelta(days=1)
                 period_label = f'{start_str} - {end_str}'
-            tasks_qs = Task.objects.filter(
-                Q(assigned_to=user) | Q(created_by=user),
-                deadline__gte=start_dt,
-                deadline__lt=end_dt,
-            ).select_related('created_by', 'assigned_to', 'team').order_by('deadline')
-            meeting_qs = Meeting.objects.filter(
-                members=user,
-                date__gte=start_dt.date(),
-                date__lt=end_dt.date()
-            ).prefetch_related('members').order_by('start_time')
-            tasks_data = CalendarTaskSerializer(tasks_qs, many=True).data
-            meeting_data = CalendarMeetingSerializer(meeting_qs, many=True).data
-            events = tasks_data + meeting_data
-            events.sort(key=lambda x: x['time'])
-            return {
-                'period': period_label,
-                'count': len(events),
-                'events': events,
-            }
         except ValueError as e:
             raise ValueError(f'Неверный формат даты: {str(e)}')
+        return start_dt, end_dt, period_label
+
+    @staticmethod
+    def iter_events(user, start_dt, end_dt):
+        """
+        Возвращает события периода по возрастанию времени слиянием
+        упорядоченных выборок задач и встреч без загрузки их целиком в память
+        """
+        chunk_size = settings.CALENDAR_ITERATOR_CHUNK_SIZE
+        tasks_qs = Task.objects.filter(
+            Q(assigned_to=user) | Q(created_by=user),
+            deadline__gte=start_dt,
+            deadline__lt=end_dt,
+        ).select_related('created_by', 'assigned_to', 'team').order_by('deadline', 'id')
+        meeting_qs = Meeting.objects.filter(members=user).select_related('creator').prefetch_related('members')
+        tasks = (CalendarTaskSerializer(task).data for task in tasks_qs.iterator(chunk_size=chunk_size))
+        meetings = (
+            CalendarMeetingSerializer(meeting).data
+            for meeting in MeetingService.iter_occurrences(meeting_qs, start_dt, end_dt, chunk_size=chunk_size)
+        )
+        return heapq.merge(tasks, meetings, key=itemgetter('time'))
+
+    @staticmethod
+    def get_calendar_data(user, date_str=None, start_str=None, end_str=None):
+        """
+        Возвращает данные календаря за день или диапазон дат
+        """
+        start_dt, end_dt, period_label = CalendarService._get_period(date_str, start_str, end_str)
+        events = list(CalendarService.iter_events(user, start_dt, end_dt))
+        return {
+            'period': period_label,
+            'count': len(events),
+            'events': events,
+        }
+
+    @staticmethod
+    def stream_calendar_data(user, date_str=None, start_str=None, end_str=None):
+        """
+        Возвращает генератор JSON-фрагментов календаря для потоковой отдачи.
+        Количество событий записывается после списка событий
+        """
+        start_dt, end_dt, period_label = CalendarService._get_period(date_str, start_str, end_str)
+        encoder = JSONEncoder(ensure_ascii=False)
+
+        def generate():
+            yield f'{{"period": {encoder.encode(period_label)}, "events": ['
+            count = 0
+            for event in CalendarService.iter_events(user, start_dt, end_dt):
+                yield (', ' if count else '') + encoder.encode(event)
+                count += 1
+            yield f'], "count": {count}}}'
+
+        return generate()
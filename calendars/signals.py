@@ -0,0 +1,37 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from meetings.models import Meeting
+from tasks.models import Task
+from .services import CalendarService
+
+
+@receiver(pre_save, sender=Task)
+def remember_task_calendar_users(sender, instance, **kwargs):
+    instance._calendar_user_ids = {instance.created_by_id, getattr(instance, '_loaded_assigned_to_id', None)}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_calendars(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_calendar_user_ids', set())
+    CalendarService.invalidate_calendars(user_ids | {instance.created_by_id, instance.assigned_to_id})
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(pre_delete, sender=Meeting)
+def invalidate_meeting_calendars(sender, instance, **kwargs):
+    member_ids = set(instance.members.values_list('pk', flat=True)) if instance.pk else set()
+    CalendarService.invalidate_calendars(member_ids | {instance.creator_id})
+
+
+@receiver(m2m_changed, sender=Meeting.members.through)
+def invalidate_meeting_members_calendars(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        CalendarService.invalidate_calendars({instance.pk})
+    elif action == 'pre_clear':
+        CalendarService.invalidate_calendars(set(instance.members.values_list('pk', flat=True)))
+    else:
+        CalendarService.invalidate_calendars(pk_set)
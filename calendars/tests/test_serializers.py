@@ -64,8 +64,8 @@ class TestCalendarMeetingSerializer:
         Тест на отображение полей сериализатора встреч
         """
         serializer = CalendarMeetingSerializer(instance=self.meeting)
-        expected = {'id', 'type', 'topic', 'date', 'start_time', 'end_time', 'creator', 'members', 'full_start_time',
-                    'full_end_time', 'is_past', 'time'}
+        expected = {'id', 'type', 'topic', 'date', 'start_time', 'end_time', 'recurrence', 'creator', 'members',
+                    'full_start_time', 'full_end_time', 'is_past', 'time'}
         assert set(serializer.data.keys()) == expected
 
     def test_meeting_serializer_correct_data(self):
@@ -1,9 +1,13 @@
+import json
 from datetime import timedelta, time, datetime
 import pytest
 from django.utils import timezone
 from freezegun import freeze_time
+from rest_framework.renderers import JSONRenderer
 
 from calendars.services import CalendarService
+from final_project.metrics import get_counters
+from tasks.models import Task
 
 
 @pytest.mark.services
@@ -87,3 +91,143 @@ class TestGetCalendarData:
         data = CalendarService.get_calendar_data(user=self.user, start_str=far_future_start, end_str=far_future_end)
         assert data['count'] == 0
         assert data['events'] == []
+
+    def test_get_calendar_data_meetings_ordered_by_date(self, create_meeting):
+        """
+        Тест на сортировку встреч разных дней по полному времени начала
+        """
+        later_day = create_meeting(creator=self.admin, topic='later day', date=timezone.now().date() + timedelta(days=3),
+                                   start_time=time(8, 0), end_time=time(9, 0))
+        earlier_day = create_meeting(creator=self.admin, topic='earlier day',
+                                     date=timezone.now().date() + timedelta(days=2), start_time=time(18, 0),
+                                     end_time=time(19, 0))
+        later_day.members.add(self.user)
+        earlier_day.members.add(self.user)
+        start_str = (timezone.now().date() + timedelta(days=2)).strftime('%Y-%m-%d')
+        end_str = (timezone.now().date() + timedelta(days=3)).strftime('%Y-%m-%d')
+        data = CalendarService.get_calendar_data(user=self.user, start_str=start_str, end_str=end_str)
+        assert [event['id'] for event in data['events']] == [earlier_day.id, later_day.id]
+
+    def test_get_calendar_data_series_occurrences(self, create_meeting):
+        """
+        Тест на повторения серии встреч в календаре
+        """
+        series = create_meeting(creator=self.admin, topic='series', date=timezone.now().date() + timedelta(days=2),
+                                start_time=time(9, 0), end_time=time(9, 30), recurrence='FREQ=DAILY;COUNT=5')
+        series.members.add(self.user)
+        start_str = (timezone.now().date() + timedelta(days=3)).strftime('%Y-%m-%d')
+        end_str = (timezone.now().date() + timedelta(days=4)).strftime('%Y-%m-%d')
+        data = CalendarService.get_calendar_data(user=self.user, start_str=start_str, end_str=end_str)
+        assert [(event['topic'], event['date']) for event in data['events']] == [
+            ('series', start_str),
+            ('series', end_str),
+        ]
+
+    def test_stream_calendar_data(self):
+        """
+        Тест на совпадение потоковой выдачи календаря с обычной
+        """
+        start_str = (timezone.now().date() - timedelta(days=1)).strftime('%Y-%m-%d')
+        end_str = (timezone.now().date() + timedelta(days=1)).strftime('%Y-%m-%d')
+        data = CalendarService.get_calendar_data(user=self.user, start_str=start_str, end_str=end_str)
+        chunks = CalendarService.stream_calendar_data(user=self.user, start_str=start_str, end_str=end_str)
+        streamed = json.loads(''.join(chunks))
+        assert streamed == json.loads(JSONRenderer().render(data))
+
+    def test_stream_calendar_data_invalid_params(self):
+        """
+        Тест на проверку параметров до начала потоковой выдачи
+        """
+        with pytest.raises(ValueError):
+            CalendarService.stream_calendar_data(user=self.user, date_str='invalid_data')
+
+
+@pytest.mark.services
+@pytest.mark.django_db
+class TestGetCachedCalendarData:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, team_data, create_team, user_data, create_user, task_data,
+              create_task, create_meeting, meeting_data, settings):
+        settings.SHARED_CACHE = True
+        self.admin = create_superuser(**admin_user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=self.team, **user_data)
+        self.task_data = task_data
+        self.create_task = create_task
+        create_task(created_by=self.admin, team=self.team, assigned_to=self.user, **task_data)
+        self.meeting = create_meeting(creator=self.admin, **meeting_data)
+        self.date_str = (timezone.now().date() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    def test_cached_calendar_hit(self, django_assert_num_queries):
+        """
+        Тест на получение календаря из кэша без запросов к БД
+        """
+        before = get_counters('calendar_cache_hit', 'calendar_cache_miss')
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        with django_assert_num_queries(0):
+            cached = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert cached == data
+        after = get_counters('calendar_cache_hit', 'calendar_cache_miss')
+        assert after['calendar_cache_hit'] - before['calendar_cache_hit'] == 1
+        assert after['calendar_cache_miss'] - before['calendar_cache_miss'] == 1
+
+    def test_cached_calendar_without_shared_cache(self, settings):
+        """
+        Тест на вычисление календаря без кэша при выключенном общем кэше
+        """
+        settings.SHARED_CACHE = False
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
+        Task.objects.filter(assigned_to=self.user).update(title='changed')
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['events'][0]['title'] == 'changed'
+
+    def test_cached_calendar_is_past_at_response_time(self):
+        """
+        Тест на вычисление is_past при отдаче закэшированного календаря
+        """
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert not any(event['is_past'] for event in data['events'])
+        with freeze_time(timezone.now() + timedelta(days=3)):
+            cached = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert cached['count'] == 1
+        assert all(event['is_past'] for event in cached['events'])
+
+    def test_cached_calendar_invalidated_on_task_change(self):
+        """
+        Тест на сброс кэша календаря при изменении задач
+        """
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
+        task = self.create_task(created_by=self.admin, team=self.team, assigned_to=self.user, **self.task_data)
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 2
+        task.delete()
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
+
+    def test_cached_calendar_invalidated_on_reassign(self, create_user):
+        """
+        Тест на сброс кэша календаря предыдущего исполнителя при смене исполнителя
+        """
+        other = create_user(email='other@example.com', first_name='other', last_name='other', team=self.team)
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
+        task = Task.objects.get(assigned_to=self.user)
+        task.assigned_to = other
+        task.save()
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 0
+
+    def test_cached_calendar_invalidated_on_meeting_members_change(self):
+        """
+        Тест на сброс кэша календаря при изменении участников встречи
+        """
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
+        self.meeting.members.add(self.user)
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 2
+        self.meeting.members.remove(self.user)
+        data = CalendarService.get_cached_calendar_data(user=self.user, date_str=self.date_str)
+        assert data['count'] == 1
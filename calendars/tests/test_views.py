@@ -1,3 +1,4 @@
+import json
 import pytest
 from django.urls import reverse
 from django.utils import timezone
@@ -75,3 +76,63 @@ class TestCalendarListView:
         """
         response = self.client.get(self.url)
         assert response.status_code == 401
+
+    def test_calendar_view_stream(self):
+        """
+        Тест на потоковое получение календаря
+        """
+        self.client.force_authenticate(self.user)
+        future_date_str = (timezone.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        response = self.client.get(self.url, {'date': future_date_str, 'stream': '1'})
+        assert response.status_code == 200
+        assert response.streaming
+        data = json.loads(b''.join(response.streaming_content))
+        assert data['period'] == future_date_str
+        assert data['count'] == 2
+        assert len(data['events']) == 2
+
+    def test_calendar_view_stream_invalid_date(self):
+        """
+        Тест на потоковое получение календаря с неверной датой
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'date': 'invalid_data', 'stream': '1'})
+        assert response.status_code == 400
+
+
+@pytest.mark.views
+@pytest.mark.django_db
+class TestCalendarCacheStatsView:
+    @pytest.fixture(autouse=True)
+    def setup(self, client, admin_user_data, create_superuser, create_user, user_data):
+        self.client = client
+        self.admin = create_superuser(**admin_user_data)
+        self.user = create_user(**user_data)
+        self.url = reverse('calendars:cache-stats')
+
+    def test_cache_stats_success(self, settings):
+        """
+        Тест на успешное получение счётчиков кэша календаря
+        """
+        settings.SHARED_CACHE = True
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+        assert set(response.data) == {'calendar_cache_hit', 'calendar_cache_miss'}
+
+    def test_cache_stats_without_shared_cache(self, settings):
+        """
+        Тест на отказ в счётчиках без общего кэша вместо неполных значений
+        """
+        settings.SHARED_CACHE = False
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        assert response.status_code == 503
+
+    def test_cache_stats_not_admin(self):
+        """
+        Тест на получение счётчиков кэша календаря не админом
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        assert response.status_code == 403
@@ -4,5 +4,6 @@ from . import views
 
 app_name = 'calendars'
 urlpatterns = [
-    path('', views.CalendarListView.as_view(), name='calendar')
+    path('', views.CalendarListView.as_view(), name='calendar'),
+    path('cache-stats/', views.CalendarCacheStatsView.as_view(), name='cache-stats'),
 ]
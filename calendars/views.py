@@ -1,8 +1,10 @@
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+from final_project.metrics import get_counters
 from .services import CalendarService
 
 
@@ -18,7 +20,15 @@ class CalendarListView(APIView):
         start_str = request.query_params.get('start')
         end_str = request.query_params.get('end')
         try:
-            data = CalendarService.get_calendar_data(
+            if request.query_params.get('stream') in ('1', 'true'):
+                chunks = CalendarService.stream_calendar_data(
+                    user=user,
+                    date_str=date_str,
+                    start_str=start_str,
+                    end_str=end_str,
+                )
+                return StreamingHttpResponse(chunks, content_type='application/json')
+            data = CalendarService.get_cached_calendar_data(
                 user=user,
                 date_str=date_str,
                 start_str=start_str,
@@ -27,3 +37,13 @@ class CalendarListView(APIView):
             return Response(data, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CalendarCacheStatsView(APIView):
+    """
+    Счётчики попаданий и промахов кэша календаря
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_counters('calendar_cache_hit', 'calendar_cache_miss'))
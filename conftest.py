@@ -2,6 +2,8 @@ from rest_framework.test import APIClient
 import pytest
 from django.contrib.auth import get_user_model
 
+from final_project.celery import app
+
 from tasks.models import Task
 from teams.models import Team
 
@@ -43,3 +45,11 @@ def create_task():
         return Task.objects.create(**kwargs)
 
     return _create_tasks
+
+
+@pytest.fixture
+def celery_eager():
+    always_eager = app.conf.task_always_eager
+    app.conf.task_always_eager = True
+    yield
+    app.conf.task_always_eager = always_eager
@@ -22,6 +22,13 @@ class Evaluation(models.Model):
     def __str__(self):
         return f'{self.task.title} ({self.task.assigned_to}): {self.rank}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'rank' in field_names:
+            instance._loaded_rank = instance.rank
+        return instance
+
     def save(self, *args, **kwargs):
         self.full_clean()
         super().save(*args, **kwargs)
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tasks.models import Task
+from users.services import apply_task_stats_changes, schedule_user_stats_refresh, task_stats_state
+from .models import Evaluation
+
+
+def _apply_evaluation_change(instance, old, new):
+    """
+    Перенос изменения оценки в статистику исполнителя задачи. old и new — количество и сумма оценок
+    """
+    task = Task.objects.filter(pk=instance.task_id).only('assigned_to_id', 'status', 'deadline').first()
+    if task is not None:
+        apply_task_stats_changes([(task_stats_state(task, old), task_stats_state(task, new))])
+
+
+@receiver(post_save, sender=Evaluation)
+def refresh_assignee_stats(sender, instance, created, raw, **kwargs):
+    """
+    Изменение статистики исполнителя оценённой задачи
+    """
+    if raw:
+        return
+    if created:
+        _apply_evaluation_change(instance, (0, 0), (1, instance.rank))
+    elif not hasattr(instance, '_loaded_rank'):
+        schedule_user_stats_refresh(task_ids=[instance.task_id])
+    elif instance._loaded_rank != instance.rank:
+        _apply_evaluation_change(instance, (1, instance._loaded_rank), (1, instance.rank))
+    instance._loaded_rank = instance.rank
+
+
+@receiver(post_delete, sender=Evaluation)
+def refresh_assignee_stats_on_delete(sender, instance, **kwargs):
+    _apply_evaluation_change(instance, (1, getattr(instance, '_loaded_rank', instance.rank)), (0, 0))
@@ -0,0 +1,85 @@
+import logging
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+
+def build_html_message(subject, html_body, recipient_list):
+    """
+    Сборка письма с текстовой и HTML-версией
+    """
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=strip_tags(html_body),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipient_list,
+    )
+    message.attach_alternative(html_body, 'text/html')
+    return message
+
+
+def _send_one_by_one(connection, messages, fail_silently):
+    """
+    Отправка писем пачки по одному, чтобы отделить отправленные письма от неотправленных.
+    После ошибки соединение переоткрывается
+    """
+    sent = []
+    for message in messages:
+        try:
+            connection.send_messages([message])
+        except Exception as e:
+            logger.exception(f'Ошибка отправки письма "{message.subject}" на {", ".join(message.to)}: {e}')
+            if not fail_silently:
+                raise
+            connection.close()
+            connection.open()
+        else:
+            sent.append(message)
+    return sent
+
+
+def send_messages_in_chunks(messages, chunk_size=None, connection=None, fail_silently=True):
+    """
+    Отправка писем пачками по chunk_size через один вызов send_messages на пачку.
+    Соединение с почтовым бэкендом открывается заново для каждой пачки.
+    Если пачка отправлена не полностью, её письма отправляются повторно по одному: часть
+    писем может прийти дважды, но ни одно не будет отмечено отправленным без отправки.
+    Возвращает список успешно отправленных писем. При fail_silently=False первая ошибка
+    пробрасывается вызывающему, например для повтора задачи Celery
+    """
+    chunk_size = chunk_size or settings.EMAIL_BATCH_SIZE
+    connection = connection or get_connection()
+    sent = []
+    for start in range(0, len(messages), chunk_size):
+        chunk = messages[start:start + chunk_size]
+        try:
+            connection.open()
+        except Exception as e:
+            logger.exception(f'Не удалось открыть соединение с почтовым сервером: {e}')
+            if not fail_silently:
+                raise
+            break
+        try:
+            try:
+                num_sent = connection.send_messages(chunk)
+            except Exception as e:
+                if not fail_silently:
+                    raise
+                logger.exception(f'Ошибка отправки пачки из {len(chunk)} писем: {e}')
+                num_sent = None
+            if num_sent == len(chunk):
+                sent.extend(chunk)
+                continue
+            connection.close()
+            connection.open()
+            sent.extend(_send_one_by_one(connection, chunk, fail_silently))
+        except Exception as e:
+            if not fail_silently:
+                raise
+            logger.exception(f'Соединение с почтовым сервером потеряно: {e}')
+            break
+        finally:
+            connection.close()
+    return sent
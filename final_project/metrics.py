@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import APIException
+
+METRICS_PREFIX = 'metrics:'
+
+
+class MetricsUnavailable(APIException):
+    status_code = 503
+    default_detail = 'Счётчики доступны только при общем кэше (CACHE_URL)'
+    default_code = 'metrics_unavailable'
+
+
+def incr(name, delta=1):
+    """
+    Увеличение счётчика в общем кэше. Без общего кэша счётчики не ведутся: в локальном кэше
+    процесса web не видны значения, насчитанные воркерами Celery
+    """
+    if not settings.SHARED_CACHE:
+        return
+    key = f'{METRICS_PREFIX}{name}'
+    if not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, timeout=None)
+
+
+def get_counters(*names):
+    """
+    Получение значений счётчиков. Без общего кэша возвращает ошибку вместо неполных значений
+    """
+    if not settings.SHARED_CACHE:
+        raise MetricsUnavailable()
+    values = cache.get_many([f'{METRICS_PREFIX}{name}' for name in names])
+    return {name: values.get(f'{METRICS_PREFIX}{name}', 0) for name in names}
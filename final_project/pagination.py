@@ -0,0 +1,85 @@
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import BooleanField, F, Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _row(*expressions):
+    return Func(*expressions, function='ROW')
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по ключу из всех полей сортировки: страница начинается условием
+    ROW(поля) > ROW(значения последней строки), без OFFSET на повторяющихся значениях первого поля.
+    Порядок выбирается представлением (list_ordering) из orderings. Поля сортировки не допускают NULL,
+    имеют одно направление и заканчиваются уникальным полем
+    """
+    orderings = {}
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(getattr(view, 'list_ordering', None), self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        descending = self.ordering[0].startswith('-')
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor.reverse
+        position = self._decode_position(queryset.model, cursor)
+        if position is not None:
+            operator = ' > ' if descending == reverse else ' < '
+            queryset = queryset.filter(Func(
+                _row(*(F(field) for field in self.fields)),
+                _row(*(Value(value) for value in position)),
+                template='%(expressions)s',
+                arg_joiner=operator,
+                output_field=BooleanField(),
+            ))
+        if reverse:
+            order = self.fields if descending else [f'-{field}' for field in self.fields]
+        else:
+            order = self.ordering
+        results = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def _decode_position(self, model, cursor):
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            values = json.loads(cursor.position)
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([getattr(instance, field) for field in self.fields], cls=JSONEncoder)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
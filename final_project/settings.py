@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
@@ -96,6 +97,34 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+# Кэш виден всем процессам (web и Celery). Без него локальный кэш процесса не используется
+# там, где устаревшее значение в другом процессе недопустимо (аутентификация, blacklist, метрики)
+SHARED_CACHE = bool(os.getenv('CACHE_URL'))
+
+CALENDAR_CACHE_TIMEOUT = int(os.getenv('CALENDAR_CACHE_TIMEOUT', 60))
+CALENDAR_ITERATOR_CHUNK_SIZE = int(os.getenv('CALENDAR_ITERATOR_CHUNK_SIZE', 500))
+FREE_BUSY_MAX_DAYS = int(os.getenv('FREE_BUSY_MAX_DAYS', 62))
+FREE_BUSY_MAX_MEMBERS = int(os.getenv('FREE_BUSY_MAX_MEMBERS', 200))
+MEETING_MAX_OCCURRENCES = int(os.getenv('MEETING_MAX_OCCURRENCES', 366))
+MEETING_LIST_MAX_DAYS = int(os.getenv('MEETING_LIST_MAX_DAYS', 92))
+MEETING_LIST_DEFAULT_DAYS = int(os.getenv('MEETING_LIST_DEFAULT_DAYS', 31))
+TASK_BULK_MAX_SIZE = int(os.getenv('TASK_BULK_MAX_SIZE', 1000))
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+TOKEN_PURGE_BATCH_SIZE = int(os.getenv('TOKEN_PURGE_BATCH_SIZE', 5000))
+USER_STATS_BATCH_SIZE = int(os.getenv('USER_STATS_BATCH_SIZE', 1000))
+# Насколько назад смотрит первый пересчёт просроченных задач, дальше — от отметки предыдущего запуска
+USER_STATS_OVERDUE_WINDOW = int(os.getenv('USER_STATS_OVERDUE_WINDOW', 15 * 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -137,13 +166,14 @@ AUTH_USER_MODEL = 'users.UserWithEmail'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedUserJWTAuthentication',
     ],
 }
 
 # Simple JWT
 SIMPLE_JWT = {
     'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.CustomTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.CustomTokenRefreshSerializer',
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
@@ -165,6 +195,7 @@ CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 25 * 60
 CELERY_LOG_LEVEL = 'INFO'
+REMINDER_CHUNK_SIZE = int(os.getenv('REMINDER_CHUNK_SIZE', 50))
 
 # Celery Beat
 CELERY_BEAT_SCHEDULE = {
@@ -173,7 +204,15 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(hour='*/6'),
     },
     'send-meeting-reminders-every-10-min': {
-        'task': 'tasks.tasks.send_meeting_reminders',
+        'task': 'meetings.tasks.send_meeting_reminders',
+        'schedule': 10 * 60,
+    },
+    'flush-expired-tokens-daily': {
+        'task': 'users.tasks.flush_expired_tokens',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'refresh-overdue-stats-every-10-min': {
+        'task': 'users.tasks.refresh_overdue_stats',
         'schedule': 10 * 60,
     },
 }
@@ -181,3 +220,4 @@ CELERY_BEAT_SCHEDULE = {
 # Email
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
@@ -0,0 +1,20 @@
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.db.models import Lookup
+
+
+@DateTimeRangeField.register_lookup
+class OverlapAny(Lookup):
+    """
+    Пересечение диапазона хотя бы с одним из списка диапазонов: during__overlap_any=[...].
+    Список передаётся одним параметром-массивом, поэтому размер запроса не зависит от его длины
+    """
+    lookup_name = 'overlap_any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [list(value)]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} && ANY({rhs}::tstzrange[])', (*lhs_params, *rhs_params)
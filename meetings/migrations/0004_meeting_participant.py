@@ -0,0 +1,91 @@
+# Generated by Django 6.0 on 2026-10-18 03:23
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.operations
+import django.contrib.postgres.fields.ranges
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_participants(apps, schema_editor):
+    """
+    Заполнение записей участия для существующих встреч. Если у участника уже есть
+    пересекающиеся встречи, миграция останавливается со списком конфликтов, чтобы
+    их разобрали вручную до повторного запуска
+    """
+    Meeting = apps.get_model('meetings', 'Meeting')
+    MeetingParticipant = apps.get_model('meetings', 'MeetingParticipant')
+    members_field = Meeting._meta.get_field('members')
+    slots = f"""
+        SELECT m.id AS meeting_id, p.user_id, m.date, m.start_time, m.end_time, tstzrange(
+            (m.date + m.start_time) AT TIME ZONE %s,
+            (m.date + m.end_time) AT TIME ZONE %s
+        ) AS during
+        FROM (
+            SELECT {members_field.m2m_column_name()} AS meeting_id, {members_field.m2m_reverse_name()} AS user_id
+            FROM {members_field.m2m_db_table()}
+            UNION
+            SELECT id, creator_id FROM {Meeting._meta.db_table}
+        ) AS p
+        JOIN {Meeting._meta.db_table} AS m ON m.id = p.meeting_id
+    """
+    params = [settings.TIME_ZONE, settings.TIME_ZONE]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH slots AS ({slots})
+            SELECT a.user_id, a.meeting_id, a.date, a.start_time, a.end_time,
+                   b.meeting_id, b.date, b.start_time, b.end_time
+            FROM slots AS a
+            JOIN slots AS b ON b.user_id = a.user_id AND b.meeting_id > a.meeting_id AND b.during && a.during
+            ORDER BY a.user_id, a.date, a.start_time, a.meeting_id, b.meeting_id
+            """,
+            params,
+        )
+        conflicts = cursor.fetchall()
+    if conflicts:
+        lines = '\n'.join(
+            f'  пользователь {user_id}: встреча {first_id} ({first_date} {first_start}-{first_end}) '
+            f'и встреча {second_id} ({second_date} {second_start}-{second_end})'
+            for (user_id, first_id, first_date, first_start, first_end,
+                 second_id, second_date, second_start, second_end) in conflicts
+        )
+        raise RuntimeError(
+            f'Найдено пересечений встреч у участников: {len(conflicts)}. '
+            f'Перенесите или удалите встречи и повторите миграцию:\n{lines}'
+        )
+    schema_editor.execute(
+        f"""
+        INSERT INTO {MeetingParticipant._meta.db_table} (meeting_id, user_id, during)
+        SELECT meeting_id, user_id, during FROM ({slots}) AS slots
+        """,
+        params,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0002_meeting_reminder_1hour_sent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.BtreeGistExtension(),
+        migrations.CreateModel(
+            name='MeetingParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('during', django.contrib.postgres.fields.ranges.DateTimeRangeField(verbose_name='Время встречи')),
+                ('meeting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='meetings.meeting', verbose_name='Встреча')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meeting_slots', to=settings.AUTH_USER_MODEL, verbose_name='Участник')),
+            ],
+            options={
+                'verbose_name': 'Участие во встрече',
+                'verbose_name_plural': 'Участия во встречах',
+                'constraints': [models.UniqueConstraint(fields=('meeting', 'user'), name='meeting_participant_unique'), django.contrib.postgres.constraints.ExclusionConstraint(expressions=[('user', '='), ('during', '&&')], name='meeting_participant_no_overlap')],
+            },
+        ),
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0 on 2026-10-18 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_start_end_at(apps, schema_editor):
+    """
+    Заполнение времени начала и окончания существующих встреч
+    """
+    Meeting = apps.get_model('meetings', 'Meeting')
+    schema_editor.execute(
+        f"""
+        UPDATE {Meeting._meta.db_table}
+        SET start_at = (date + start_time) AT TIME ZONE %s,
+            end_at = (date + end_time) AT TIME ZONE %s
+        """,
+        [settings.TIME_ZONE, settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0004_meeting_participant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='start_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Начало встречи'),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='end_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Окончание встречи'),
+        ),
+        migrations.RunPython(backfill_start_end_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='meeting',
+            name='start_at',
+            field=models.DateTimeField(editable=False, verbose_name='Начало встречи'),
+        ),
+        migrations.AlterField(
+            model_name='meeting',
+            name='end_at',
+            field=models.DateTimeField(editable=False, verbose_name='Окончание встречи'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['start_at'], name='meeting_start_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('reminder_1hour_sent', False)), fields=['start_at'], name='meeting_start_not_reminded_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 03:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0005_meeting_start_end_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='meetingparticipant',
+            name='meeting_participant_unique',
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='last_reminder_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Начало повторения, о котором отправлено напоминание'),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='recurrence',
+            field=models.CharField(blank=True, default='', help_text='Например, FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10', max_length=200, verbose_name='Правило повторения'),
+        ),
+        migrations.AddField(
+            model_name='meeting',
+            name='series_end_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Окончание последнего повторения'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('series_end_at__isnull', False)), fields=['series_end_at', 'start_at'], name='meeting_series_idx'),
+        ),
+    ]
@@ -1,16 +1,52 @@
+import copy
+from itertools import islice
+from dateutil.rrule import rrulestr
+from django.conf import settings
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import datetime
 
+from . import lookups  # noqa: F401 регистрирует during__overlap_any
+
 User = get_user_model()
 
+RECURRENCE_FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+RECURRENCE_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
 
 def get_full_datetime(date, time):
     return timezone.make_aware(datetime.combine(date, time))
 
 
+def parse_recurrence(value, dtstart):
+    """
+    Разбор правила повторения (подмножество RRULE: FREQ, INTERVAL, BYDAY, COUNT, UNTIL).
+    Повторения должны быть ограничены COUNT или UNTIL
+    """
+    try:
+        parts = dict(item.split('=', 1) for item in value.upper().split(';') if item)
+    except ValueError:
+        raise ValidationError({'recurrence': 'Правило повторения должно иметь вид KEY=VALUE;KEY=VALUE'})
+    unknown = set(parts) - {'FREQ', 'INTERVAL', 'BYDAY', 'COUNT', 'UNTIL'}
+    if unknown:
+        raise ValidationError({'recurrence': f'Неподдерживаемые параметры повторения: {", ".join(sorted(unknown))}'})
+    if parts.get('FREQ') not in RECURRENCE_FREQUENCIES:
+        raise ValidationError({'recurrence': f'FREQ должен быть одним из: {", ".join(RECURRENCE_FREQUENCIES)}'})
+    if ('COUNT' in parts) == ('UNTIL' in parts):
+        raise ValidationError({'recurrence': 'Укажите ровно один из параметров COUNT или UNTIL'})
+    if 'BYDAY' in parts and not set(parts['BYDAY'].split(',')) <= set(RECURRENCE_WEEKDAYS):
+        raise ValidationError({'recurrence': f'BYDAY должен содержать дни из: {", ".join(RECURRENCE_WEEKDAYS)}'})
+    try:
+        return rrulestr(';'.join(f'{key}={val}' for key, val in parts.items()), dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise ValidationError({'recurrence': f'Неверное правило повторения: {e}'})
+
+
 class Meeting(models.Model):
     topic = models.CharField(max_length=100, verbose_name='Тема встречи')
     date = models.DateField(verbose_name='Дата встречи')
@@ -20,15 +56,41 @@ class Meeting(models.Model):
                                 verbose_name='Создатель встречи')
     members = models.ManyToManyField(User, related_name='meeting_members', verbose_name='Участники встречи')
     reminder_1hour_sent = models.BooleanField(default=False, verbose_name='Напоминание за час отправлено')
+    start_at = models.DateTimeField(editable=False, verbose_name='Начало встречи')
+    end_at = models.DateTimeField(editable=False, verbose_name='Окончание встречи')
+    recurrence = models.CharField(max_length=200, blank=True, default='', verbose_name='Правило повторения',
+                                  help_text='Например, FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10')
+    series_end_at = models.DateTimeField(null=True, editable=False, verbose_name='Окончание последнего повторения')
+    last_reminder_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                            verbose_name='Начало повторения, о котором отправлено напоминание')
 
     class Meta:
         verbose_name = 'Встреча'
         verbose_name_plural = 'Встречи'
         ordering = ['creator', 'date']
+        indexes = [
+            models.Index(fields=['start_at'], name='meeting_start_at_idx'),
+            models.Index(
+                fields=['start_at'],
+                name='meeting_start_not_reminded_idx',
+                condition=models.Q(reminder_1hour_sent=False),
+            ),
+            models.Index(
+                fields=['series_end_at', 'start_at'],
+                name='meeting_series_idx',
+                condition=models.Q(series_end_at__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.topic} ({self.date} {self.start_time} - {self.end_time})'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_start_at = instance.__dict__.get('start_at')
+        return instance
+
     @property
     def full_start_time(self):
         return get_full_datetime(self.date, self.start_time)
@@ -37,16 +99,108 @@ class Meeting(models.Model):
     def full_end_time(self):
         return get_full_datetime(self.date, self.end_time)
 
+    @property
+    def during(self):
+        return DateTimeTZRange(self.full_start_time, self.full_end_time)
+
+    def get_rule(self):
+        """
+        Правило повторения встречи или None для разовой встречи
+        """
+        if not self.recurrence:
+            return None
+        return parse_recurrence(self.recurrence, datetime.combine(self.date, self.start_time))
+
+    def occurrences(self, window_start=None, window_end=None):
+        """
+        Повторения встречи, начинающиеся в полуинтервале [window_start, window_end).
+        Повторения — копии встречи с датой и временем конкретного повторения,
+        строки в БД для них не создаются
+        """
+        rule = self.get_rule()
+        if rule is None:
+            if (window_start is None or self.full_start_time >= window_start) and (
+                    window_end is None or self.full_start_time < window_end):
+                yield self
+            return
+        duration = datetime.combine(self.date, self.end_time) - datetime.combine(self.date, self.start_time)
+        if window_start is None and window_end is None:
+            starts = iter(rule)
+        else:
+            after = timezone.make_naive(window_start) if window_start else datetime.combine(self.date, self.start_time)
+            before = timezone.make_naive(window_end) if window_end else rule[-1]
+            starts = (start for start in rule.between(after, before, inc=True) if window_end is None or start < before)
+        for start in starts:
+            occurrence = copy.copy(self)
+            occurrence.date = start.date()
+            occurrence.start_at = timezone.make_aware(start)
+            occurrence.end_at = timezone.make_aware(start + duration)
+            yield occurrence
+
+    def occurrence_ranges(self):
+        return [DateTimeTZRange(get_full_datetime(o.date, o.start_time), get_full_datetime(o.date, o.end_time))
+                for o in self.occurrences()]
+
     def clean(self):
+        """
+        Начало встречи проверяется на прошлое только у новой встречи или при его изменении,
+        чтобы идущую серию можно было редактировать, не сдвигая её начало
+        """
         super().clean()
         now = timezone.now()
         start_dt = self.full_start_time
         end_dt = self.full_end_time
-        if start_dt < now:
+        if start_dt < now and start_dt != getattr(self, '_saved_start_at', None):
             raise ValidationError({'start_time': 'Время начала встречи не может быть в прошлом'})
         if end_dt <= start_dt:
             raise ValidationError({'end_time': 'Время окончания встречи должно быть позже времени начала'})
+        rule = self.get_rule()
+        if rule is not None:
+            starts = list(islice(rule, settings.MEETING_MAX_OCCURRENCES + 1))
+            if not starts or starts[0] != datetime.combine(self.date, self.start_time):
+                raise ValidationError({'recurrence': 'Дата встречи должна совпадать с первым повторением'})
+            if len(starts) > settings.MEETING_MAX_OCCURRENCES:
+                raise ValidationError(
+                    {'recurrence': f'Повторений не может быть больше {settings.MEETING_MAX_OCCURRENCES}'}
+                )
 
     def save(self, *args, **kwargs):
+        if None not in (self.date, self.start_time, self.end_time):
+            self.start_at = self.full_start_time
+            self.end_at = self.full_end_time
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'start_time', 'end_time', 'recurrence'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'start_at', 'end_at', 'series_end_at'}
         self.full_clean()
+        rule = self.get_rule()
+        self.series_end_at = None if rule is None else get_full_datetime(rule[-1].date(), self.end_time)
         super().save(*args, **kwargs)
+        self._saved_start_at = self.start_at
+
+
+class MeetingParticipant(models.Model):
+    """
+    Время встречи (каждого повторения для серии) для каждого участника и создателя.
+    Исключающее ограничение не даёт одному пользователю попасть в пересекающиеся встречи
+    """
+    meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE, related_name='participants',
+                                verbose_name='Встреча')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='meeting_slots',
+                             verbose_name='Участник')
+    during = DateTimeRangeField(verbose_name='Время встречи')
+
+    class Meta:
+        verbose_name = 'Участие во встрече'
+        verbose_name_plural = 'Участия во встречах'
+        constraints = [
+            ExclusionConstraint(
+                name='meeting_participant_no_overlap',
+                expressions=[
+                    ('user', RangeOperators.EQUAL),
+                    ('during', RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} ({self.during})'
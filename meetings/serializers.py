@@ -1,4 +1,7 @@
+from datetime import time, timedelta
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework import serializers
 
 from meetings.models import Meeting
@@ -15,7 +18,7 @@ class MeetingCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Meeting
-        fields = ('topic', 'date', 'start_time', 'end_time', 'members')
+        fields = ('topic', 'date', 'start_time', 'end_time', 'recurrence', 'members')
 
 
 class MeetingMembersSerializer(serializers.ModelSerializer):
@@ -48,7 +51,70 @@ class MeetingListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Meeting
-        fields = ('id', 'topic', 'date', 'start_time', 'end_time', 'creator', 'members')
+        fields = ('id', 'topic', 'date', 'start_time', 'end_time', 'recurrence', 'creator', 'members')
 
     def get_creator(self, obj):
         return f'{obj.creator.first_name.strip()} {obj.creator.last_name.strip()}'
+
+
+class MeetingWindowSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False, help_text='По умолчанию сегодня')
+    end = serializers.DateField(required=False, help_text='По умолчанию MEETING_LIST_DEFAULT_DAYS дней от начала')
+
+    def validate(self, attrs):
+        attrs.setdefault('start', timezone.localdate())
+        attrs.setdefault('end', attrs['start'] + timedelta(days=settings.MEETING_LIST_DEFAULT_DAYS - 1))
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError({'end': 'Дата окончания не может быть раньше даты начала'})
+        if (attrs['end'] - attrs['start']).days >= settings.MEETING_LIST_MAX_DAYS:
+            raise serializers.ValidationError(
+                {'end': f'Период не может быть длиннее {settings.MEETING_LIST_MAX_DAYS} дней'}
+            )
+        return attrs
+
+
+class FreeBusyQuerySerializer(serializers.Serializer):
+    members = serializers.ListField(
+        child=serializers.EmailField(),
+        allow_empty=False,
+        max_length=settings.FREE_BUSY_MAX_MEMBERS
+    )
+    start = serializers.DateField()
+    end = serializers.DateField()
+    duration = serializers.IntegerField(min_value=5, max_value=24 * 60, help_text='Длительность окна в минутах')
+    day_start = serializers.TimeField(default=time(9, 0))
+    day_end = serializers.TimeField(default=time(18, 0))
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=5)
+
+    def validate_members(self, value):
+        """
+        Поиск всех участников одним запросом, неизвестные email возвращаются одной ошибкой
+        """
+        emails = set(value)
+        users = list(User.objects.filter(email__in=emails).only('id', 'email'))
+        unknown = emails - {user.email for user in users}
+        if unknown:
+            raise serializers.ValidationError(f'Пользователи не найдены: {", ".join(sorted(unknown))}')
+        return users
+
+    def validate(self, attrs):
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError({'end': 'Дата окончания не может быть раньше даты начала'})
+        if (attrs['end'] - attrs['start']).days >= settings.FREE_BUSY_MAX_DAYS:
+            raise serializers.ValidationError(
+                {'end': f'Период не может быть длиннее {settings.FREE_BUSY_MAX_DAYS} дней'}
+            )
+        if attrs['day_end'] <= attrs['day_start']:
+            raise serializers.ValidationError({'day_end': 'Конец рабочего дня должен быть позже начала'})
+        attrs['duration'] = timedelta(minutes=attrs['duration'])
+        return attrs
+
+
+class IntervalSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class FreeBusySerializer(serializers.Serializer):
+    busy = IntervalSerializer(many=True)
+    free = IntervalSerializer(many=True)
@@ -1,90 +1,203 @@
-from django.db import transaction
-from django.db.models import Q
+import heapq
+from datetime import datetime, time, timedelta
+from operator import attrgetter
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
 from rest_framework.exceptions import ValidationError
 from django.utils import timezone
 
-from meetings.models import Meeting
+from meetings.models import Meeting, MeetingParticipant, get_full_datetime
+
+
+def merge_intervals(intervals):
+    """
+    Объединение пересекающихся и смежных интервалов (start, end)
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
 
 
 class MeetingService:
     @staticmethod
-    @transaction.atomic
-    def create_meeting(*, creator, topic, date, start_time, end_time, members):
+    def iter_occurrences(queryset, start_dt, end_dt, chunk_size=None):
         """
-        Функция для создания встречи
+        Возвращает встречи и повторения серий, начинающиеся в полуинтервале [start_dt, end_dt),
+        по возрастанию времени начала. Повторения серий разворачиваются только в пределах периода
+        """
+        chunk_size = chunk_size or settings.CALENDAR_ITERATOR_CHUNK_SIZE
+        single = queryset.filter(
+            series_end_at__isnull=True,
+            start_at__gte=start_dt,
+            start_at__lt=end_dt,
+        ).order_by('start_at', 'id')
+        series = queryset.filter(
+            series_end_at__isnull=False,
+            series_end_at__gt=start_dt,
+            start_at__lt=end_dt,
+        ).order_by('start_at', 'id')
+        return heapq.merge(
+            single.iterator(chunk_size=chunk_size),
+            *(meeting.occurrences(start_dt, end_dt) for meeting in series),
+            key=attrgetter('start_at'),
+        )
+
+    @staticmethod
+    def get_free_busy(*, members, start_date, end_date, duration, day_start, day_end, limit):
+        """
+        Возвращает объединённую занятость участников за период и ближайшие общие
+        свободные окна не короче duration в пределах рабочего дня
         """
-        members = set(members or [])
-        members.add(creator)
         user_ids = [u.id for u in members]
-        conflicts = Meeting.objects.filter(
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        ).filter(
-            Q(creator__in=user_ids) | Q(members__in=user_ids)
-        ).distinct().prefetch_related('members')
-        conflicted_users = set()
-        for meeting in conflicts:
-            if meeting.creator_id in user_ids:
-                conflicted_users.add(meeting.creator)
-            conflicted_users.update(
-                u for u in meeting.members.all() if u.id in user_ids
-            )
+        period = DateTimeTZRange(
+            get_full_datetime(start_date, time.min),
+            get_full_datetime(end_date + timedelta(days=1), time.min),
+        )
+        rows = MeetingParticipant.objects.filter(
+            user_id__in=user_ids,
+            during__overlap=period,
+        ).values_list('during', flat=True)
+        busy = merge_intervals(
+            (timezone.make_naive(during.lower), timezone.make_naive(during.upper))
+            for during in rows
+        )
+        now = timezone.localtime().replace(tzinfo=None)
+        free = []
+        index = 0
+        day = start_date
+        while day <= end_date and len(free) < limit:
+            cursor = max(datetime.combine(day, day_start), now)
+            day_finish = datetime.combine(day, day_end)
+            while index < len(busy) and busy[index][1] <= cursor:
+                index += 1
+            position = index
+            while cursor < day_finish and len(free) < limit:
+                if position < len(busy) and busy[position][0] < day_finish:
+                    gap_end = busy[position][0]
+                    next_cursor = busy[position][1]
+                    position += 1
+                else:
+                    gap_end = day_finish
+                    next_cursor = day_finish
+                if gap_end - cursor >= duration:
+                    free.append((cursor, gap_end))
+                cursor = max(cursor, next_cursor)
+            day += timedelta(days=1)
+        return {
+            'busy': [{'start': timezone.make_aware(start), 'end': timezone.make_aware(end)} for start, end in busy],
+            'free': [{'start': timezone.make_aware(start), 'end': timezone.make_aware(end)} for start, end in free],
+        }
+
+    @staticmethod
+    def _check_conflicts(user_ids, ranges, exclude_meeting_id=None):
+        """
+        Проверка пересечения всех повторений встречи с другими встречами пользователей одним запросом.
+        Общий диапазон повторений отбирает строки по индексу исключающего ограничения,
+        точное пересечение проверяется по массиву диапазонов
+        """
+        outer = DateTimeTZRange(min(during.lower for during in ranges), max(during.upper for during in ranges))
+        conflicts = MeetingParticipant.objects.filter(
+            user_id__in=user_ids,
+            during__overlap=outer,
+            during__overlap_any=ranges,
+        ).select_related('user')
+        if exclude_meeting_id is not None:
+            conflicts = conflicts.exclude(meeting_id=exclude_meeting_id)
+        conflicted_users = {participant.user for participant in conflicts}
         if conflicted_users:
             emails = ', '.join(u.email for u in conflicted_users)
             raise ValidationError({'members': f'Следующие пользователи уже участвуют в другой встрече: {emails}'})
 
-        meeting = Meeting.objects.create(
+    @staticmethod
+    @transaction.atomic
+    def create_meeting(*, creator, topic, date, start_time, end_time, members, recurrence=''):
+        """
+        Функция для создания встречи
+        """
+        members = set(members or [])
+        members.add(creator)
+        user_ids = [u.id for u in members]
+        meeting = Meeting(
             topic=topic,
             date=date,
             start_time=start_time,
             end_time=end_time,
+            recurrence=recurrence,
             creator=creator,
         )
-        meeting.members.set(members)
+        meeting.clean()
+        ranges = meeting.occurrence_ranges()
+        MeetingService._check_conflicts(user_ids, ranges)
+        try:
+            with transaction.atomic():
+                meeting.save()
+                meeting.members.set(members)
+        except IntegrityError:
+            MeetingService._check_conflicts(user_ids, ranges)
+            raise
         return meeting
 
     @staticmethod
     @transaction.atomic
-    def update_meeting(*, meeting, creator, topic, date, start_time, end_time, members):
+    def update_meeting(*, meeting, creator, topic, date, start_time, end_time, members=None, recurrence=None):
+        """
+        Функция для обновления встречи. members=None оставляет участников без изменений,
+        иначе в БД записывается только разница с текущим составом
+        """
         now = timezone.now()
-        if meeting.full_end_time < now:
+        if (meeting.series_end_at or meeting.full_end_time) < now:
             raise ValidationError('Нельзя редактировать прошедшую встречу')
-        members = set(members or [])
-        members.add(creator)
-        user_ids = [u.id for u in members]
-        conflicts = Meeting.objects.filter(
-            date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-        ).exclude(id=meeting.id).filter(
-            Q(creator__in=user_ids) | Q(members__in=user_ids)
-        ).distinct().prefetch_related('members')
-        conflicted_users = set()
-        for meeting in conflicts:
-            if meeting.creator_id in user_ids:
-                conflicted_users.add(meeting.creator)
-            conflicted_users.update(
-                u for u in meeting.members.all() if u.id in user_ids
-            )
-        if conflicted_users:
-            emails = ', '.join(u.email for u in conflicted_users)
-            raise ValidationError({'members': f'Следующие пользователи уже участвуют в другой встрече: {emails}'})
-        if topic is not None:
-            meeting.topic = topic
-        if date is not None:
-            meeting.date = date
-        if meeting.start_time is not None:
-            meeting.start_time = start_time
-        if meeting.end_time is not None:
-            meeting.end_time = end_time
-        changed_time = (
-                (date is not None and date != meeting.date) or
-                (start_time is not None and start_time != meeting.start_time) or
-                (end_time is not None and end_time != meeting.end_time)
-        )
+        values = {
+            'topic': topic,
+            'date': date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'recurrence': recurrence,
+        }
+        changed_fields = [
+            field for field, value in values.items()
+            if value is not None and value != getattr(meeting, field)
+        ]
+        for field in changed_fields:
+            setattr(meeting, field, values[field])
+        changed_time = bool({'date', 'start_time', 'end_time', 'recurrence'} & set(changed_fields))
         if changed_time:
             meeting.reminder_1hour_sent = False
-        meeting.save()
-        meeting.members.set(members)
+            meeting.last_reminder_at = None
+            changed_fields += ['reminder_1hour_sent', 'last_reminder_at']
+
+        current_ids = set(meeting.members.values_list('pk', flat=True))
+        if members is None:
+            new_ids = current_ids
+        else:
+            new_ids = {u.id for u in members} | {creator.id}
+        added_ids = new_ids - current_ids
+        removed_ids = current_ids - new_ids
+
+        if changed_time:
+            meeting.clean()
+            check_ids, ranges = new_ids | {meeting.creator_id}, meeting.occurrence_ranges()
+        elif added_ids:
+            check_ids, ranges = added_ids, meeting.occurrence_ranges()
+        else:
+            check_ids, ranges = set(), []
+        if check_ids:
+            MeetingService._check_conflicts(check_ids, ranges, exclude_meeting_id=meeting.id)
+        try:
+            with transaction.atomic():
+                if removed_ids:
+                    meeting.members.remove(*removed_ids)
+                if changed_fields:
+                    meeting.save(update_fields=changed_fields)
+                if added_ids:
+                    meeting.members.add(*added_ids)
+        except IntegrityError:
+            MeetingService._check_conflicts(check_ids, ranges, exclude_meeting_id=meeting.id)
+            raise
         return meeting
@@ -0,0 +1,62 @@
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .models import Meeting, MeetingParticipant
+
+
+def _build_participants(meeting, user_ids):
+    ranges = meeting.occurrence_ranges()
+    return [
+        MeetingParticipant(meeting=meeting, user_id=user_id, during=during)
+        for user_id in user_ids
+        for during in ranges
+    ]
+
+
+@receiver(post_save, sender=Meeting)
+def sync_meeting_participants_time(sender, instance, created, raw, update_fields, **kwargs):
+    """
+    Создание записей участия создателя и перенос времени встречи (всех повторений серии)
+    во все записи участия
+    """
+    if raw:
+        return
+    if update_fields is not None and not {'date', 'start_time', 'end_time', 'recurrence', 'creator'} & update_fields:
+        return
+    if created:
+        MeetingParticipant.objects.bulk_create(_build_participants(instance, [instance.creator_id]))
+        return
+    user_ids = set(instance.members.values_list('pk', flat=True)) | {instance.creator_id}
+    MeetingParticipant.objects.filter(meeting=instance).delete()
+    MeetingParticipant.objects.bulk_create(_build_participants(instance, user_ids))
+
+
+@receiver(m2m_changed, sender=Meeting.members.through)
+def sync_meeting_participants_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Синхронизация записей участия с участниками встречи. Записи создателя не удаляются
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        slots = MeetingParticipant.objects.filter(user=instance).exclude(meeting__creator=instance)
+        if action == 'post_add':
+            meetings = Meeting.objects.filter(pk__in=pk_set).exclude(participants__user=instance)
+            MeetingParticipant.objects.bulk_create(
+                participant for meeting in meetings for participant in _build_participants(meeting, [instance.pk])
+            )
+        elif action == 'post_remove':
+            slots.filter(meeting_id__in=pk_set).delete()
+        else:
+            slots.delete()
+        return
+    slots = MeetingParticipant.objects.filter(meeting=instance).exclude(user_id=instance.creator_id)
+    if action == 'post_add':
+        existing = set(
+            MeetingParticipant.objects.filter(meeting=instance, user_id__in=pk_set).values_list('user_id', flat=True)
+        )
+        MeetingParticipant.objects.bulk_create(_build_participants(instance, pk_set - existing))
+    elif action == 'post_remove':
+        slots.filter(user_id__in=pk_set).delete()
+    else:
+        slots.delete()
@@ -1,68 +1,137 @@
 import logging
-from datetime import timedelta
-from celery import shared_task
+from collections import defaultdict
+from datetime import datetime, timedelta
+from celery import group, shared_task
 from django.conf import settings
-from django.core.mail import send_mail
-from django.utils.html import strip_tags
+from django.db import transaction
 from django.utils import timezone
 
+from final_project.mail import build_html_message, send_messages_in_chunks
 from .models import Meeting
 
 logger = logging.getLogger(__name__)
 
 
+def _build_reminder_message(meeting):
+    participants = set(meeting.members.all())
+    participants.add(meeting.creator)
+    emails = [u.email for u in participants if u.email]
+    if not emails:
+        return None
+    subject = f'Напоминание: встреча "{meeting.topic}"'
+    html_body = f"""<html>
+        <body>
+        <h2>Напоминание о встрече</h2>
+        <p>Здравствуйте!</p>
+        <p>Встреча <strong>{meeting.topic}</strong> начнётся через ~1 час:</p>
+        <ul>
+        <li><strong>Тема:</strong> {meeting.topic}</li>
+        <li><strong>Дата:</strong> {meeting.date.strftime('%d.%m.%Y')}</li>
+        <li><strong>Время:</strong> {meeting.start_time.strftime('%H:%M')} – {meeting.end_time.strftime('%H:%M')}</li>
+        <li><strong>Создатель:</strong> {meeting.creator.email} ({meeting.creator.last_name} {meeting.creator.first_name})</li>
+        <li><strong>Участники:</strong> {', '.join(u.email for u in meeting.members.all())}</li>
+        </ul>
+        <p>Будьте на связи!</p>
+        <p>С уважением,<br>Система управления бизнесом.</p>
+        </body>
+        </html>"""
+    return build_html_message(subject, html_body, emails)
+
+
+def _send_reminders(meetings):
+    """
+    Отправка напоминаний о встречах. Возвращает встречи, письма о которых отправлены
+    """
+    messages = []
+    message_meetings = {}
+    for meeting in meetings:
+        message = _build_reminder_message(meeting)
+        if message is None:
+            continue
+        messages.append(message)
+        message_meetings[message] = meeting
+    sent = []
+    for message in send_messages_in_chunks(messages):
+        meeting = message_meetings[message]
+        logger.info(f'Напоминание о встрече "{meeting.topic}" отправлено {len(message.to)} участникам')
+        sent.append(meeting)
+    return sent
+
+
 @shared_task
 def send_meeting_reminders():
     now = timezone.now()
     window_start = now + timedelta(minutes=50)
     window_end = now + timedelta(minutes=70)
-    upcoming = Meeting.objects.filter(
+    candidates = list(Meeting.objects.filter(
         reminder_1hour_sent=False,
-        date__range=(window_start.date(), window_end.date()),
-    ).prefetch_related('members', 'creator')
-    candidates = []
-    for meeting in upcoming:
-        start_dt = meeting.full_start_time
-        if window_start <= start_dt <= window_end:
-            candidates.append(meeting)
-    if not candidates:
+        series_end_at__isnull=True,
+        start_at__range=(window_start, window_end),
+    ).values_list('id', flat=True))
+    series = Meeting.objects.filter(
+        series_end_at__gte=window_start,
+        start_at__lte=window_end,
+    ).only('id', 'date', 'start_time', 'end_time', 'recurrence', 'last_reminder_at')
+    occurrences = []
+    for meeting in series:
+        for occurrence in meeting.occurrences(window_start, window_end + timedelta(microseconds=1)):
+            if meeting.last_reminder_at is None or meeting.last_reminder_at < occurrence.start_at:
+                occurrences.append((meeting.pk, occurrence.start_at.isoformat()))
+    if not candidates and not occurrences:
         logger.info('Нет встреч для отправки уведомлений')
         return
-    for meeting in candidates:
-        try:
-            participants = set(meeting.members.all())
-            participants.add(meeting.creator)
-            emails = [u.email for u in participants if u.email]
-            if not emails:
+    chunk_size = settings.REMINDER_CHUNK_SIZE
+    group([
+        *(send_meeting_reminder_chunk.s(candidates[start:start + chunk_size])
+          for start in range(0, len(candidates), chunk_size)),
+        *(send_series_reminder_chunk.s(occurrences[start:start + chunk_size])
+          for start in range(0, len(occurrences), chunk_size)),
+    ]).apply_async()
+    logger.info(f'Запланированы напоминания о {len(candidates) + len(occurrences)} встречах')
+
+
+@shared_task(acks_late=True)
+def send_meeting_reminder_chunk(meeting_ids):
+    """
+    Отправка напоминаний о части встреч.
+    Строки встреч заблокированы на время отправки, флаг выставляется только для отправленных писем
+    в той же транзакции. При падении воркера транзакция откатывается и напоминания отправляются
+    повторным запуском пачки
+    """
+    with transaction.atomic():
+        meetings = list(
+            Meeting.objects.filter(pk__in=meeting_ids, reminder_1hour_sent=False)
+            .select_related('creator')
+            .prefetch_related('members')
+            .select_for_update(skip_locked=True, of=('self',))
+        )
+        sent = _send_reminders(meetings)
+        if sent:
+            Meeting.objects.filter(pk__in=[meeting.pk for meeting in sent]).update(reminder_1hour_sent=True)
+
+
+@shared_task(acks_late=True)
+def send_series_reminder_chunk(occurrences):
+    """
+    Отправка напоминаний о повторениях серий встреч. occurrences — пары (id встречи, начало повторения).
+    Строки встреч заблокированы на время отправки, начало повторения записывается в last_reminder_at
+    только для отправленных писем
+    """
+    starts = {meeting_id: datetime.fromisoformat(start) for meeting_id, start in occurrences}
+    with transaction.atomic():
+        due = []
+        for meeting in (Meeting.objects.filter(pk__in=starts)
+                        .select_related('creator')
+                        .prefetch_related('members')
+                        .select_for_update(skip_locked=True, of=('self',))):
+            start = starts[meeting.pk]
+            if meeting.last_reminder_at is not None and meeting.last_reminder_at >= start:
                 continue
-            subject = f'Напоминание: встреча "{meeting.topic}"'
-            html_body = f"""<html>
-            <body>
-            <h2>Напоминание о встрече</h2>
-            <p>Здравствуйте!</p>
-            <p>Встреча <strong>{meeting.topic}</strong> начнётся через ~1 час:</p>
-            <ul>
-            <li><strong>Тема:</strong> {meeting.topic}</li>
-            <li><strong>Дата:</strong> {meeting.date.strftime('%d.%m.%Y')}</li>
-            <li><strong>Время:</strong> {meeting.start_time.strftime('%H:%M')} – {meeting.end_time.strftime('%H:%M')}</li>
-            <li><strong>Создатель:</strong> {meeting.creator.email} ({meeting.creator.last_name} {meeting.creator.first_name})</li>
-            <li><strong>Участники:</strong> {', '.join(u.email for u in meeting.members.all())}</li>
-            </ul>
-            <p>Будьте на связи!</p>
-            <p>С уважением,<br>Система управления бизнесом.</p>
-            </body>
-            </html>"""
-            text_body = strip_tags(html_body)
-            send_mail(
-                subject=subject,
-                message=text_body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=emails,
-                fail_silently=False,
-                html_message=html_body,
-            )
-            meeting.reminder_1hour_sent = True
-            meeting.save(update_fields=['reminder_1hour_sent'])
-            logger.info(f'Напоминание о встрече "{meeting.topic}" отправлено {len(emails)} участникам')
-        except Exception as e:
-            logger.exception(f'Ошибка отправки напоминания о встрече {meeting.topic}: {str(e)}')
+            occurrence = next(meeting.occurrences(start, start + timedelta(microseconds=1)), None)
+            if occurrence is not None:
+                due.append(occurrence)
+        reminded = defaultdict(list)
+        for occurrence in _send_reminders(due):
+            reminded[occurrence.start_at].append(occurrence.pk)
+        for start, meeting_ids in reminded.items():
+            Meeting.objects.filter(pk__in=meeting_ids).update(last_reminder_at=start)
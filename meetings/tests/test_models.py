@@ -1,9 +1,11 @@
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from datetime import time
+from freezegun import freeze_time
 
-from meetings.models import Meeting, get_full_datetime
+from meetings.models import RECURRENCE_WEEKDAYS, Meeting, MeetingParticipant, get_full_datetime
 
 
 @pytest.mark.models
@@ -73,6 +75,20 @@ class TestMeetingModel:
         assert meet.full_start_time == get_full_datetime(self.meeting_data['date'], self.meeting_data['start_time'])
         assert meet.full_end_time == get_full_datetime(self.meeting_data['date'], self.meeting_data['end_time'])
 
+    def test_start_end_at_synced(self):
+        """
+        Тест на заполнение времени начала и окончания при сохранении
+        """
+        meet = Meeting.objects.create(**self.meeting_data)
+        assert meet.start_at == meet.full_start_time
+        assert meet.end_at == meet.full_end_time
+        meet.start_time = time(12, 0)
+        meet.end_time = time(13, 0)
+        meet.save(update_fields=['start_time', 'end_time'])
+        meet.refresh_from_db()
+        assert meet.start_at == get_full_datetime(self.meeting_data['date'], time(12, 0))
+        assert meet.end_at == get_full_datetime(self.meeting_data['date'], time(13, 0))
+
     def test_str_representation(self):
         """
         Тест на __str__
@@ -88,3 +104,162 @@ class TestMeetingModel:
         """
         fields = Meeting._meta.ordering
         assert fields == ['creator', 'date']
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+class TestMeetingParticipantModel:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_user, user_data, meeting_data):
+        self.admin = create_superuser(**admin_user_data)
+        self.user1 = create_user(**user_data[0])
+        self.user2 = create_user(**user_data[1])
+        self.meeting_data = meeting_data
+        self.meeting = Meeting.objects.create(creator=self.admin, **meeting_data)
+        self.meeting.members.add(self.user1, self.user2)
+
+    def _user_ids(self):
+        return set(MeetingParticipant.objects.filter(meeting=self.meeting).values_list('user_id', flat=True))
+
+    def test_participants_synced_with_members(self):
+        """
+        Тест на синхронизацию записей участия с участниками и создателем встречи
+        """
+        assert self._user_ids() == {self.admin.id, self.user1.id, self.user2.id}
+        self.meeting.members.remove(self.user1)
+        assert self._user_ids() == {self.admin.id, self.user2.id}
+        self.user2.meeting_members.remove(self.meeting)
+        assert self._user_ids() == {self.admin.id}
+        self.user1.meeting_members.add(self.meeting)
+        assert self._user_ids() == {self.admin.id, self.user1.id}
+        self.meeting.members.clear()
+        assert self._user_ids() == {self.admin.id}
+
+    def test_participants_time_follows_meeting(self):
+        """
+        Тест на перенос времени встречи в записи участия
+        """
+        self.meeting.start_time = time(14, 0)
+        self.meeting.end_time = time(15, 0)
+        self.meeting.save()
+        for participant in MeetingParticipant.objects.filter(meeting=self.meeting):
+            assert participant.during.lower == self.meeting.full_start_time
+            assert participant.during.upper == self.meeting.full_end_time
+
+    def test_overlap_rejected_by_database(self):
+        """
+        Тест на запрет пересекающихся встреч одного участника на уровне БД
+        """
+        other = Meeting.objects.create(creator=self.user2, topic='other', date=self.meeting_data['date'],
+                                       start_time=time(12, 0), end_time=time(13, 0))
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                other.members.add(self.user1)
+                other.start_time = time(10, 30)
+                other.save()
+
+    def test_adjacent_meetings_allowed(self):
+        """
+        Тест на возможность встреч, идущих подряд
+        """
+        other = Meeting.objects.create(creator=self.user2, topic='other', date=self.meeting_data['date'],
+                                       start_time=self.meeting_data['end_time'], end_time=time(12, 0))
+        other.members.add(self.user1)
+        assert MeetingParticipant.objects.filter(user=self.user1).count() == 2
+
+
+@pytest.mark.models
+@pytest.mark.django_db
+class TestMeetingRecurrence:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_user, user_data, meeting_data):
+        self.admin = create_superuser(**admin_user_data)
+        self.user = create_user(**user_data[0])
+        self.meeting_data = meeting_data
+        self.day = meeting_data['date']
+
+    def _create_series(self, recurrence):
+        meeting = Meeting.objects.create(creator=self.admin, recurrence=recurrence, **self.meeting_data)
+        meeting.members.add(self.user)
+        return meeting
+
+    @pytest.mark.parametrize(
+        'recurrence',
+        [
+            'FREQ=YEARLY;COUNT=2',
+            'FREQ=WEEKLY',
+            'FREQ=WEEKLY;COUNT=2;UNTIL=20991231',
+            'FREQ=WEEKLY;BYSETPOS=1;COUNT=2',
+            'FREQ=WEEKLY;BYDAY=XX;COUNT=2',
+            'FREQ=WEEKLY;COUNT=abc',
+            'weekly',
+        ]
+    )
+    def test_invalid_recurrence(self, recurrence):
+        """
+        Тест на неверное правило повторения
+        """
+        with pytest.raises(ValidationError) as e:
+            self._create_series(recurrence)
+        assert 'recurrence' in e.value.message_dict
+
+    def test_recurrence_must_start_on_meeting_date(self):
+        """
+        Тест на несовпадение даты встречи с первым повторением
+        """
+        other_day = RECURRENCE_WEEKDAYS[(self.day.weekday() + 1) % 7]
+        with pytest.raises(ValidationError) as e:
+            self._create_series(f'FREQ=WEEKLY;BYDAY={other_day};COUNT=3')
+        assert 'первым повторением' in str(e.value)
+
+    def test_recurrence_max_occurrences(self, settings):
+        """
+        Тест на ограничение количества повторений
+        """
+        settings.MEETING_MAX_OCCURRENCES = 5
+        with pytest.raises(ValidationError) as e:
+            self._create_series('FREQ=DAILY;COUNT=6')
+        assert 'recurrence' in e.value.message_dict
+
+    def test_series_occurrences(self):
+        """
+        Тест на разворачивание повторений серии в пределах периода
+        """
+        meeting = self._create_series('FREQ=WEEKLY;COUNT=4')
+        assert meeting.series_end_at == get_full_datetime(self.day + timezone.timedelta(weeks=3),
+                                                          self.meeting_data['end_time'])
+        window_start = get_full_datetime(self.day + timezone.timedelta(days=1), time(0, 0))
+        window_end = get_full_datetime(self.day + timezone.timedelta(weeks=3), time(0, 0))
+        occurrences = list(meeting.occurrences(window_start, window_end))
+        assert [o.date for o in occurrences] == [self.day + timezone.timedelta(weeks=1),
+                                                 self.day + timezone.timedelta(weeks=2)]
+        assert occurrences[0].start_at == get_full_datetime(occurrences[0].date, self.meeting_data['start_time'])
+        assert list(occurrences[0].members.all()) == [self.user]
+        assert Meeting.objects.get(pk=meeting.pk).date == self.day
+
+    def test_series_participants(self):
+        """
+        Тест на создание записей участия для каждого повторения серии
+        """
+        meeting = self._create_series('FREQ=DAILY;INTERVAL=2;COUNT=3')
+        assert MeetingParticipant.objects.filter(meeting=meeting).count() == 6
+        other = Meeting(creator=self.user, topic='other', date=self.day + timezone.timedelta(days=4),
+                        start_time=time(10, 30), end_time=time(11, 30))
+        with pytest.raises(IntegrityError):
+            with transaction.atomic():
+                other.save()
+
+    def test_running_series_start_checked_on_change(self):
+        """
+        Тест на проверку начала идущей серии только при его изменении
+        """
+        self.meeting_data['date'] = self.day - timezone.timedelta(days=5)
+        with freeze_time(timezone.now() - timezone.timedelta(days=5)):
+            meeting = self._create_series('FREQ=DAILY;COUNT=10')
+        meeting = Meeting.objects.get(pk=meeting.pk)
+        meeting.topic = 'new topic'
+        meeting.save()
+        meeting.start_time = time(9, 0)
+        with pytest.raises(ValidationError) as e:
+            meeting.save()
+        assert 'start_time' in e.value.message_dict
@@ -1,11 +1,14 @@
-from datetime import time, timedelta
+from datetime import datetime, time, timedelta
 import pytest
+from unittest.mock import patch
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 from freezegun import freeze_time
 
-from meetings.models import Meeting
-from meetings.services import MeetingService
+from meetings.models import Meeting, MeetingParticipant
+from meetings.services import MeetingService, merge_intervals
 
 
 @pytest.mark.services
@@ -87,6 +90,99 @@ class TestCreateMeeting:
             )
         assert self.user1.email in str(e.value)
 
+    def test_create_meeting_concurrent_conflict(self):
+        """
+        Тест на конфликт, возникший между проверкой и созданием встречи
+        """
+        MeetingService.create_meeting(
+            creator=self.admin,
+            topic=self.meet_data['topic'],
+            date=self.meet_data['date'],
+            start_time=self.meet_data['start_time'],
+            end_time=self.meet_data['end_time'],
+            members=[self.user1]
+        )
+        check_conflicts = MeetingService._check_conflicts
+        calls = []
+
+        def skip_first_check(*args, **kwargs):
+            calls.append(args)
+            if len(calls) > 1:
+                check_conflicts(*args, **kwargs)
+
+        with patch.object(MeetingService, '_check_conflicts', side_effect=skip_first_check):
+            with pytest.raises(ValidationError) as e:
+                MeetingService.create_meeting(
+                    creator=self.user2,
+                    topic=self.meet_data['topic'],
+                    date=self.meet_data['date'],
+                    start_time=time(10, 30),
+                    end_time=time(11, 30),
+                    members=[self.user1]
+                )
+        assert self.user1.email in str(e.value)
+        assert Meeting.objects.count() == 1
+
+    def test_create_series_conflict(self):
+        """
+        Тест на конфликт одного из повторений серии со встречей участника
+        """
+        MeetingService.create_meeting(
+            creator=self.user2,
+            topic='single',
+            date=self.meet_data['date'] + timedelta(weeks=2),
+            start_time=time(10, 30),
+            end_time=time(11, 30),
+            members=[self.user1]
+        )
+        with pytest.raises(ValidationError) as e:
+            MeetingService.create_meeting(
+                creator=self.admin,
+                topic=self.meet_data['topic'],
+                date=self.meet_data['date'],
+                start_time=self.meet_data['start_time'],
+                end_time=self.meet_data['end_time'],
+                members=[self.user1],
+                recurrence='FREQ=WEEKLY;COUNT=4'
+            )
+        assert self.user1.email in str(e.value)
+        assert not Meeting.objects.filter(topic=self.meet_data['topic']).exists()
+
+    def test_series_conflicts_checked_in_one_query(self, django_assert_num_queries):
+        """
+        Тест на проверку всех повторений серии одним запросом
+        """
+        meeting = Meeting(date=self.meet_data['date'], start_time=self.meet_data['start_time'],
+                          end_time=self.meet_data['end_time'], recurrence='FREQ=DAILY;COUNT=30')
+        ranges = meeting.occurrence_ranges()
+        assert len(ranges) == 30
+        with django_assert_num_queries(1) as context:
+            MeetingService._check_conflicts([self.user1.id, self.user2.id], ranges)
+        assert ' OR ' not in context.captured_queries[0]['sql']
+
+    def test_series_gap_not_conflict(self):
+        """
+        Тест на отсутствие конфликта со встречей между повторениями серии
+        """
+        MeetingService.create_meeting(
+            creator=self.user2,
+            topic='single',
+            date=self.meet_data['date'] + timedelta(days=3),
+            start_time=self.meet_data['start_time'],
+            end_time=self.meet_data['end_time'],
+            members=[self.user1]
+        )
+        series = MeetingService.create_meeting(
+            creator=self.admin,
+            topic=self.meet_data['topic'],
+            date=self.meet_data['date'],
+            start_time=self.meet_data['start_time'],
+            end_time=self.meet_data['end_time'],
+            members=[self.user1],
+            recurrence='FREQ=WEEKLY;COUNT=4'
+        )
+        assert series.participants.filter(user=self.user1).count() == 4
+
 
 @pytest.mark.services
 @pytest.mark.django_db
@@ -121,6 +217,99 @@ class TestUpdateMeeting:
         assert new_meet.topic == self.new_data['topic']
         assert new_meet.date == self.new_data['date']
 
+    def test_update_topic_skips_membership_writes(self):
+        """
+        Тест на отсутствие записи участников при изменении только темы
+        """
+        self.meet.members.set([self.admin, self.user])
+        members_table = Meeting.members.through._meta.db_table
+        participants_table = MeetingParticipant._meta.db_table
+        with CaptureQueriesContext(connection) as ctx:
+            MeetingService.update_meeting(
+                meeting=self.meet,
+                creator=self.admin,
+                topic='only topic',
+                date=self.meet.date,
+                start_time=self.meet.start_time,
+                end_time=self.meet.end_time,
+                members=None,
+            )
+        writes = [q['sql'] for q in ctx.captured_queries
+                  if q['sql'].startswith(('INSERT', 'DELETE')) and (members_table in q['sql']
+                                                                      or participants_table in q['sql'])]
+        assert writes == []
+        self.meet.refresh_from_db()
+        assert self.meet.topic == 'only topic'
+        assert set(self.meet.members.all()) == {self.admin, self.user}
+
+    def test_update_members_applies_delta(self, create_user, user_data):
+        """
+        Тест на добавление и удаление только изменившихся участников
+        """
+        user2 = create_user(**user_data[1])
+        self.meet.members.set([self.admin, self.user])
+        rows = Meeting.members.through.objects.filter(meeting=self.meet)
+        rows_before = set(rows.values_list('pk', flat=True))
+        MeetingService.update_meeting(
+            meeting=self.meet,
+            creator=self.admin,
+            topic=self.meet.topic,
+            date=self.meet.date,
+            start_time=self.meet.start_time,
+            end_time=self.meet.end_time,
+            members=[user2],
+        )
+        assert set(self.meet.members.all()) == {self.admin, user2}
+        assert len(rows_before & set(rows.values_list('pk', flat=True))) == 1
+        assert set(self.meet.participants.values_list('user_id', flat=True)) == {self.admin.id, user2.id}
+
+    def test_update_members_conflict_checks_added_only(self, create_user, user_data):
+        """
+        Тест на проверку конфликтов только для добавленных участников
+        """
+        user2 = create_user(**user_data[1])
+        MeetingService.create_meeting(
+            creator=user2,
+            topic='busy',
+            date=self.meet.date,
+            start_time=self.meet.start_time,
+            end_time=self.meet.end_time,
+            members=[],
+        )
+        with pytest.raises(ValidationError) as e:
+            MeetingService.update_meeting(
+                meeting=self.meet,
+                creator=self.admin,
+                topic=self.meet.topic,
+                date=self.meet.date,
+                start_time=self.meet.start_time,
+                end_time=self.meet.end_time,
+                members=[self.user, user2],
+            )
+        assert user2.email in str(e.value)
+        assert self.user.email not in str(e.value)
+
+    def test_update_meeting_to_series(self):
+        """
+        Тест на превращение встречи в серию
+        """
+        Meeting.objects.filter(pk=self.meet.pk).update(reminder_1hour_sent=True)
+        self.meet.refresh_from_db()
+        meeting = MeetingService.update_meeting(
+            meeting=self.meet,
+            creator=self.admin,
+            topic=self.meet.topic,
+            date=self.meet.date,
+            start_time=self.meet.start_time,
+            end_time=self.meet.end_time,
+            members=[self.user],
+            recurrence='FREQ=DAILY;COUNT=3'
+        )
+        meeting.refresh_from_db()
+        assert meeting.recurrence == 'FREQ=DAILY;COUNT=3'
+        assert not meeting.reminder_1hour_sent
+        assert meeting.participants.count() == 6
+
     def test_update_completed_meeting(self, meeting_data):
         """
         Тест на обновление прошедшей встречи
@@ -145,6 +334,35 @@ class TestUpdateMeeting:
             )
         assert 'Нельзя редактировать прошедшую встречу' in str(e.value)
 
+    def test_update_running_series(self, meeting_data):
+        """
+        Тест на изменение темы и участников идущей серии без сдвига её начала
+        """
+        with freeze_time(timezone.now() - timedelta(days=3)):
+            series = MeetingService.create_meeting(
+                creator=self.admin,
+                topic=meeting_data['topic'],
+                date=timezone.now().date() + timedelta(days=1),
+                start_time=time(15, 0),
+                end_time=time(16, 0),
+                members=[],
+                recurrence='FREQ=DAILY;COUNT=10',
+            )
+        series = Meeting.objects.get(pk=series.pk)
+        MeetingService.update_meeting(
+            meeting=series,
+            creator=self.admin,
+            topic='new topic',
+            date=series.date,
+            start_time=series.start_time,
+            end_time=series.end_time,
+            members=[self.user],
+            recurrence=series.recurrence,
+        )
+        series.refresh_from_db()
+        assert series.topic == 'new topic'
+        assert set(series.members.all()) == {self.admin, self.user}
+
     def test_update_meeting_conflict_members(self, meeting_data, admin_user_data, create_superuser):
         """
         Тест на обновление встречи с конфликтом участника
@@ -174,3 +392,88 @@ class TestUpdateMeeting:
                 members=self.new_data['members']
             )
         assert 'Следующие пользователи уже участвуют в другой встрече' in str(e.value)
+
+
+@pytest.mark.services
+def test_merge_intervals():
+    """
+    Тест на объединение пересекающихся и смежных интервалов
+    """
+    assert merge_intervals([(5, 7), (1, 3), (2, 4), (7, 8), (10, 11)]) == [(1, 4), (5, 8), (10, 11)]
+    assert merge_intervals([(1, 10), (2, 3)]) == [(1, 10)]
+    assert merge_intervals([]) == []
+
+
+@pytest.mark.services
+@pytest.mark.django_db
+class TestGetFreeBusy:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_user, user_data, meeting_data):
+        self.admin = create_superuser(**admin_user_data)
+        self.user1 = create_user(**user_data[0])
+        self.user2 = create_user(**user_data[1])
+        self.day = meeting_data['date']
+        MeetingService.create_meeting(creator=self.admin, topic='first', date=self.day, start_time=time(10, 0),
+                                      end_time=time(11, 0), members=[self.user1])
+        MeetingService.create_meeting(creator=self.user2, topic='second', date=self.day, start_time=time(10, 30),
+                                      end_time=time(12, 0), members=[])
+        MeetingService.create_meeting(creator=self.user2, topic='third', date=self.day, start_time=time(13, 0),
+                                      end_time=time(13, 30), members=[])
+
+    def _at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def _free_busy(self, members, **kwargs):
+        params = {
+            'members': members,
+            'start_date': self.day,
+            'end_date': self.day,
+            'duration': timedelta(minutes=60),
+            'day_start': time(9, 0),
+            'day_end': time(18, 0),
+            'limit': 5,
+        }
+        params.update(kwargs)
+        return MeetingService.get_free_busy(**params)
+
+    def test_free_busy_merges_members(self, django_assert_num_queries):
+        """
+        Тест на объединение занятости участников одним запросом
+        """
+        with django_assert_num_queries(1):
+            result = self._free_busy([self.user1, self.user2])
+        assert result['busy'] == [
+            {'start': self._at(self.day, 10), 'end': self._at(self.day, 12)},
+            {'start': self._at(self.day, 13), 'end': self._at(self.day, 13, 30)},
+        ]
+        assert result['free'] == [
+            {'start': self._at(self.day, 9), 'end': self._at(self.day, 10)},
+            {'start': self._at(self.day, 12), 'end': self._at(self.day, 13)},
+            {'start': self._at(self.day, 13, 30), 'end': self._at(self.day, 18)},
+        ]
+
+    def test_free_busy_only_requested_members(self):
+        """
+        Тест на учёт занятости только запрошенных участников
+        """
+        result = self._free_busy([self.user1])
+        assert result['busy'] == [{'start': self._at(self.day, 10), 'end': self._at(self.day, 11)}]
+
+    def test_free_busy_duration_and_limit(self):
+        """
+        Тест на отбор окон по длительности и ограничение их количества
+        """
+        next_day = self.day + timedelta(days=1)
+        result = self._free_busy([self.user1, self.user2], end_date=next_day, duration=timedelta(hours=3), limit=2)
+        assert result['free'] == [
+            {'start': self._at(self.day, 13, 30), 'end': self._at(self.day, 18)},
+            {'start': self._at(next_day, 9), 'end': self._at(next_day, 18)},
+        ]
+
+    def test_free_busy_skips_past(self):
+        """
+        Тест на исключение прошедшего времени из свободных окон
+        """
+        with freeze_time(self._at(self.day, 14)):
+            result = self._free_busy([self.user1, self.user2])
+        assert result['free'] == [{'start': self._at(self.day, 14), 'end': self._at(self.day, 18)}]
@@ -0,0 +1,162 @@
+from datetime import time
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+from freezegun import freeze_time
+
+from meetings.models import Meeting
+from meetings.tasks import send_meeting_reminders, send_meeting_reminder_chunk
+from tasks.tests.test_tasks import CountingEmailBackend
+
+
+@pytest.mark.tasks
+@pytest.mark.django_db
+class TestSendMeetingReminders:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_user, user_data, mailoutbox, celery_eager):
+        self.admin = create_superuser(**admin_user_data)
+        self.user = create_user(**user_data[0])
+        self.mailoutbox = mailoutbox
+
+    def _create_meeting(self, start):
+        start = timezone.localtime(start)
+        meeting = Meeting.objects.create(
+            creator=self.admin,
+            topic=f'meeting {start:%H:%M}',
+            date=start.date(),
+            start_time=start.time().replace(microsecond=0),
+            end_time=(start + timezone.timedelta(minutes=30)).time().replace(microsecond=0),
+        )
+        meeting.members.add(self.user)
+        return meeting
+
+    def test_send_reminder_in_window(self):
+        """
+        Тест на отправку напоминания о встрече, начинающейся примерно через час
+        """
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            meeting = self._create_meeting(now + timezone.timedelta(hours=1))
+            early = self._create_meeting(now + timezone.timedelta(minutes=30))
+            late = self._create_meeting(now + timezone.timedelta(minutes=90))
+        with freeze_time(now):
+            send_meeting_reminders()
+        meeting.refresh_from_db()
+        early.refresh_from_db()
+        late.refresh_from_db()
+        assert meeting.reminder_1hour_sent
+        assert not early.reminder_1hour_sent
+        assert not late.reminder_1hour_sent
+        assert len(self.mailoutbox) == 1
+        assert set(self.mailoutbox[0].to) == {self.admin.email, self.user.email}
+
+    def test_skip_reminded_meeting(self):
+        """
+        Тест на пропуск встречи, о которой уже напомнили
+        """
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            meeting = self._create_meeting(now + timezone.timedelta(hours=1))
+        Meeting.objects.filter(pk=meeting.pk).update(reminder_1hour_sent=True)
+        with freeze_time(now):
+            send_meeting_reminders()
+        assert len(self.mailoutbox) == 0
+
+    @pytest.mark.parametrize(
+        'batch_size, expected_connections',
+        [
+            (100, 1),
+            (2, 2),
+            (1, 3),
+        ]
+    )
+    def test_reminders_reuse_connection(self, settings, create_user, batch_size, expected_connections):
+        """
+        Тест на отправку напоминаний о встречах через одно соединение на пачку писем
+        """
+        settings.EMAIL_BACKEND = 'tasks.tests.test_tasks.CountingEmailBackend'
+        settings.EMAIL_BATCH_SIZE = batch_size
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        start = now + timezone.timedelta(hours=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            for i in range(3):
+                creator = create_user(email=f'creator{i}@example.com', first_name='first', last_name='last')
+                Meeting.objects.create(creator=creator, topic=f'meeting {i}', date=start.date(),
+                                       start_time=start.time(), end_time=time(13, 30))
+        CountingEmailBackend.opened = 0
+        with freeze_time(now):
+            send_meeting_reminders()
+        assert CountingEmailBackend.opened == expected_connections
+        assert len(self.mailoutbox) == 3
+        assert Meeting.objects.filter(reminder_1hour_sent=True).count() == 3
+
+    def test_crashed_chunk_sent_on_retry(self):
+        """
+        Тест на повторную отправку напоминания пачки, упавшей во время отправки
+        """
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            meeting = self._create_meeting(now + timezone.timedelta(hours=1))
+        with patch('meetings.tasks.send_messages_in_chunks', side_effect=SystemExit):
+            with pytest.raises(SystemExit):
+                send_meeting_reminder_chunk([meeting.pk])
+        meeting.refresh_from_db()
+        assert not meeting.reminder_1hour_sent
+        send_meeting_reminder_chunk([meeting.pk])
+        meeting.refresh_from_db()
+        assert meeting.reminder_1hour_sent
+        assert len(self.mailoutbox) == 1
+
+    def test_reminder_across_midnight(self):
+        """
+        Тест на напоминание о встрече, начинающейся после полуночи
+        """
+        now = timezone.localtime().replace(hour=23, minute=30, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            meeting = self._create_meeting(now + timezone.timedelta(hours=1))
+        with freeze_time(now):
+            send_meeting_reminders()
+        meeting.refresh_from_db()
+        assert meeting.reminder_1hour_sent
+        assert len(self.mailoutbox) == 1
+
+    def test_series_reminder_once_per_occurrence(self):
+        """
+        Тест на напоминание о каждом повторении серии ровно один раз
+        """
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            start = now + timezone.timedelta(hours=1)
+            series = Meeting.objects.create(creator=self.admin, topic='series', date=start.date(),
+                                            start_time=start.time(), end_time=time(13, 30),
+                                            recurrence='FREQ=DAILY;COUNT=3')
+            series.members.add(self.user)
+        with freeze_time(now):
+            send_meeting_reminders()
+            send_meeting_reminders()
+        series.refresh_from_db()
+        assert series.last_reminder_at == start
+        assert len(self.mailoutbox) == 1
+        with freeze_time(now + timezone.timedelta(days=1)):
+            send_meeting_reminders()
+        series.refresh_from_db()
+        assert series.last_reminder_at == start + timezone.timedelta(days=1)
+        assert len(self.mailoutbox) == 2
+        assert (start + timezone.timedelta(days=1)).strftime('%d.%m.%Y') in self.mailoutbox[1].alternatives[0][0]
+
+    def test_series_reminder_released_on_failure(self, settings):
+        """
+        Тест на восстановление отметки напоминания серии при ошибке отправки
+        """
+        settings.EMAIL_BACKEND = 'tasks.tests.test_tasks.FailingEmailBackend'
+        now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) + timezone.timedelta(days=1)
+        with freeze_time(now - timezone.timedelta(hours=2)):
+            start = now + timezone.timedelta(hours=1)
+            series = Meeting.objects.create(creator=self.admin, topic='series', date=start.date(),
+                                            start_time=start.time(), end_time=time(13, 30),
+                                            recurrence='FREQ=DAILY;COUNT=3')
+        with freeze_time(now):
+            send_meeting_reminders()
+        series.refresh_from_db()
+        assert series.last_reminder_at is None
@@ -3,7 +3,12 @@ import pytest
 from django.urls import reverse
 from django.utils import timezone
 
+from django.contrib.auth import get_user_model
+
 from meetings.models import Meeting
+from teams.models import Team
+
+User = get_user_model()
 
 
 @pytest.mark.views
@@ -32,6 +37,29 @@ class TestMeetingCreateView:
         assert self.user1.email in members_emails
         assert self.user2.email in members_emails
 
+    def test_create_series_success(self):
+        """
+        Тест на успешное создание серии встреч
+        """
+        self.client.force_authenticate(self.admin)
+        self.meet_data.update({'members': [self.user1.email], 'recurrence': 'FREQ=WEEKLY;COUNT=5'})
+        response = self.client.post(self.url, data=self.meet_data)
+        assert response.status_code == 201
+        meeting = Meeting.objects.get()
+        assert meeting.recurrence == 'FREQ=WEEKLY;COUNT=5'
+        assert meeting.series_end_at.date() == self.meet_data['date'] + timezone.timedelta(weeks=4)
+
+    def test_create_series_invalid_recurrence(self):
+        """
+        Тест на создание серии встреч с неверным правилом повторения
+        """
+        self.client.force_authenticate(self.admin)
+        self.meet_data.update({'members': [self.user1.email], 'recurrence': 'FREQ=WEEKLY'})
+        response = self.client.post(self.url, data=self.meet_data)
+        assert response.status_code == 400
+        assert 'recurrence' in response.data
+        assert not Meeting.objects.exists()
+
     def test_create_meeting_not_admin(self):
         """
         Тест на создание встречи обычным пользователем
@@ -152,6 +180,76 @@ class TestMeetingListView:
         assert response.status_code == 200
         assert response.data == []
 
+    def test_list_meeting_window_expands_series(self, meeting_data):
+        """
+        Тест на разворачивание повторений серий за период
+        """
+        series = Meeting.objects.create(creator=self.admin, topic='series', date=meeting_data['date'],
+                                        start_time=time(12, 0), end_time=time(13, 0),
+                                        recurrence='FREQ=DAILY;COUNT=10')
+        series.members.add(self.admin)
+        self.client.force_authenticate(self.admin)
+        start = meeting_data['date']
+        end = start + timezone.timedelta(days=2)
+        response = self.client.get(self.url, {'start': start, 'end': end})
+        assert response.status_code == 200
+        assert [(item['topic'], item['date']) for item in response.data] == [
+            (self.meet.topic, str(start)),
+            ('series', str(start)),
+            ('series', str(start + timezone.timedelta(days=1))),
+            ('series', str(end)),
+        ]
+        response = self.client.get(self.url)
+        assert len(response.data) == 11
+
+    def test_list_meeting_invalid_window(self):
+        """
+        Тест на неверный период
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'start': '2026-01-02', 'end': '2026-01-01'})
+        assert response.status_code == 400
+        response = self.client.get(self.url, {'end': '2020-01-01'})
+        assert response.status_code == 400
+        response = self.client.get(self.url, {'start': '2026-01-01', 'end': '2027-01-01'})
+        assert response.status_code == 400
+        assert 'end' in response.data
+
+    def test_list_meeting_constant_queries(self, django_assert_num_queries):
+        """
+        Тест на постоянное количество запросов при 100 встречах по 20 участников: серии, встречи и участники
+        """
+        team = Team.objects.create(name='query team', creator=self.admin)
+        members = User.objects.bulk_create(
+            User(email=f'member{i}@example.com', first_name='member', last_name=str(i), team=team if i % 2 else None)
+            for i in range(19)
+        )
+        start = timezone.now().date() + timezone.timedelta(days=3)
+        for i in range(100):
+            meeting = Meeting.objects.create(creator=self.admin, topic=f'meeting {i}',
+                                             date=start + timezone.timedelta(days=i % 50),
+                                             start_time=time(10 + i // 50, 0), end_time=time(10 + i // 50, 30))
+            meeting.members.add(self.admin, *members)
+        self.client.force_authenticate(self.admin)
+        with django_assert_num_queries(3):
+            response = self.client.get(self.url, {'start': timezone.now().date(), 'end': start + timezone.timedelta(days=50)})
+        assert response.status_code == 200
+        assert len(response.data) == 101
+        assert {m['team_name'] for m in response.data[-1]['members']} == {'query team', None}
+
+    def test_list_meeting_default_window(self):
+        """
+        Тест на период по умолчанию без параметров start и end
+        """
+        far = Meeting.objects.create(creator=self.admin, topic='far',
+                                     date=timezone.now().date() + timezone.timedelta(days=60),
+                                     start_time=time(8, 0), end_time=time(9, 0))
+        far.members.add(self.admin)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+        assert [item['topic'] for item in response.data] == [self.meet.topic]
+
     def test_list_meeting_unauthenticated_user(self):
         """
         Тест на получение списка встреч анонимным пользователем
@@ -201,6 +299,16 @@ class TestMeetingUpdateView:
         assert self.meet.topic == self.new_data['topic']
         assert self.meet.date == meeting_data['date']
 
+    def test_patch_topic_keeps_members(self):
+        """
+        Тест на сохранение участников при частичном обновлении без members
+        """
+        self.meet.members.set([self.admin, self.user])
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data={'topic': self.new_data['topic']})
+        assert response.status_code == 200
+        assert set(self.meet.members.all()) == {self.admin, self.user}
+
     def test_update_someone_else_meeting(self, admin_user_data, create_superuser):
         """
         Тест на обновление чужой встречи
@@ -238,3 +346,90 @@ class TestMeetingUpdateView:
         """
         response = self.client.put(self.url, data=self.new_data)
         assert response.status_code == 401
+
+
+@pytest.mark.views
+@pytest.mark.django_db
+class TestMeetingFreeBusyView:
+    @pytest.fixture(autouse=True)
+    def setup(self, admin_user_data, create_superuser, create_user, user_data, meeting_data, client):
+        self.admin = create_superuser(**admin_user_data)
+        self.user1 = create_user(**user_data[0])
+        self.user2 = create_user(**user_data[1])
+        self.day = meeting_data['date']
+        self.url = reverse('meetings:free-busy')
+        self.client = client
+        self.client.force_authenticate(self.user1)
+        meeting = Meeting.objects.create(creator=self.admin, **meeting_data)
+        meeting.members.add(self.user2)
+
+    def test_free_busy_success(self):
+        """
+        Тест на успешное получение занятости и свободных окон
+        """
+        response = self.client.get(self.url, {
+            'members': [self.user1.email, self.user2.email],
+            'start': self.day,
+            'end': self.day,
+            'duration': 30,
+        })
+        assert response.status_code == 200
+        assert len(response.data['busy']) == 1
+        assert len(response.data['free']) == 2
+
+    def test_free_busy_many_members_queries(self, create_user, django_assert_num_queries):
+        """
+        Тест на поиск участников одним запросом независимо от их количества
+        """
+        emails = [create_user(email=f'member{i}@example.com', first_name='m', last_name='m').email
+                  for i in range(20)]
+        with django_assert_num_queries(2):
+            response = self.client.get(self.url, {
+                'members': emails + [self.user2.email],
+                'start': self.day,
+                'end': self.day,
+                'duration': 30,
+            })
+        assert response.status_code == 200
+        assert len(response.data['busy']) == 1
+
+    def test_free_busy_unknown_members(self):
+        """
+        Тест на одну ошибку со всеми неизвестными email участников
+        """
+        response = self.client.get(self.url, {
+            'members': [self.user1.email, 'b@example.com', 'a@example.com'],
+            'start': self.day,
+            'end': self.day,
+            'duration': 30,
+        })
+        assert response.status_code == 400
+        assert response.data['members'] == ['Пользователи не найдены: a@example.com, b@example.com']
+
+    @pytest.mark.parametrize(
+        'params',
+        [
+            {'start': '2026-01-02', 'end': '2026-01-01', 'duration': 30},
+            {'start': '2026-01-01', 'end': '2026-06-01', 'duration': 30},
+            {'start': '2026-01-01', 'end': '2026-01-01', 'duration': 0},
+            {'start': '2026-01-01', 'end': '2026-01-01', 'duration': 30, 'day_start': '18:00', 'day_end': '09:00'},
+            {'start': '2026-01-01', 'end': '2026-01-01', 'duration': 30, 'members': 'unknown@example.com'},
+            {'end': '2026-01-01', 'duration': 30},
+        ]
+    )
+    def test_free_busy_invalid_params(self, params):
+        """
+        Тест на неверные параметры
+        """
+        params.setdefault('members', self.user1.email)
+        response = self.client.get(self.url, params)
+        assert response.status_code == 400
+
+    def test_free_busy_unauthenticated(self):
+        """
+        Тест на получение занятости анонимным пользователем
+        """
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url, {'members': self.user1.email, 'start': self.day, 'end': self.day,
+                                              'duration': 30})
+        assert response.status_code == 401
@@ -8,4 +8,5 @@ urlpatterns = [
     path('list/', views.MeetingListView.as_view(), name='list'),
     path('<int:pk>/delete/', views.MeetingDeleteView.as_view(), name='delete'),
     path('<int:pk>/update/', views.MeetingUpdateView.as_view(), name='update'),
+    path('free-busy/', views.MeetingFreeBusyView.as_view(), name='free-busy'),
 ]
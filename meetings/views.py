@@ -1,5 +1,8 @@
+from datetime import time, timedelta
 from rest_framework.exceptions import ValidationError as DRFValidationError
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
 from rest_framework.generics import (
     CreateAPIView,
     DestroyAPIView,
@@ -7,11 +10,21 @@ from rest_framework.generics import (
     UpdateAPIView
 )
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import Meeting
-from .serializers import MeetingCreateSerializer, MeetingListSerializer
+from .models import Meeting, get_full_datetime
+from .serializers import (
+    FreeBusyQuerySerializer,
+    FreeBusySerializer,
+    MeetingCreateSerializer,
+    MeetingListSerializer,
+    MeetingWindowSerializer
+)
 from .services import MeetingService
 
+User = get_user_model()
+
 
 class MeetingCreateView(CreateAPIView):
     """
@@ -55,10 +68,25 @@ class MeetingListView(ListAPIView):
         ).select_related(
             'creator'
         ).prefetch_related(
-            'members'
+            Prefetch('members', queryset=User.objects.select_related('team'))
         ).distinct().order_by(
-            'date', 'start_time'
+            'start_at', 'id'
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Возвращает повторения встреч и серий за период start–end. Без параметров период начинается
+        сегодня и длится MEETING_LIST_DEFAULT_DAYS дней
+        """
+        window = MeetingWindowSerializer(data=request.query_params)
+        window.is_valid(raise_exception=True)
+        occurrences = MeetingService.iter_occurrences(
+            self.get_queryset(),
+            get_full_datetime(window.validated_data['start'], time.min),
+            get_full_datetime(window.validated_data['end'] + timedelta(days=1), time.min),
         )
+        serializer = self.get_serializer(occurrences, many=True)
+        return Response(serializer.data)
 
 
 class MeetingUpdateView(UpdateAPIView):
@@ -79,7 +107,8 @@ class MeetingUpdateView(UpdateAPIView):
                 'date': serializer.validated_data.get('date', meeting.date),
                 'start_time': serializer.validated_data.get('start_time', meeting.start_time),
                 'end_time': serializer.validated_data.get('end_time', meeting.end_time),
-                'members': serializer.validated_data.get('members', meeting.members.all()),
+                'members': serializer.validated_data.get('members'),
+                'recurrence': serializer.validated_data.get('recurrence', meeting.recurrence),
             }
             updated_meeting = MeetingService.update_meeting(
                 meeting=meeting,
@@ -89,3 +118,25 @@ class MeetingUpdateView(UpdateAPIView):
             serializer.instance = updated_meeting
         except ValidationError as e:
             raise DRFValidationError(e.message_dict)
+
+
+class MeetingFreeBusyView(APIView):
+    """
+    Занятость участников и ближайшие общие свободные окна
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        serializer = FreeBusyQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        result = MeetingService.get_free_busy(
+            members=data['members'],
+            start_date=data['start'],
+            end_date=data['end'],
+            duration=data['duration'],
+            day_start=data['day_start'],
+            day_end=data['day_end'],
+            limit=data['limit'],
+        )
+        return Response(FreeBusySerializer(result).data)
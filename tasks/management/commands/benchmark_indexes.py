@@ -0,0 +1,208 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from meetings.models import Meeting
+from tasks.models import Task, Comment
+from tasks.services import TaskService
+from teams.models import Team
+from users.services import filter_users
+
+User = get_user_model()
+
+INDEX_NAMES = (
+    'task_assigned_deadline_idx',
+    'task_created_by_deadline_idx',
+    'task_active_deadline_idx',
+    'task_assignee_status_crt_idx',
+    'task_assignee_status_dl_idx',
+    'task_author_status_crt_idx',
+    'task_author_status_dl_idx',
+    'meeting_start_at_idx',
+    'meeting_start_not_reminded_idx',
+    'task_search_vector_idx',
+    'comment_search_vector_idx',
+    'user_created_idx',
+    'user_role_email_idx',
+    'user_email_prefix_idx',
+    'user_first_name_prefix_idx',
+    'user_last_name_prefix_idx',
+)
+
+SEARCH_WORDS = (
+    'отчёт', 'релиз', 'сервер', 'миграция', 'клиент', 'бюджет', 'документация', 'тестирование',
+    'дизайн', 'встреча', 'договор', 'оплата', 'интеграция', 'поддержка', 'аналитика', 'уникальный',
+)
+
+
+class Command(BaseCommand):
+    """
+    Сравнение планов запросов напоминаний и календаря с индексами и без них.
+    Данные создаются внутри транзакции и откатываются по завершении, но до отката транзакция
+    держит эксклюзивные блокировки таблиц. Поэтому команда запускается только с явным
+    --i-know на отдельной БД (--database)
+    """
+    help = 'Наполняет БД тестовыми данными и выводит EXPLAIN ANALYZE запросов с индексами и без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1_000_000, help='Количество задач')
+        parser.add_argument('--meetings', type=int, default=100_000, help='Количество встреч')
+        parser.add_argument('--comments', type=int, default=1_000_000, help='Количество комментариев')
+        parser.add_argument('--users', type=int, default=1_000, help='Количество пользователей')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Алиас БД для бенчмарка')
+        parser.add_argument('--i-know', action='store_true',
+                            help='Подтверждение, что --database указывает на БД, которую можно блокировать')
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        connection = connections[self.using]
+        if not options['i_know']:
+            raise CommandError(
+                f'Бенчмарк блокирует таблицы и удаляет индексы в БД {connection.settings_dict["NAME"]!r}. '
+                'Укажите отдельную БД через --database и добавьте --i-know'
+            )
+        if connection.vendor != 'postgresql':
+            self.stderr.write('Бенчмарк поддерживает только PostgreSQL')
+            return
+        with transaction.atomic(using=self.using):
+            user_ids = self._seed(options['users'], options['tasks'], options['meetings'], options['comments'])
+            user = User.objects.using(self.using).get(pk=user_ids[len(user_ids) // 2])
+            self.stdout.write(self.style.MIGRATE_HEADING('С индексами'))
+            self._explain_all(user)
+            with connection.cursor() as cursor:
+                for name in INDEX_NAMES:
+                    cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(name)}')
+                cursor.execute(f'ANALYZE {Task._meta.db_table}, {Meeting._meta.db_table}, {Comment._meta.db_table}, '
+                               f'{User._meta.db_table}')
+            self.stdout.write(self.style.MIGRATE_HEADING('Без индексов'))
+            self._explain_all(user)
+            transaction.set_rollback(True, using=self.using)
+
+    def _seed(self, users_count, tasks_count, meetings_count, comments_count):
+        self.stdout.write(f'Создание {users_count} пользователей, {tasks_count} задач, {meetings_count} встреч, '
+                          f'{comments_count} комментариев...')
+        connection = connections[self.using]
+        admin = User.objects.using(self.using).create(email='benchmark-admin@example.com', first_name='bench', last_name='admin',
+                                    role=User.Role.ADMIN, is_staff=True)
+        team = Team.objects.using(self.using).create(name='benchmark', creator=admin)
+        users = User.objects.using(self.using).bulk_create(
+            User(email=f'benchmark-{i}@example.com', first_name='bench', last_name=str(i), team=team)
+            for i in range(users_count)
+        )
+        user_ids = [u.pk for u in users]
+        members_field = Meeting._meta.get_field('members')
+        members_table = members_field.m2m_db_table()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Task._meta.db_table} (
+                    title, description, deadline, status, created_by_id, assigned_to_id, team_id,
+                    created_at, updated_at, reminder_7days_sent, reminder_1day_sent
+                )
+                SELECT
+                    'task ' || i, '',
+                    now() + ((i %% 1460) - 730) * interval '12 hours' + (i %% 97) * interval '1 minute',
+                    CASE WHEN i %% 10 < 8 THEN 'done' WHEN i %% 10 = 8 THEN 'open' ELSE 'in_progress' END,
+                    (%(ids)s::bigint[])[1 + (i * 7) %% %(n)s],
+                    (%(ids)s::bigint[])[1 + i %% %(n)s],
+                    %(team)s, now(), now(), false, false
+                FROM generate_series(1, %(count)s) AS i
+                """,
+                {'ids': user_ids, 'n': len(user_ids), 'team': team.pk, 'count': tasks_count}
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Meeting._meta.db_table} (
+                    topic, date, start_time, end_time, creator_id, reminder_1hour_sent, recurrence, start_at, end_at
+                )
+                SELECT
+                    topic, date, start_time, end_time, creator_id, reminder_1hour_sent, '',
+                    (date + start_time) AT TIME ZONE %(tz)s,
+                    (date + end_time) AT TIME ZONE %(tz)s
+                FROM (
+                    SELECT
+                        'meeting ' || i AS topic,
+                        current_date + ((i %% 730) - 365) AS date,
+                        time '08:00' + (i %% 20) * interval '30 minutes' AS start_time,
+                        time '08:30' + (i %% 20) * interval '30 minutes' AS end_time,
+                        (%(ids)s::bigint[])[1 + i %% %(n)s] AS creator_id,
+                        (i %% 730) < 365 AS reminder_1hour_sent
+                    FROM generate_series(1, %(count)s) AS i
+                ) AS m
+                """,
+                {'ids': user_ids, 'n': len(user_ids), 'count': meetings_count, 'tz': settings.TIME_ZONE}
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {members_table} ({members_field.m2m_column_name()}, {members_field.m2m_reverse_name()})
+                SELECT m.id, (%(ids)s::bigint[])[1 + (m.id * k) %% %(n)s]
+                FROM {Meeting._meta.db_table} AS m CROSS JOIN generate_series(1, 3) AS k
+                ON CONFLICT DO NOTHING
+                """,
+                {'ids': user_ids, 'n': len(user_ids)}
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO {Comment._meta.db_table} (task_id, author_id, text, created_at)
+                SELECT
+                    t.first_id + i %% t.count,
+                    (%(ids)s::bigint[])[1 + i %% %(n)s],
+                    (%(words)s::text[])[1 + i %% 15] || ' ' || (%(words)s::text[])[1 + (i / 15) %% 15]
+                        || CASE WHEN i %% 100000 = 0 THEN ' ' || %(rare)s ELSE '' END,
+                    now()
+                FROM generate_series(1, %(count)s) AS i,
+                     (SELECT min(id) AS first_id, count(*) AS count FROM {Task._meta.db_table}) AS t
+                """,
+                {'ids': user_ids, 'n': len(user_ids), 'count': comments_count,
+                 'words': list(SEARCH_WORDS[:-1]), 'rare': SEARCH_WORDS[-1]}
+            )
+            cursor.execute(
+                f'ANALYZE {Task._meta.db_table}, {Meeting._meta.db_table}, {members_table}, {Comment._meta.db_table}, '
+                f'{User._meta.db_table}'
+            )
+        return user_ids
+
+    def _explain_all(self, user):
+        now = timezone.now()
+        querysets = {
+            'Напоминания о дедлайнах (окно 7 дней)': Task.objects.filter(
+                status__in=[Task.Status.OPEN, Task.Status.IN_PROGRESS],
+                assigned_to__isnull=False,
+                deadline__range=(now + timedelta(days=6, hours=12), now + timedelta(days=7, hours=12)),
+            ),
+            'Календарь: задачи пользователя за месяц': Task.objects.filter(
+                Q(assigned_to=user) | Q(created_by=user),
+                deadline__gte=now,
+                deadline__lt=now + timedelta(days=30),
+            ).order_by('deadline'),
+            'Календарь: встречи пользователя за месяц': Meeting.objects.filter(
+                members=user,
+                start_at__gte=now,
+                start_at__lt=now + timedelta(days=30),
+            ).order_by('start_at', 'id'),
+            'Список задач исполнителя: открытые по сроку': Task.objects.filter(
+                assigned_to=user,
+                status=Task.Status.OPEN,
+            ).order_by('deadline', 'id')[:50],
+            'Список задач автора: выполненные по дате создания': Task.objects.filter(
+                created_by=user,
+                status=Task.Status.DONE,
+            ).order_by('-created_at', '-id')[:50],
+            'Напоминания о встречах': Meeting.objects.filter(
+                reminder_1hour_sent=False,
+                start_at__range=(now + timedelta(minutes=50), now + timedelta(minutes=70)),
+            ),
+            'Поиск по задачам и комментариям': TaskService.search_tasks(user=user, text=SEARCH_WORDS[-1], limit=20),
+            'Список пользователей: поиск по началу email': filter_users(
+                User.objects.all(), search=user.email[:12]
+            ).order_by('email')[:50],
+            'Список пользователей: новые по дате регистрации': User.objects.order_by('-created_at', '-id')[:50],
+        }
+        for label, qs in querysets.items():
+            self.stdout.write(self.style.SUCCESS(label))
+            self.stdout.write(qs.using(self.using).explain(analyze=True))
+            self.stdout.write('')
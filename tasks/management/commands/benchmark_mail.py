@@ -0,0 +1,47 @@
+import time
+from django.core.mail import get_connection, send_mail
+from django.core.management.base import BaseCommand
+
+from final_project.mail import build_html_message, send_messages_in_chunks
+
+
+class Command(BaseCommand):
+    """
+    Сравнение пропускной способности отправки писем по одному соединению на письмо
+    и через общее соединение. Требует локальный SMTP-сервер, например:
+    python -m aiosmtpd -n -l localhost:1025
+    """
+    help = 'Замеряет количество отправленных писем в секунду с переиспользованием соединения и без него'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost', help='Хост SMTP-сервера')
+        parser.add_argument('--port', type=int, default=1025, help='Порт SMTP-сервера')
+        parser.add_argument('--messages', type=int, default=500, help='Количество писем')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Писем на одно соединение')
+
+    def handle(self, *args, **options):
+        backend = 'django.core.mail.backends.smtp.EmailBackend'
+        smtp = {'host': options['host'], 'port': options['port']}
+        html_body = '<html><body><p>Тестовое письмо</p></body></html>'
+        count = options['messages']
+
+        started = time.perf_counter()
+        for i in range(count):
+            send_mail(
+                subject=f'benchmark {i}',
+                message=html_body,
+                from_email=None,
+                recipient_list=[f'benchmark-{i}@example.com'],
+                html_message=html_body,
+                connection=get_connection(backend, **smtp),
+            )
+        self._report('send_mail на каждое письмо', count, time.perf_counter() - started)
+
+        messages = [build_html_message(f'benchmark {i}', html_body, [f'benchmark-{i}@example.com'])
+                    for i in range(count)]
+        started = time.perf_counter()
+        sent = send_messages_in_chunks(messages, options['chunk_size'], get_connection(backend, **smtp))
+        self._report('Общее соединение', len(sent), time.perf_counter() - started)
+
+    def _report(self, label, count, elapsed):
+        self.stdout.write(f'{label}: {count} писем за {elapsed:.2f} с ({count / elapsed:.1f} писем/с)')
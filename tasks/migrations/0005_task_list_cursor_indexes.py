@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 03:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_overdue_reminder_last_sent_and_more'),
+        ('teams', '0002_alter_team_options_team_creator_team_description_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', '-created_at', '-id'], name='task_assigned_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='task_created_by_created_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 03:36
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_list_cursor_indexes'),
+    ]
+
+    # Хранимые генерируемые колонки заполняются перезаписью таблиц задач и комментариев
+    # под эксклюзивной блокировкой, поэтому миграция выполняется в окно обслуживания.
+    # GIN-индексы по ним строятся отдельно, без блокировки записи, в 0008
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('text', config='russian'), output_field=django.contrib.postgres.search.SearchVectorField(), verbose_name='Поисковый вектор'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='russian', weight='A'), '||', django.contrib.postgres.search.SearchVector('description', config='russian', weight='B'), django.contrib.postgres.search.SearchConfig('russian')), output_field=django.contrib.postgres.search.SearchVectorField(), verbose_name='Поисковый вектор'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-18 03:40
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0008_task_comment_search_vector_indexes'),
+        ('teams', '0002_alter_team_options_team_creator_team_description_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'deadline', 'id'], name='task_assigned_deadline_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'deadline', 'id'], name='task_created_by_deadline_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('assigned_to__isnull', False), ('status__in', ['open', 'in_progress'])), fields=['deadline'], name='task_active_deadline_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', '-created_at', '-id'], name='task_assignee_status_crt_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', 'deadline', 'id'], name='task_assignee_status_dl_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'status', '-created_at', '-id'], name='task_author_status_crt_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['created_by', 'status', 'deadline', 'id'], name='task_author_status_dl_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth import get_user_model
@@ -7,6 +9,8 @@ from teams.models import Team
 
 User = get_user_model()
 
+SEARCH_CONFIG = 'russian'
+
 
 def validate_future_date(value):
     if value and value < timezone.now():
@@ -36,11 +40,56 @@ class Task(models.Model):
     reminder_1day_sent = models.BooleanField(default=False, verbose_name='Напоминание за 1 день отправлено')
     overdue_reminder_last_sent = models.DateField(null=True, blank=True,
                                                   verbose_name='Дата последнего напоминания о проcрочке')
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name='Поисковый вектор',
+    )
 
     class Meta:
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
         ordering = ['created_by', '-created_at']
+        indexes = [
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='task_assigned_created_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='task_created_by_created_idx'),
+            models.Index(fields=['assigned_to', 'deadline', 'id'], name='task_assigned_deadline_idx'),
+            models.Index(fields=['created_by', 'deadline', 'id'], name='task_created_by_deadline_idx'),
+            models.Index(fields=['assigned_to', 'status', '-created_at', '-id'], name='task_assignee_status_crt_idx'),
+            models.Index(fields=['assigned_to', 'status', 'deadline', 'id'], name='task_assignee_status_dl_idx'),
+            models.Index(fields=['created_by', 'status', '-created_at', '-id'], name='task_author_status_crt_idx'),
+            models.Index(fields=['created_by', 'status', 'deadline', 'id'], name='task_author_status_dl_idx'),
+            models.Index(
+                fields=['deadline'],
+                name='task_active_deadline_idx',
+                condition=models.Q(status__in=['open', 'in_progress'], assigned_to__isnull=False),
+            ),
+            GinIndex(fields=['search_vector'], name='task_search_vector_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'assigned_to_id' in field_names:
+            instance._loaded_assigned_to_id = instance.assigned_to_id
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        if 'deadline' in field_names:
+            instance._loaded_deadline = instance.deadline
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'assigned_to_id' in fields or 'assigned_to' in fields:
+            self._loaded_assigned_to_id = self.assigned_to_id
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
+        if fields is None or 'deadline' in fields:
+            self._loaded_deadline = self.deadline
 
     def clean(self):
         super().clean()
@@ -60,11 +109,20 @@ class Comment(models.Model):
                                verbose_name='Автор')
     text = models.TextField(verbose_name='Текст комментария')
     created_at = models.DateTimeField(auto_now_add=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('text', config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name='Поисковый вектор',
+    )
 
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created_at', 'task']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='comment_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author}({self.task}): {self.text}'
@@ -0,0 +1,18 @@
+from final_project.pagination import KeysetCursorPagination
+
+
+class TaskCursorPagination(KeysetCursorPagination):
+    """
+    Курсорная пагинация списков задач по ключу (поле сортировки, id).
+    По умолчанию (created_at, id) по убыванию
+    """
+    orderings = {
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+        'deadline': ('deadline', 'id'),
+        '-deadline': ('-deadline', '-id'),
+    }
+    ordering = orderings['-created_at']
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -1,14 +1,72 @@
 from django.core.exceptions import ValidationError
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
 from .models import Task, validate_future_date, Comment
+from .pagination import TaskCursorPagination
 
 User = get_user_model()
 
 
+class TaskAssigneeField(serializers.SlugRelatedField):
+    """
+    Исполнитель по email. В списочном сериализаторе берётся из заранее загруженных пользователей
+    """
+
+    def to_internal_value(self, data):
+        assignees = getattr(self.root, 'assignees', None)
+        if assignees is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail('invalid')
+        try:
+            return assignees[data]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+
+
+class TaskBulkListSerializer(serializers.ListSerializer):
+    """
+    Список задач для массового создания и обновления. Исполнители всех задач загружаются одним запросом.
+    При обновлении instance — queryset доступных задач, каждая запись валидируется вместе со своей задачей
+    """
+
+    @staticmethod
+    def _get_id(item):
+        try:
+            return int(item.get('id'))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            emails = {
+                item['assigned_to'] for item in data
+                if isinstance(item, dict) and isinstance(item.get('assigned_to'), str)
+            }
+            self.assignees = User.objects.in_bulk(emails, field_name='email')
+            if self.instance is not None:
+                ids = {self._get_id(item) for item in data} - {None}
+                self.instances = self.instance.select_related('assigned_to').in_bulk(ids)
+        return super().to_internal_value(data)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            self.child.instance = self.instances.get(self._get_id(data))
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def validate(self, attrs):
+        if self.instance is not None:
+            ids = [item['id'] for item in attrs]
+            if len(ids) != len(set(ids)):
+                raise serializers.ValidationError('Задачи в списке не должны повторяться')
+        return attrs
+
+
 class TaskCreateSerializer(serializers.ModelSerializer):
-    assigned_to = serializers.SlugRelatedField(
+    assigned_to = TaskAssigneeField(
         slug_field='email',
         queryset=User.objects.all(),
         required=False,
@@ -49,6 +107,26 @@ class TaskUpdateSerializer(TaskCreateSerializer):
         return attrs
 
 
+class TaskBulkCreateSerializer(TaskCreateSerializer):
+    class Meta(TaskCreateSerializer.Meta):
+        fields = ('id',) + TaskCreateSerializer.Meta.fields
+        read_only_fields = ('id',)
+        list_serializer_class = TaskBulkListSerializer
+
+
+class TaskBulkUpdateSerializer(TaskUpdateSerializer):
+    id = serializers.IntegerField()
+
+    class Meta(TaskUpdateSerializer.Meta):
+        fields = ('id',) + TaskUpdateSerializer.Meta.fields
+        list_serializer_class = TaskBulkListSerializer
+
+    def validate_id(self, value):
+        if self.instance is None:
+            raise serializers.ValidationError('Задача не найдена')
+        return value
+
+
 class CommentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -129,3 +207,34 @@ class TaskListAdminSerializer(serializers.ModelSerializer):
                   'assigned_to_last_name', 'team_id', 'team_name', 'rank', 'created_at', 'updated_at',
                   'comments')
         read_only_fields = fields
+
+
+class TaskListQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Task.Status.choices, required=False)
+    team = serializers.IntegerField(min_value=1, required=False)
+    deadline_from = serializers.DateTimeField(required=False)
+    deadline_to = serializers.DateTimeField(required=False)
+    ordering = serializers.ChoiceField(choices=list(TaskCursorPagination.orderings), default='-created_at')
+
+    def validate(self, attrs):
+        if 'deadline_from' in attrs and 'deadline_to' in attrs and attrs['deadline_to'] < attrs['deadline_from']:
+            raise serializers.ValidationError({'deadline_to': 'Конец периода не может быть раньше начала'})
+        return attrs
+
+
+class TaskListAdminQuerySerializer(TaskListQuerySerializer):
+    assigned_to = serializers.EmailField(required=False)
+
+
+class TaskSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class TaskSearchSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Task
+        fields = ('id', 'title', 'description', 'deadline', 'status', 'rank', 'created_at')
+        read_only_fields = fields
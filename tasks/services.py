@@ -1,7 +1,14 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db import transaction
+from django.db.models import Exists, F, FloatField, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
-from .models import Task
+from .models import Task, Comment, SEARCH_CONFIG
+from calendars.services import CalendarService
+from users.services import apply_task_stats_changes, evaluation_totals, task_stats_state
+from .signals import batch_assignment_notifications, queue_assignment_notification
 from evaluations.models import Evaluation
 
 
@@ -34,6 +41,140 @@ class TaskService:
             if task.status == Task.Status.DONE and data['status'] != Task.Status.DONE:
                 Evaluation.objects.filter(task=task).delete()
 
+    @staticmethod
+    def _check_assignees(*, team_id, items):
+        """
+        Проверка, что исполнители всех задач списка состоят в команде. Ошибки возвращаются по позициям списка
+        """
+        errors = [
+            {'assigned_to': ['Исполнитель должен быть в составе команды']}
+            if item.get('assigned_to') is not None and item['assigned_to'].team_id != team_id else {}
+            for item in items
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+
+    @staticmethod
+    def bulk_create_tasks(*, created_by, team, tasks_data):
+        """
+        Создание списка задач одним запросом. Исполнители получают уведомление одной пачкой
+        после фиксации транзакции
+        """
+        TaskService.check_create_task_permission(created_by=created_by, team=team)
+        TaskService._check_assignees(team_id=team.id, items=tasks_data)
+        with transaction.atomic(), batch_assignment_notifications():
+            tasks = Task.objects.bulk_create(Task(created_by=created_by, team=team, **data) for data in tasks_data)
+            for task in tasks:
+                task._loaded_assigned_to_id = task.assigned_to_id
+                if task.assigned_to_id:
+                    queue_assignment_notification(task.pk, task.assigned_to_id)
+            apply_task_stats_changes((None, task_stats_state(task)) for task in tasks)
+            assignees = {task.assigned_to_id for task in tasks}
+            CalendarService.invalidate_calendars(assignees | {created_by.pk})
+        return tasks
+
+    @staticmethod
+    def bulk_update_tasks(*, team_id, tasks, items):
+        """
+        Обновление списка задач одним запросом. Оценки переоткрытых задач удаляются,
+        новые исполнители получают уведомление одной пачкой после фиксации транзакции,
+        статистика прежних и новых исполнителей меняется приращениями, их календари сбрасываются
+        """
+        tasks_by_id = {task.pk: task for task in tasks}
+        TaskService._check_assignees(team_id=team_id, items=items)
+        fields = {'updated_at'}
+        reopened = []
+        reassigned = []
+        assignees = set()
+        now = timezone.now()
+        old_states = {}
+        for item in items:
+            data = dict(item)
+            task = tasks_by_id[data.pop('id')]
+            old_states[task.pk] = task_stats_state(task)
+            assignees.add(task.assigned_to_id)
+            if task.status == Task.Status.DONE and data.get('status', Task.Status.DONE) != Task.Status.DONE:
+                reopened.append(task.pk)
+            for field, value in data.items():
+                setattr(task, field, value)
+            fields.update(data)
+            task.updated_at = now
+            if task.assigned_to_id and task.assigned_to_id != task._loaded_assigned_to_id:
+                reassigned.append(task)
+            assignees.add(task.assigned_to_id)
+        with transaction.atomic(), batch_assignment_notifications():
+            Task.objects.bulk_update(tasks, fields)
+            # Оценки переназначенных задач переходят к новым исполнителям и удаляются
+            # у переоткрытых задач сигналом удаления оценок
+            moved = evaluation_totals([
+                task_id for task_id, old in old_states.items()
+                if tasks_by_id[task_id].assigned_to_id != old.assigned_to_id
+            ])
+            changes = []
+            for task_id, old in old_states.items():
+                count, rank_sum = moved.get(task_id, (0, 0))
+                changes.append((
+                    old._replace(evaluation_count=count, rank_sum=rank_sum),
+                    task_stats_state(tasks_by_id[task_id], (count, rank_sum)),
+                ))
+            apply_task_stats_changes(changes)
+            if reopened:
+                Evaluation.objects.filter(task_id__in=reopened).delete()
+            for task in reassigned:
+                queue_assignment_notification(task.pk, task.assigned_to_id)
+            CalendarService.invalidate_calendars(assignees | {task.created_by_id for task in tasks})
+        for task in tasks:
+            task._loaded_assigned_to_id = task.assigned_to_id
+            task._loaded_status = task.status
+            task._loaded_deadline = task.deadline
+        return tasks
+
+    @staticmethod
+    def filter_tasks(queryset, *, status=None, team=None, assigned_to=None, deadline_from=None, deadline_to=None):
+        """
+        Фильтрация списка задач по статусу, команде, исполнителю (email) и сроку исполнения
+        """
+        if status is not None:
+            queryset = queryset.filter(status=status)
+        if team is not None:
+            queryset = queryset.filter(team_id=team)
+        if assigned_to is not None:
+            queryset = queryset.filter(assigned_to__email=assigned_to)
+        if deadline_from is not None:
+            queryset = queryset.filter(deadline__gte=deadline_from)
+        if deadline_to is not None:
+            queryset = queryset.filter(deadline__lt=deadline_to)
+        return queryset
+
+    @staticmethod
+    def search_tasks(*, user, text, limit):
+        """
+        Полнотекстовый поиск по названию, описанию и комментариям задач, видимых пользователю:
+        назначенных ему, а для админа ещё и созданных им. Результаты упорядочены по релевантности
+        лучшего совпадения в задаче или её комментариях
+        """
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        visible = Q(assigned_to=user)
+        if user.is_staff:
+            visible |= Q(created_by=user)
+        comments = Comment.objects.filter(task=OuterRef('pk'), search_vector=query)
+        comment_rank = (
+            comments.order_by()
+            .values('task')
+            .annotate(rank=Max(SearchRank(F('search_vector'), query)))
+            .values('rank')
+        )
+        return (
+            Task.objects.filter(visible)
+            .filter(Q(search_vector=query) | Exists(comments))
+            .annotate(rank=Greatest(
+                SearchRank(F('search_vector'), query),
+                Coalesce(Subquery(comment_rank, output_field=FloatField()), Value(0.0)),
+            ))
+            .only('id', 'title', 'description', 'deadline', 'status', 'created_at')
+            .order_by('-rank', '-id')[:limit]
+        )
+
 
 class CommentService:
     @staticmethod
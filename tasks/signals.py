@@ -1,25 +1,108 @@
-from django.db.models.signals import pre_save, post_save
+import threading
+from contextlib import contextmanager
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from final_project.metrics import incr
+from users.services import (
+    TaskStatsState,
+    apply_task_stats_changes,
+    evaluation_totals,
+    schedule_user_stats_refresh,
+    task_stats_state,
+)
 from .models import Task
-from .tasks import notify_assigned_to
+from .tasks import notify_assigned_to_batch
 
-_old_assigned = {}
+_local = threading.local()
 
 
-@receiver(pre_save, sender=Task)
-def remember_old_assigned_to(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old = Task.objects.only('assigned_to').get(pk=instance.pk)
-            _old_assigned[instance.pk] = old.assigned_to
-        except Task.DoesNotExist:
-            _old_assigned[instance.pk] = None
+@contextmanager
+def batch_assignment_notifications():
+    """
+    Сбор назначений внутри блока в одно сообщение брокеру. При выходе из блока регистрируется
+    один transaction.on_commit, поэтому пачка отправляется после фиксации транзакции, в которой
+    открыт блок, и отменяется вместе с ней. Назначения из отменённых внутри блока точек сохранения
+    остаются в пачке и отбрасываются воркером по текущему исполнителю задачи.
+    Вложенные блоки используют внешнюю пачку
+    """
+    if getattr(_local, 'batch', None) is not None:
+        yield
+        return
+    batch = _local.batch = {}
+    try:
+        yield
+    finally:
+        _local.batch = None
+    if batch:
+        transaction.on_commit(partial(notify_assigned_to_batch.delay, list(batch), list(batch.values())))
+
+
+def queue_assignment_notification(task_id, assigned_to_id):
+    """
+    Постановка уведомления исполнителя в очередь после фиксации текущей транзакции.
+    Внутри batch_assignment_notifications уведомление добавляется в общую пачку
+    """
+    batch = getattr(_local, 'batch', None)
+    if batch is None:
+        transaction.on_commit(partial(notify_assigned_to_batch.delay, [task_id], [assigned_to_id]))
+        return
+    if batch.get(task_id) == assigned_to_id:
+        incr('task_notifications_duplicate')
+    batch[task_id] = assigned_to_id
+
+
+STATS_FIELDS = {'status', 'deadline', 'assigned_to', 'assigned_to_id'}
+
+
+def _loaded_stats_state(instance):
+    """
+    Состояние задачи для статистики на момент загрузки из БД или None, если оно неизвестно
+    """
+    try:
+        return TaskStatsState(instance._loaded_assigned_to_id, instance._loaded_status, instance._loaded_deadline)
+    except AttributeError:
+        return None
+
+
+@receiver(post_save, sender=Task)
+def refresh_assignee_stats(sender, instance, created, raw, update_fields, **kwargs):
+    """
+    Изменение статистики текущего и прежнего исполнителя приращениями. Должен выполняться до
+    send_notification_on_assignment, который обновляет _loaded_assigned_to_id
+    """
+    if raw or (update_fields is not None and not STATS_FIELDS & update_fields):
+        return
+    old = None if created else _loaded_stats_state(instance)
+    if created or old is not None:
+        evaluations = (0, 0)
+        if old is not None and old.assigned_to_id != instance.assigned_to_id:
+            # Оценки задачи переходят к новому исполнителю
+            evaluations = evaluation_totals([instance.pk]).get(instance.pk, evaluations)
+            old = old._replace(evaluation_count=evaluations[0], rank_sum=evaluations[1])
+        apply_task_stats_changes([(old, task_stats_state(instance, evaluations))])
+    else:
+        schedule_user_stats_refresh(instance.assigned_to_id, getattr(instance, '_loaded_assigned_to_id', None))
+    instance._loaded_status = instance.status
+    instance._loaded_deadline = instance.deadline
+
+
+@receiver(post_delete, sender=Task)
+def refresh_assignee_stats_on_delete(sender, instance, **kwargs):
+    """
+    Вычитание задачи из статистики исполнителя. Оценки задачи удаляются каскадно раньше неё
+    и вычитаются своим сигналом
+    """
+    apply_task_stats_changes([(_loaded_stats_state(instance) or task_stats_state(instance), None)])
 
 
 @receiver(post_save, sender=Task)
 def send_notification_on_assignment(sender, instance, created, **kwargs):
-    if instance.assigned_to:
-        old_assigned = _old_assigned.pop(instance.pk, None)
-        if created or old_assigned != instance.assigned_to:
-            notify_assigned_to.delay(instance.pk)
+    if 'assigned_to_id' not in instance.__dict__:
+        return
+    loaded_assigned_to_id = getattr(instance, '_loaded_assigned_to_id', None)
+    if instance.assigned_to_id and (created or loaded_assigned_to_id != instance.assigned_to_id):
+        queue_assignment_notification(instance.pk, instance.assigned_to_id)
+    instance._loaded_assigned_to_id = instance.assigned_to_id
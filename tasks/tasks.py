@@ -1,12 +1,16 @@
 import logging
 from collections import defaultdict
-from datetime import timedelta
-from celery import shared_task
-from django.core.mail import send_mail
+from datetime import datetime, timedelta
+from functools import reduce
+from operator import or_
+from celery import group, shared_task
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
 from django.utils import timezone
-from django.utils.html import strip_tags
 from django.conf import settings
 
+from final_project.mail import build_html_message, send_messages_in_chunks
+from final_project.metrics import incr
 from .models import Task
 
 logger = logging.getLogger(__name__)
@@ -14,10 +18,33 @@ logger = logging.getLogger(__name__)
 
 @shared_task
 def notify_assigned_to(task_id):
-    try:
-        task = Task.objects.select_related('assigned_to', 'created_by', 'team').get(pk=task_id)
-        if not task.assigned_to:
-            return
+    notify_assigned_to_batch([task_id])
+
+
+@shared_task
+def notify_assigned_to_batch(task_ids, assigned_to_ids=None):
+    """
+    Отправка уведомлений исполнителям о назначенных задачах одной пачкой.
+    assigned_to_ids — исполнители на момент назначения. Уведомления о ненайденных задачах
+    и о задачах, исполнитель которых с тех пор другой (назначение откатилось или изменилось),
+    отбрасываются и учитываются в счётчике task_notifications_dropped
+    """
+    tasks = Task.objects.select_related('assigned_to', 'created_by', 'team').in_bulk(task_ids)
+    missing = set(task_ids) - tasks.keys()
+    if missing:
+        logger.warning('Задачи %s не найдены при отправке уведомления', sorted(missing))
+    expected = dict(zip(task_ids, assigned_to_ids)) if assigned_to_ids is not None else {}
+    stale = {
+        task_id for task_id, task in tasks.items()
+        if not task.assigned_to_id or expected.get(task_id, task.assigned_to_id) != task.assigned_to_id
+    }
+    if missing or stale:
+        incr('task_notifications_dropped', len(missing) + len(stale))
+    messages = []
+    message_tasks = {}
+    for task_id, task in tasks.items():
+        if task_id in stale:
+            continue
         subject = f'Новая задача назначена вам: {task.title}'
         html_message = f"""<html>
         <body>
@@ -34,103 +61,128 @@ def notify_assigned_to(task_id):
         <p>С наилучшим пожеланиями, <br>Ваша система управления бизнесом</p>
         </body>
         </html>"""
-        text_message = strip_tags(html_message)
-
-        send_mail(
-            subject=subject,
-            message=text_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[task.assigned_to.email],
-            fail_silently=False,
-            html_message=html_message,
-        )
+        message = build_html_message(subject, html_message, [task.assigned_to.email])
+        messages.append(message)
+        message_tasks[message] = task
+    sent = send_messages_in_chunks(messages)
+    for message in sent:
+        task = message_tasks[message]
         logger.info(
             'Уведомление отправлено на %s (задача #%d: %s)',
             task.assigned_to.email,
             task.id,
             task.title
         )
-    except Task.DoesNotExist:
-        logger.warning('Задача #%d не найдена при отправке уведомления', task_id)
-    except Exception as e:
-        logger.exception(
-            'Ошибка при отправке уведомления о задаче #%d: %s',
-            task_id,
-            str(e)
-        )
+    incr('task_notifications_sent', len(sent))
+
+
+def _deadline_reminder_queryset(now):
+    """
+    Задачи, попадающие в окна напоминаний о сроках исполнения, с типом напоминания в reminder_type
+    """
+    conditions = (
+        ('7days', Q(
+            reminder_7days_sent=False,
+            deadline__range=(now + timedelta(days=6, hours=12), now + timedelta(days=7, hours=12)),
+        )),
+        ('1days', Q(
+            reminder_1day_sent=False,
+            deadline__range=(now + timedelta(hours=12), now + timedelta(days=1, hours=12)),
+        )),
+        ('overdue', Q(
+            Q(overdue_reminder_last_sent__isnull=True) |
+            Q(overdue_reminder_last_sent__lte=now.date() - timedelta(days=1)),
+            deadline__lt=now,
+        )),
+    )
+    return Task.objects.filter(
+        reduce(or_, (condition for _, condition in conditions)),
+        status__in=[Task.Status.OPEN, Task.Status.IN_PROGRESS],
+        assigned_to__isnull=False,
+    ).annotate(
+        reminder_type=Case(*(When(condition, then=Value(rtype)) for rtype, condition in conditions)),
+    )
 
 
 @shared_task
 def send_deadline_reminders():
     now = timezone.now()
-    seven_days_window_start = now + timedelta(days=6, hours=12)
-    seven_days_window_end = now + timedelta(days=7, hours=12)
-    one_day_window_start = now + timedelta(hours=12)
-    one_day_window_end = now + timedelta(days=1, hours=12)
-    qs = Task.objects.filter(
-        status__in=[Task.Status.OPEN, Task.Status.IN_PROGRESS],
-        assigned_to__isnull=False,
-    ).select_related('assigned_to', 'team', 'created_by')
-    notifications = defaultdict(list)
-    for task in qs.iterator():
-        deadline = task.deadline
-        if (
-                not task.reminder_7days_sent and
-                seven_days_window_start <= deadline <= seven_days_window_end
-        ):
-            notifications[task.assigned_to.email].append((task, '7days'))
-        if (
-                not task.reminder_1day_sent and
-                one_day_window_start <= deadline <= one_day_window_end
-        ):
-            notifications[task.assigned_to.email].append((task, '1days'))
-        if deadline < now:
-            last_sent = task.overdue_reminder_last_sent
-            if last_sent is None or (now.date() - last_sent).days >= 1:
-                notifications[task.assigned_to.email].append((task, 'overdue'))
-    if not notifications:
+    recipients = defaultdict(list)
+    for task_id, email in _deadline_reminder_queryset(now).values_list('pk', 'assigned_to__email').iterator():
+        recipients[email].append(task_id)
+    if not recipients:
         logger.info('Нет задач для отправки напоминаний о сроках исполнения')
         return
-    for email, items in notifications.items():
-        try:
-            subject = 'Напоминание: срок исполнения задачи'
-            lines = []
-            updated_fields = []
-            for task, rtype in items:
-                if rtype == '7days':
-                    lines.append(
-                        f'<li>{task.title} - <strong>через ~7 дней</strong> ({task.deadline:%d.%m.%Y %H:%M})</li>')
-                    task.reminder_7days_sent = True
-                    updated_fields.append('reminder_7days_sent')
-                elif rtype == '1days':
-                    lines.append(f'<li>{task.title} - <strong>завтра</strong> ({task.deadline:%d.%m.%Y %H:%M})</li>')
-                    task.reminder_1day_sent = True
-                    updated_fields.append('reminder_1day_sent')
-                elif rtype == 'overdue':
-                    days_over = (now - task.deadline).days
-                    lines.append(f'<li>{task.title} - <strong>просрочена на {days_over} дн.</strong></li>')
-                    task.overdue_reminder_last_sent = now.date()
-                    updated_fields.append('overdue_reminder_last_sent')
-                if updated_fields:
-                    task.save(update_fields=updated_fields)
-            html_body = """<html>
-            <body>
-            <h2>Напоминание о сроках исполнения</h2>
-            <p>Здравствуйте!</p>
-            <p>У вас есть задачи, требующие внимания:</p>
-            <ul>""" + "".join(lines) + """""</ul>
-            <p>С уважением,<br>Система управления бизнесом.</p>
-            </body>
-            </html>"""
-            text_body = strip_tags(html_body)
-            send_mail(
-                subject=subject,
-                message=text_body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False,
-                html_message=html_body,
-            )
-            logger.info(f'Отправлены напоминания о дедлайнах на {email} ({len(items)} задач)')
-        except Exception as e:
-            logger.exception(f'Ошибка при отправке напоминаний о сроках исполнения на {e}')
+    task_ids = list(recipients.values())
+    chunk_size = settings.REMINDER_CHUNK_SIZE
+    group(
+        send_deadline_reminder_chunk.s(
+            [task_id for ids in task_ids[start:start + chunk_size] for task_id in ids],
+            now.isoformat(),
+        )
+        for start in range(0, len(task_ids), chunk_size)
+    ).apply_async()
+    logger.info(f'Запланированы напоминания о сроках исполнения для {len(recipients)} получателей')
+
+
+def _build_deadline_reminder_message(email, tasks, now):
+    subject = 'Напоминание: срок исполнения задачи'
+    lines = []
+    for task in tasks:
+        if task.reminder_type == '7days':
+            lines.append(f'<li>{task.title} - <strong>через ~7 дней</strong> ({task.deadline:%d.%m.%Y %H:%M})</li>')
+        elif task.reminder_type == '1days':
+            lines.append(f'<li>{task.title} - <strong>завтра</strong> ({task.deadline:%d.%m.%Y %H:%M})</li>')
+        elif task.reminder_type == 'overdue':
+            days_over = (now - task.deadline).days
+            lines.append(f'<li>{task.title} - <strong>просрочена на {days_over} дн.</strong></li>')
+    html_body = """<html>
+        <body>
+        <h2>Напоминание о сроках исполнения</h2>
+        <p>Здравствуйте!</p>
+        <p>У вас есть задачи, требующие внимания:</p>
+        <ul>""" + "".join(lines) + """""</ul>
+        <p>С уважением,<br>Система управления бизнесом.</p>
+        </body>
+        </html>"""
+    return build_html_message(subject, html_body, [email])
+
+
+@shared_task(acks_late=True)
+def send_deadline_reminder_chunk(task_ids, now_iso):
+    """
+    Отправка напоминаний о сроках исполнения для части получателей.
+    Строки задач заблокированы на время отправки, флаги выставляются только для отправленных писем
+    в той же транзакции. Параллельные пачки пропускают заблокированные задачи, а при падении воркера
+    транзакция откатывается и напоминания отправляются повторным запуском пачки
+    """
+    now = datetime.fromisoformat(now_iso)
+    sent_flags = {
+        '7days': ('reminder_7days_sent', True),
+        '1days': ('reminder_1day_sent', True),
+        'overdue': ('overdue_reminder_last_sent', now.date()),
+    }
+    with transaction.atomic():
+        notifications = defaultdict(list)
+        for task in (_deadline_reminder_queryset(now)
+                     .filter(pk__in=task_ids)
+                     .select_related('assigned_to')
+                     .select_for_update(skip_locked=True, of=('self',))):
+            notifications[task.assigned_to.email].append(task)
+        if not notifications:
+            return
+        messages = []
+        message_tasks = {}
+        for email, tasks in notifications.items():
+            message = _build_deadline_reminder_message(email, tasks, now)
+            messages.append(message)
+            message_tasks[message] = tasks
+        sent_ids = defaultdict(list)
+        for message in send_messages_in_chunks(messages):
+            tasks = message_tasks[message]
+            logger.info(f'Отправлены напоминания о дедлайнах на {message.to[0]} ({len(tasks)} задач)')
+            for task in tasks:
+                sent_ids[task.reminder_type].append(task.pk)
+        for rtype, ids in sent_ids.items():
+            field, value = sent_flags[rtype]
+            Task.objects.filter(pk__in=ids).update(**{field: value})
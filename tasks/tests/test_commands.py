@@ -0,0 +1,29 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from tasks.models import Task
+
+
+@pytest.mark.commands
+@pytest.mark.django_db
+class TestBenchmarkIndexesCommand:
+    def test_benchmark_indexes_requires_confirmation(self, settings):
+        """
+        Тест на отказ запускать бенчмарк без --i-know даже при DEBUG
+        """
+        settings.DEBUG = True
+        with pytest.raises(CommandError) as e:
+            call_command('benchmark_indexes', stdout=io.StringIO())
+        assert '--i-know' in str(e.value)
+        assert not Task.objects.exists()
+
+    def test_benchmark_indexes_confirmed(self):
+        """
+        Тест на запуск бенчмарка с --i-know и откат созданных данных
+        """
+        stdout = io.StringIO()
+        call_command('benchmark_indexes', tasks=10, meetings=5, comments=10, users=3, i_know=True, stdout=stdout)
+        assert 'Без индексов' in stdout.getvalue()
+        assert not Task.objects.exists()
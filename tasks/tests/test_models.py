@@ -1,9 +1,13 @@
+from unittest.mock import patch
+
 import pytest
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
+from final_project.metrics import get_counters
 from tasks.models import Task, Comment
+from tasks.signals import batch_assignment_notifications, queue_assignment_notification
 
 
 @pytest.mark.models
@@ -91,6 +95,131 @@ class TestTaskModel:
         assert fields == ['created_by', '-created_at']
 
 
+@pytest.mark.models
+@pytest.mark.django_db
+class TestTaskAssignmentSignal:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_user, create_superuser, create_team, team_data, user_data, admin_user_data, task_data,
+              django_capture_on_commit_callbacks):
+        self.admin = create_superuser(**admin_user_data)
+        self.user = create_user(**user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.task_data = task_data
+        self.capture_on_commit = django_capture_on_commit_callbacks
+        with patch('tasks.signals.notify_assigned_to_batch.delay') as self.delay:
+            yield
+
+    def _create_task(self, **kwargs):
+        with self.capture_on_commit(execute=True):
+            return Task.objects.create(created_by=self.admin, team=self.team, **self.task_data, **kwargs)
+
+    def test_notify_on_create_with_assigned_to(self):
+        """
+        Тест на уведомление при создании задачи с исполнителем
+        """
+        task = self._create_task(assigned_to=self.user)
+        self.delay.assert_called_once_with([task.pk], [self.user.pk])
+
+    def test_notify_after_commit(self):
+        """
+        Тест на постановку уведомления в очередь только после фиксации транзакции
+        """
+        with self.capture_on_commit() as callbacks:
+            task = Task.objects.create(created_by=self.admin, team=self.team, assigned_to=self.user, **self.task_data)
+        self.delay.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.delay.assert_called_once_with([task.pk], [self.user.pk])
+
+    def test_notify_on_assigned_to_change(self):
+        """
+        Тест на уведомление при смене исполнителя
+        """
+        task = self._create_task()
+        self.delay.assert_not_called()
+        task = Task.objects.get(pk=task.pk)
+        task.assigned_to = self.user
+        with self.capture_on_commit(execute=True):
+            task.save()
+        self.delay.assert_called_once_with([task.pk], [self.user.pk])
+
+    def test_batch_notifications_in_one_transaction(self):
+        """
+        Тест на отправку уведомлений о нескольких задачах пачки одним сообщением
+        """
+        with self.capture_on_commit(execute=True):
+            with transaction.atomic(), batch_assignment_notifications():
+                tasks = [
+                    Task.objects.create(created_by=self.admin, team=self.team, assigned_to=self.user, **self.task_data)
+                    for _ in range(3)
+                ]
+        self.delay.assert_called_once_with([task.pk for task in tasks], [self.user.pk] * 3)
+
+    def test_not_notify_without_assigned_to_change(self, django_assert_num_queries):
+        """
+        Тест на отсутствие уведомления и лишних запросов при сохранении без смены исполнителя
+        """
+        task = self._create_task(assigned_to=self.user)
+        task = Task.objects.get(pk=task.pk)
+        self.delay.reset_mock()
+        task.title = 'new title'
+        with self.capture_on_commit(execute=True):
+            with django_assert_num_queries(4):
+                task.save()
+            task.save()
+        self.delay.assert_not_called()
+
+    def test_not_notify_on_deferred_save(self):
+        """
+        Тест на отсутствие уведомления при сохранении задачи без загруженного исполнителя
+        """
+        task = self._create_task(assigned_to=self.user)
+        self.delay.reset_mock()
+        with self.capture_on_commit(execute=True):
+            Task.objects.only('id', 'title').get(pk=task.pk).save(update_fields=['title'])
+        self.delay.assert_not_called()
+
+    def test_duplicate_counter(self, settings):
+        """
+        Тест на подсчёт повторных уведомлений об одном назначении в пачке
+        """
+        settings.SHARED_CACHE = True
+        before = get_counters('task_notifications_duplicate')
+        with self.capture_on_commit(execute=True):
+            with transaction.atomic(), batch_assignment_notifications():
+                queue_assignment_notification(1, self.user.pk)
+                queue_assignment_notification(1, self.user.pk)
+        after = get_counters('task_notifications_duplicate')
+        assert after['task_notifications_duplicate'] - before['task_notifications_duplicate'] == 1
+        self.delay.assert_called_once_with([1], [self.user.pk])
+
+    def test_batch_after_savepoint_rollback(self):
+        """
+        Тест на отправку пачки одним сообщением при откате точек сохранения внутри неё
+        """
+        with self.capture_on_commit(execute=True):
+            with transaction.atomic(), batch_assignment_notifications():
+                with pytest.raises(RuntimeError):
+                    with transaction.atomic():
+                        queue_assignment_notification(1, self.user.pk)
+                        raise RuntimeError
+                queue_assignment_notification(2, self.user.pk)
+        self.delay.assert_called_once_with([1, 2], [self.user.pk] * 2)
+
+    def test_batch_discarded_with_transaction(self):
+        """
+        Тест на отсутствие отправки пачки при откате транзакции, в которой она открыта
+        """
+        with self.capture_on_commit(execute=True):
+            with transaction.atomic():
+                with pytest.raises(RuntimeError):
+                    with transaction.atomic(), batch_assignment_notifications():
+                        queue_assignment_notification(1, self.user.pk)
+                        raise RuntimeError
+                queue_assignment_notification(2, self.user.pk)
+        self.delay.assert_called_once_with([2], [self.user.pk])
+
+
 @pytest.mark.models
 @pytest.mark.django_db
 class TestCommentModel:
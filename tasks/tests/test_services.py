@@ -2,6 +2,7 @@ import pytest
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
+from tasks.models import Comment, Task
 from tasks.services import TaskService, CommentService
 from evaluations.models import Evaluation
 
@@ -129,6 +130,69 @@ class TestCheckTaskStatus:
         assert Evaluation.objects.count() == 0
 
 
+@pytest.mark.services
+@pytest.mark.django_db
+class TestSearchTasks:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, user_data, create_user, create_task,
+              task_data):
+        self.admin = create_superuser(**admin_user_data)
+        team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=team, **user_data)
+        self.create_task = lambda **kwargs: create_task(team=team, created_by=self.admin,
+                                                        **{**task_data, 'description': '', **kwargs})
+
+    def _search(self, text, user=None, limit=20):
+        return list(TaskService.search_tasks(user=user or self.user, text=text, limit=limit))
+
+    def test_search_tasks_by_title_and_description(self):
+        """
+        Тест на поиск по названию и описанию с учётом словоформ
+        """
+        by_title = self.create_task(title='Квартальные отчёты', assigned_to=self.user)
+        by_description = self.create_task(title='Задача', description='Подготовить отчёт', assigned_to=self.user)
+        self.create_task(title='Созвон', assigned_to=self.user)
+        assert {task.pk for task in self._search('отчет')} == {by_title.pk, by_description.pk}
+
+    def test_search_tasks_by_comment(self):
+        """
+        Тест на поиск задачи по тексту комментария
+        """
+        task = self.create_task(title='Задача', assigned_to=self.user)
+        Comment.objects.create(task=task, author=self.admin, text='Нужна миграция базы данных')
+        assert [t.pk for t in self._search('миграции')] == [task.pk]
+
+    def test_search_tasks_rank(self):
+        """
+        Тест на упорядочивание по релевантности: совпадение в названии выше совпадения в описании
+        """
+        in_description = self.create_task(title='Задача', description='Сервер', assigned_to=self.user)
+        in_title = self.create_task(title='Сервер', assigned_to=self.user)
+        result = self._search('сервер')
+        assert [task.pk for task in result] == [in_title.pk, in_description.pk]
+        assert result[0].rank > result[1].rank
+
+    def test_search_tasks_visibility(self, create_superuser):
+        """
+        Тест на поиск только среди назначенных пользователю задач, а для админа ещё и созданных им
+        """
+        assigned = self.create_task(title='Релиз', assigned_to=self.user)
+        created = self.create_task(title='Релиз')
+        other_admin = create_superuser(email='other@example.com', password='password123', first_name='other',
+                                       last_name='admin')
+        assert [task.pk for task in self._search('релиз')] == [assigned.pk]
+        assert {task.pk for task in self._search('релиз', user=self.admin)} == {assigned.pk, created.pk}
+        assert self._search('релиз', user=other_admin) == []
+
+    def test_search_tasks_limit(self):
+        """
+        Тест на ограничение количества результатов
+        """
+        for i in range(3):
+            self.create_task(title=f'Релиз {i}', assigned_to=self.user)
+        assert len(self._search('релиз', limit=2)) == 2
+
+
 @pytest.mark.services
 @pytest.mark.django_db
 class TestCheckCreateCommentPermission:
@@ -160,3 +224,4 @@ class TestCheckCreateCommentPermission:
         self.user.save()
         with pytest.raises(PermissionDenied):
             CommentService.check_create_comment_permission(current_user=self.user, task=self.task)
+
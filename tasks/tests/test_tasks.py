@@ -0,0 +1,262 @@
+from smtplib import SMTPRecipientsRefused
+from unittest.mock import patch
+
+import pytest
+from django.core.mail.backends.locmem import EmailBackend
+from django.utils import timezone
+
+from tasks.models import Task
+from final_project.metrics import get_counters
+from tasks.tasks import notify_assigned_to_batch, send_deadline_reminders, send_deadline_reminder_chunk
+
+
+class CountingEmailBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return super().open()
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class RejectingEmailBackend(EmailBackend):
+    batches = []
+
+    def send_messages(self, messages):
+        RejectingEmailBackend.batches.append(len(messages))
+        if any('rejected@example.com' in message.to for message in messages):
+            raise SMTPRecipientsRefused({'rejected@example.com': (550, b'User unknown')})
+        return super().send_messages(messages)
+
+
+@pytest.mark.tasks
+@pytest.mark.django_db
+class TestSendDeadlineReminders:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, create_user, user_data, create_task,
+              task_data, mailoutbox, celery_eager):
+        self.admin = create_superuser(**admin_user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=self.team, **user_data)
+        self.task_data = task_data
+        self.create_task = create_task
+        self.mailoutbox = mailoutbox
+
+    def _create_task(self, deadline, **kwargs):
+        data = {**self.task_data, 'deadline': deadline, 'assigned_to': self.user, **kwargs}
+        task = self.create_task(created_by=self.admin, team=self.team, **data)
+        self.mailoutbox.clear()
+        return task
+
+    def test_send_7days_reminder(self):
+        """
+        Тест на отправку напоминания за 7 дней
+        """
+        task = self._create_task(timezone.now() + timezone.timedelta(days=7))
+        send_deadline_reminders()
+        task.refresh_from_db()
+        assert task.reminder_7days_sent
+        assert len(self.mailoutbox) == 1
+        assert self.mailoutbox[0].to == [self.user.email]
+        assert 'через ~7 дней' in self.mailoutbox[0].alternatives[0][0]
+
+    def test_send_1day_reminder(self):
+        """
+        Тест на отправку напоминания за 1 день
+        """
+        task = self._create_task(timezone.now() + timezone.timedelta(days=1))
+        send_deadline_reminders()
+        task.refresh_from_db()
+        assert task.reminder_1day_sent
+        assert len(self.mailoutbox) == 1
+        assert 'завтра' in self.mailoutbox[0].alternatives[0][0]
+
+    def test_skip_tasks_outside_windows(self):
+        """
+        Тест на отсутствие напоминаний для задач вне окон, выполненных и уже напомненных
+        """
+        self._create_task(timezone.now() + timezone.timedelta(days=4))
+        self._create_task(timezone.now() + timezone.timedelta(days=7), status=Task.Status.DONE)
+        self._create_task(timezone.now() + timezone.timedelta(days=1), reminder_1day_sent=True)
+        self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=None)
+        send_deadline_reminders()
+        assert len(self.mailoutbox) == 0
+
+    def test_group_reminders_by_assignee(self):
+        """
+        Тест на объединение напоминаний одного исполнителя в одно письмо
+        """
+        self._create_task(timezone.now() + timezone.timedelta(days=7))
+        self._create_task(timezone.now() + timezone.timedelta(days=1))
+        send_deadline_reminders()
+        assert len(self.mailoutbox) == 1
+        assert Task.objects.filter(reminder_7days_sent=True).count() == 1
+        assert Task.objects.filter(reminder_1day_sent=True).count() == 1
+
+    def test_send_overdue_reminder(self):
+        """
+        Тест на отправку напоминания о просроченной задаче
+        """
+        task = self._create_task(timezone.now() + timezone.timedelta(days=4))
+        Task.objects.filter(pk=task.pk).update(deadline=timezone.now() - timezone.timedelta(days=2))
+        send_deadline_reminders()
+        task.refresh_from_db()
+        assert task.overdue_reminder_last_sent == timezone.now().date()
+        assert len(self.mailoutbox) == 1
+        assert 'просрочена на 2 дн.' in self.mailoutbox[0].alternatives[0][0]
+        send_deadline_reminders()
+        assert len(self.mailoutbox) == 1
+
+    def test_flags_updated_in_bulk(self, django_assert_num_queries):
+        """
+        Тест на обновление флагов одним запросом на тип напоминания.
+        Запросы: выборка планировщика, выборка пачки с блокировкой, обновление флагов,
+        а также SAVEPOINT и RELEASE транзакции пачки внутри транзакции теста
+        """
+        for _ in range(5):
+            self._create_task(timezone.now() + timezone.timedelta(days=7))
+        with django_assert_num_queries(5):
+            send_deadline_reminders()
+        assert Task.objects.filter(reminder_7days_sent=True).count() == 5
+
+    @pytest.mark.parametrize(
+        'batch_size, expected_connections',
+        [
+            (100, 1),
+            (2, 2),
+            (1, 3),
+        ]
+    )
+    def test_reminders_reuse_connection(self, settings, create_user, batch_size, expected_connections):
+        """
+        Тест на отправку напоминаний через одно соединение на пачку писем
+        """
+        settings.EMAIL_BACKEND = 'tasks.tests.test_tasks.CountingEmailBackend'
+        settings.EMAIL_BATCH_SIZE = batch_size
+        for i in range(3):
+            user = create_user(email=f'{i}@example.com', first_name='first', last_name='last', team=self.team)
+            self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=user)
+        CountingEmailBackend.opened = 0
+        send_deadline_reminders()
+        assert CountingEmailBackend.opened == expected_connections
+        assert len(self.mailoutbox) == 3
+        assert Task.objects.filter(reminder_7days_sent=True).count() == 3
+
+    def test_reminders_sent_in_one_call_per_chunk(self, settings, create_user):
+        """
+        Тест на отправку пачки одним вызовом send_messages и повтор по одному при отказе в пачке
+        """
+        settings.EMAIL_BACKEND = 'tasks.tests.test_tasks.RejectingEmailBackend'
+        for email in ('0@example.com', '1@example.com'):
+            user = create_user(email=email, first_name='first', last_name='last', team=self.team)
+            self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=user)
+        RejectingEmailBackend.batches = []
+        send_deadline_reminders()
+        assert RejectingEmailBackend.batches == [2]
+        rejected = create_user(email='rejected@example.com', first_name='first', last_name='last', team=self.team)
+        task = self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=rejected)
+        self._create_task(timezone.now() + timezone.timedelta(days=7))
+        RejectingEmailBackend.batches = []
+        send_deadline_reminders()
+        assert RejectingEmailBackend.batches == [2, 1, 1]
+        task.refresh_from_db()
+        assert not task.reminder_7days_sent
+        assert Task.objects.filter(reminder_7days_sent=True).count() == 3
+
+    def test_retried_chunk_not_sent_twice(self):
+        """
+        Тест на отсутствие повторной отправки при повторном запуске пачки
+        """
+        task = self._create_task(timezone.now() + timezone.timedelta(days=7))
+        now = timezone.now().isoformat()
+        send_deadline_reminder_chunk([task.pk], now)
+        send_deadline_reminder_chunk([task.pk], now)
+        assert len(self.mailoutbox) == 1
+
+    def test_failed_chunk_keeps_flags(self, settings):
+        """
+        Тест на отсутствие флагов напоминаний при ошибке отправки
+        """
+        settings.EMAIL_BACKEND = 'tasks.tests.test_tasks.FailingEmailBackend'
+        task = self._create_task(timezone.now() + timezone.timedelta(days=7))
+        overdue = self._create_task(timezone.now() + timezone.timedelta(days=4))
+        Task.objects.filter(pk=overdue.pk).update(deadline=timezone.now() - timezone.timedelta(days=2))
+        send_deadline_reminders()
+        task.refresh_from_db()
+        overdue.refresh_from_db()
+        assert not task.reminder_7days_sent
+        assert overdue.overdue_reminder_last_sent is None
+
+    def test_planner_splits_recipients_into_chunks(self, settings, create_user):
+        """
+        Тест на разбиение получателей на пачки
+        """
+        settings.REMINDER_CHUNK_SIZE = 2
+        for i in range(5):
+            user = create_user(email=f'{i}@example.com', first_name='first', last_name='last', team=self.team)
+            self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=user)
+        with patch.object(send_deadline_reminder_chunk, 's', wraps=send_deadline_reminder_chunk.s) as chunk:
+            send_deadline_reminders()
+        assert [len(call.args[0]) for call in chunk.call_args_list] == [2, 2, 1]
+        assert len(self.mailoutbox) == 5
+        assert Task.objects.filter(reminder_7days_sent=True).count() == 5
+
+    def test_planner_keeps_recipient_tasks_in_one_chunk(self, settings, create_user):
+        """
+        Тест на попадание всех задач одного получателя в одну пачку
+        """
+        settings.REMINDER_CHUNK_SIZE = 1
+        other = create_user(email='other@example.com', first_name='first', last_name='last', team=self.team)
+        self._create_task(timezone.now() + timezone.timedelta(days=7))
+        self._create_task(timezone.now() + timezone.timedelta(days=1))
+        self._create_task(timezone.now() + timezone.timedelta(days=7), assigned_to=other)
+        with patch.object(send_deadline_reminder_chunk, 's', wraps=send_deadline_reminder_chunk.s) as chunk:
+            send_deadline_reminders()
+        assert sorted(len(call.args[0]) for call in chunk.call_args_list) == [1, 2]
+        assert len(self.mailoutbox) == 2
+
+    def test_crashed_chunk_sent_on_retry(self):
+        """
+        Тест на повторную отправку напоминаний пачки, упавшей во время отправки
+        """
+        task = self._create_task(timezone.now() + timezone.timedelta(days=7))
+        now = timezone.now().isoformat()
+        with patch('tasks.tasks.send_messages_in_chunks', side_effect=SystemExit):
+            with pytest.raises(SystemExit):
+                send_deadline_reminder_chunk([task.pk], now)
+        task.refresh_from_db()
+        assert not task.reminder_7days_sent
+        send_deadline_reminder_chunk([task.pk], now)
+        task.refresh_from_db()
+        assert task.reminder_7days_sent
+        assert len(self.mailoutbox) == 1
+
+
+@pytest.mark.tasks
+@pytest.mark.django_db
+class TestNotifyAssignedToBatch:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, create_user, user_data, create_task,
+              task_data, mailoutbox):
+        self.admin = create_superuser(**admin_user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=self.team, **user_data)
+        self.task = create_task(created_by=self.admin, team=self.team, assigned_to=self.user, **task_data)
+        self.mailoutbox = mailoutbox
+
+    def test_drop_missing_and_reassigned(self, settings):
+        """
+        Тест на отбрасывание уведомлений о ненайденных и переназначенных задачах в воркере
+        """
+        settings.SHARED_CACHE = True
+        before = get_counters('task_notifications_dropped', 'task_notifications_sent')
+        notify_assigned_to_batch([self.task.pk, self.task.pk + 1000], [self.user.pk, self.user.pk])
+        notify_assigned_to_batch([self.task.pk], [self.admin.pk])
+        after = get_counters('task_notifications_dropped', 'task_notifications_sent')
+        assert after['task_notifications_dropped'] - before['task_notifications_dropped'] == 2
+        assert after['task_notifications_sent'] - before['task_notifications_sent'] == 1
+        assert [message.to for message in self.mailoutbox] == [[self.user.email]]
@@ -1,7 +1,12 @@
+from unittest.mock import patch
 import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from evaluations.models import Evaluation
 from tasks.models import Task, Comment
 
 
@@ -251,6 +256,300 @@ class TestTaskUpdateView:
         assert response.status_code == 401
 
 
+@pytest.mark.views
+@pytest.mark.django_db
+class TestTaskBulkCreateView:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, create_user, user_data, client,
+              django_capture_on_commit_callbacks):
+        self.admin = create_superuser(**admin_user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=self.team, **user_data)
+        self.url = reverse('tasks:bulk-create', kwargs={'team_id': self.team.id})
+        self.client = client
+        self.capture_on_commit = django_capture_on_commit_callbacks
+        self.deadline = timezone.now() + timezone.timedelta(days=4)
+        with patch('tasks.signals.notify_assigned_to_batch.delay') as self.delay:
+            yield
+
+    def _tasks_data(self, count, **kwargs):
+        return [{'title': f'task {i}', 'deadline': self.deadline, **kwargs} for i in range(count)]
+
+    def test_bulk_create_tasks_success(self):
+        """
+        Тест на успешное массовое создание задач с одним уведомлением на всех исполнителей
+        """
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            response = self.client.post(self.url, data=self._tasks_data(3, assigned_to=self.user.email), format='json')
+        assert response.status_code == 201
+        tasks = list(Task.objects.order_by('id'))
+        assert [task.title for task in tasks] == ['task 0', 'task 1', 'task 2']
+        assert all(task.created_by == self.admin and task.team == self.team for task in tasks)
+        assert [item['id'] for item in response.data] == [task.pk for task in tasks]
+        assert response.data[0]['assigned_to'] == self.user.email
+        self.delay.assert_called_once_with([task.pk for task in tasks], [self.user.pk] * 3)
+
+    def test_bulk_create_tasks_constant_queries(self, django_assert_max_num_queries):
+        """
+        Тест на создание 1000 задач постоянным количеством запросов
+        """
+        self.client.force_authenticate(self.admin)
+        data = self._tasks_data(1000, assigned_to=self.user.email)
+        with django_assert_max_num_queries(8):
+            response = self.client.post(self.url, data=data, format='json')
+        assert response.status_code == 201
+        assert Task.objects.count() == 1000
+
+    def test_bulk_create_tasks_without_assigned_to(self):
+        """
+        Тест на массовое создание задач без исполнителей
+        """
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            response = self.client.post(self.url, data=self._tasks_data(2), format='json')
+        assert response.status_code == 201
+        assert Task.objects.count() == 2
+        self.delay.assert_not_called()
+
+    def test_bulk_create_tasks_invalid_item(self):
+        """
+        Тест на массовое создание с невалидной задачей: ошибки по позициям, задачи не создаются
+        """
+        data = self._tasks_data(3)
+        data[1]['title'] = 'ab'
+        data[2]['assigned_to'] = 'unknown@example.com'
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(self.url, data=data, format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert 'title' in response.data[1]
+        assert 'assigned_to' in response.data[2]
+        assert Task.objects.count() == 0
+
+    def test_bulk_create_tasks_assigned_to_not_in_team(self, create_user):
+        """
+        Тест на массовое создание задачи с исполнителем не из команды
+        """
+        outsider = create_user(email='outsider@example.com', first_name='out', last_name='sider')
+        data = self._tasks_data(2)
+        data[1]['assigned_to'] = outsider.email
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(self.url, data=data, format='json')
+        assert response.status_code == 400
+        assert 'assigned_to' in response.data[1]
+        assert Task.objects.count() == 0
+
+    @pytest.mark.parametrize('data', [[], {'title': 'task'}])
+    def test_bulk_create_tasks_not_list(self, data):
+        """
+        Тест на массовое создание с пустым списком или не списком
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(self.url, data=data, format='json')
+        assert response.status_code == 400
+
+    def test_bulk_create_tasks_too_many(self, settings):
+        """
+        Тест на превышение максимального размера списка
+        """
+        settings.TASK_BULK_MAX_SIZE = 2
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(self.url, data=self._tasks_data(3), format='json')
+        assert response.status_code == 400
+        assert Task.objects.count() == 0
+
+    def test_bulk_create_tasks_someone_else_team(self, create_superuser):
+        """
+        Тест на массовое создание задач в чужой команде
+        """
+        other_admin = create_superuser(email='other@example.com', password='password123', first_name='other',
+                                       last_name='admin')
+        self.client.force_authenticate(other_admin)
+        response = self.client.post(self.url, data=self._tasks_data(2), format='json')
+        assert response.status_code == 403
+        assert Task.objects.count() == 0
+
+    def test_bulk_create_tasks_team_not_found(self):
+        """
+        Тест на массовое создание задач в несуществующей команде
+        """
+        self.client.force_authenticate(self.admin)
+        url = reverse('tasks:bulk-create', kwargs={'team_id': self.team.id + 1})
+        response = self.client.post(url, data=self._tasks_data(2), format='json')
+        assert response.status_code == 404
+
+    def test_bulk_create_tasks_not_admin(self):
+        """
+        Тест на массовое создание задач не админом
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=self._tasks_data(2), format='json')
+        assert response.status_code == 403
+
+
+@pytest.mark.views
+@pytest.mark.django_db
+class TestTaskBulkUpdateView:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, create_user, user_data, create_task,
+              task_data, client, django_capture_on_commit_callbacks):
+        self.admin = create_superuser(**admin_user_data)
+        self.team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=self.team, **user_data)
+        self.tasks = [
+            create_task(created_by=self.admin, team=self.team, **{**task_data, 'title': f'task {i}'})
+            for i in range(3)
+        ]
+        self.url = reverse('tasks:bulk-update', kwargs={'team_id': self.team.id})
+        self.client = client
+        self.capture_on_commit = django_capture_on_commit_callbacks
+        with patch('tasks.signals.notify_assigned_to_batch.delay') as self.delay:
+            yield
+
+    def test_bulk_update_tasks_success(self):
+        """
+        Тест на успешное массовое обновление задач с одним уведомлением на новых исполнителей
+        """
+        data = [
+            {'id': self.tasks[0].pk, 'title': 'new title'},
+            {'id': self.tasks[1].pk, 'assigned_to': self.user.email, 'status': 'in_progress'},
+            {'id': self.tasks[2].pk, 'assigned_to': self.user.email},
+        ]
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            response = self.client.patch(self.url, data=data, format='json')
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data] == [task.pk for task in self.tasks]
+        for task in self.tasks:
+            task.refresh_from_db()
+        assert self.tasks[0].title == 'new title'
+        assert self.tasks[0].assigned_to is None
+        assert self.tasks[1].status == Task.Status.IN_PROGRESS
+        assert self.tasks[1].assigned_to == self.user
+        assert self.tasks[2].title == 'task 2'
+        self.delay.assert_called_once_with([self.tasks[1].pk, self.tasks[2].pk], [self.user.pk] * 2)
+
+    def test_bulk_update_tasks_invalidates_calendar(self):
+        """
+        Тест на сброс кэша календаря прежнего и нового исполнителя после массового обновления
+        """
+        cache.clear()
+        calendar_url = reverse('calendars:calendar')
+        params = {
+            'start': timezone.now().strftime('%Y-%m-%d'),
+            'end': (timezone.now() + timezone.timedelta(days=6)).strftime('%Y-%m-%d'),
+        }
+        self.client.force_authenticate(self.user)
+        assert self.client.get(calendar_url, params).data['count'] == 0
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            response = self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'assigned_to': self.user.email}],
+                                         format='json')
+        assert response.status_code == 200
+        self.client.force_authenticate(self.user)
+        assert self.client.get(calendar_url, params).data['count'] == 1
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'assigned_to': None}], format='json')
+        self.client.force_authenticate(self.user)
+        assert self.client.get(calendar_url, params).data['count'] == 0
+        cache.clear()
+
+    def test_bulk_update_tasks_same_assigned_to(self):
+        """
+        Тест на массовое обновление без смены исполнителя: уведомление не отправляется
+        """
+        Task.objects.filter(pk=self.tasks[0].pk).update(assigned_to=self.user)
+        self.client.force_authenticate(self.admin)
+        with self.capture_on_commit(execute=True):
+            response = self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'assigned_to': self.user.email}],
+                                         format='json')
+        assert response.status_code == 200
+        self.delay.assert_not_called()
+
+    def test_bulk_update_tasks_reopen_deletes_evaluation(self):
+        """
+        Тест на удаление оценки при переоткрытии выполненной задачи
+        """
+        Task.objects.filter(pk=self.tasks[0].pk).update(status=Task.Status.DONE, assigned_to=self.user)
+        Evaluation.objects.create(task=self.tasks[0], rank=5)
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'status': 'open'}], format='json')
+        assert response.status_code == 200
+        assert Evaluation.objects.count() == 0
+
+    def test_bulk_update_done_task_deadline(self):
+        """
+        Тест на запрет изменения срока у выполненной задачи в массовом обновлении
+        """
+        Task.objects.filter(pk=self.tasks[1].pk).update(status=Task.Status.DONE, assigned_to=self.user)
+        data = [
+            {'id': self.tasks[0].pk, 'title': 'new title'},
+            {'id': self.tasks[1].pk, 'deadline': timezone.now() + timezone.timedelta(days=10)},
+        ]
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data=data, format='json')
+        assert response.status_code == 400
+        assert 'deadline' in response.data[1]
+        self.tasks[0].refresh_from_db()
+        assert self.tasks[0].title == 'task 0'
+
+    def test_bulk_update_someone_else_task(self, create_superuser, create_team, create_task, task_data):
+        """
+        Тест на массовое обновление чужой задачи
+        """
+        other_admin = create_superuser(email='other@example.com', password='password123', first_name='other',
+                                       last_name='admin')
+        other_task = create_task(created_by=other_admin, team=self.team, **task_data)
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data=[{'id': other_task.pk, 'title': 'new title'}], format='json')
+        assert response.status_code == 400
+        assert 'id' in response.data[0]
+
+    def test_bulk_update_duplicate_tasks(self):
+        """
+        Тест на повтор задачи в списке массового обновления
+        """
+        data = [{'id': self.tasks[0].pk, 'title': 'first'}, {'id': self.tasks[0].pk, 'title': 'second'}]
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data=data, format='json')
+        assert response.status_code == 400
+
+    def test_bulk_update_assigned_to_not_in_team(self, create_user):
+        """
+        Тест на массовое обновление с исполнителем не из команды
+        """
+        outsider = create_user(email='outsider@example.com', first_name='out', last_name='sider')
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'assigned_to': outsider.email}],
+                                     format='json')
+        assert response.status_code == 400
+        assert 'assigned_to' in response.data[0]
+
+    def test_bulk_update_constant_queries(self, create_task, task_data, django_assert_max_num_queries):
+        """
+        Тест на массовое обновление постоянным количеством запросов
+        """
+        tasks = Task.objects.bulk_create(
+            Task(created_by=self.admin, team=self.team, **{**task_data, 'title': f'bulk {i}'}) for i in range(200)
+        )
+        data = [{'id': task.pk, 'assigned_to': self.user.email, 'status': 'in_progress'} for task in tasks]
+        self.client.force_authenticate(self.admin)
+        with django_assert_max_num_queries(8):
+            response = self.client.patch(self.url, data=data, format='json')
+        assert response.status_code == 200
+        assert Task.objects.filter(status=Task.Status.IN_PROGRESS, assigned_to=self.user).count() == 200
+
+    def test_bulk_update_tasks_not_admin(self):
+        """
+        Тест на массовое обновление задач не админом
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(self.url, data=[{'id': self.tasks[0].pk, 'title': 'new'}], format='json')
+        assert response.status_code == 403
+
+
 @pytest.mark.views
 @pytest.mark.django_db
 class TestTaskDeleteView:
@@ -430,9 +729,9 @@ class TestTaskListOwnView:
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert len(response.data) == len(self.tasks)
-        assert response.data[0]['title'] == task_data['title']
-        assert response.data[1]['created_by_email'] == self.admin.email
+        assert len(response.data['results']) == len(self.tasks)
+        assert response.data['results'][0]['title'] == task_data['title']
+        assert response.data['results'][1]['created_by_email'] == self.admin.email
 
     def test_list_task_own_comments(self):
         """
@@ -441,9 +740,9 @@ class TestTaskListOwnView:
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert len(response.data[0]['comments']) == len(self.comments) / len(self.tasks)
-        assert response.data[0]['comments'][0]['author_email'] == self.user.email
-        assert response.data[1]['comments'][-1]['text'] == 'test 0'
+        assert len(response.data['results'][0]['comments']) == len(self.comments) / len(self.tasks)
+        assert response.data['results'][0]['comments'][0]['author_email'] == self.user.email
+        assert response.data['results'][1]['comments'][-1]['text'] == 'test 0'
 
     def test_list_task_own_not_tasks(self):
         """
@@ -452,7 +751,111 @@ class TestTaskListOwnView:
         self.client.force_authenticate(self.admin)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert response.data == []
+        assert response.data['results'] == []
+
+    def test_list_task_own_pagination(self):
+        """
+        Тест на курсорную пагинацию списка задач исполнителя
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'page_size': 2})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 2
+        assert response.data['previous'] is None
+        assert response.data['next'] is not None
+        next_response = self.client.get(response.data['next'])
+        assert next_response.status_code == 200
+        assert len(next_response.data['results']) == 1
+        assert next_response.data['next'] is None
+        ids = [t['id'] for t in response.data['results'] + next_response.data['results']]
+        assert ids == sorted((t.id for t in self.tasks), reverse=True)
+
+    def test_list_task_own_filter_status(self):
+        """
+        Тест на фильтрацию списка задач исполнителя по статусу
+        """
+        Task.objects.filter(pk=self.tasks[1].pk).update(status=Task.Status.IN_PROGRESS)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'status': 'in_progress'})
+        assert response.status_code == 200
+        assert [t['id'] for t in response.data['results']] == [self.tasks[1].id]
+
+    def test_list_task_own_ordering_deadline(self):
+        """
+        Тест на сортировку списка задач исполнителя по сроку с курсорной пагинацией
+        """
+        now = timezone.now()
+        for days, task in zip((5, 3, 4), self.tasks):
+            Task.objects.filter(pk=task.pk).update(deadline=now + timezone.timedelta(days=days))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'ordering': 'deadline', 'page_size': 2})
+        assert response.status_code == 200
+        next_response = self.client.get(response.data['next'])
+        ids = [t['id'] for t in response.data['results'] + next_response.data['results']]
+        assert ids == [self.tasks[1].id, self.tasks[2].id, self.tasks[0].id]
+
+    @pytest.mark.parametrize('ordering', ['deadline', '-deadline', 'created_at'])
+    def test_list_task_own_keyset_ties(self, ordering, create_task, task_data):
+        """
+        Тест на пагинацию по ключу (поле, id) внутри большой группы одинаковых значений:
+        без OFFSET, без пропусков и повторов вперёд и назад
+        """
+        for _ in range(7):
+            self.tasks.append(create_task(created_by=self.admin, team=self.team, assigned_to=self.user, **task_data))
+        Task.objects.filter(assigned_to=self.user).update(deadline=task_data['deadline'],
+                                                          created_at=task_data['deadline'])
+        expected = sorted(t.id for t in self.tasks)
+        if ordering.startswith('-'):
+            expected.reverse()
+        self.client.force_authenticate(self.user)
+        ids = []
+        url, params = self.url, {'ordering': ordering, 'page_size': 3}
+        pages = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            assert response.status_code == 200
+            assert not any('OFFSET' in q['sql'] for q in queries.captured_queries)
+            pages.append(response.data)
+            ids += [t['id'] for t in response.data['results']]
+            url, params = response.data['next'], None
+        assert ids == expected
+        previous = self.client.get(pages[-1]['previous'])
+        assert [t['id'] for t in previous.data['results']] == [t['id'] for t in pages[-2]['results']]
+        assert previous.data['next'] is not None
+
+    def test_list_task_own_filter_deadline_range(self):
+        """
+        Тест на фильтрацию списка задач исполнителя по периоду срока исполнения
+        """
+        now = timezone.now()
+        for days, task in zip((5, 3, 4), self.tasks):
+            Task.objects.filter(pk=task.pk).update(deadline=now + timezone.timedelta(days=days))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {
+            'deadline_from': (now + timezone.timedelta(days=3, hours=12)).isoformat(),
+            'deadline_to': (now + timezone.timedelta(days=6)).isoformat(),
+            'ordering': '-deadline',
+        })
+        assert response.status_code == 200
+        assert [t['id'] for t in response.data['results']] == [self.tasks[0].id, self.tasks[2].id]
+
+    @pytest.mark.parametrize(
+        'params',
+        [
+            {'status': 'unknown'},
+            {'ordering': 'title'},
+            {'team': 'abc'},
+            {'deadline_from': '2030-01-02T00:00:00Z', 'deadline_to': '2030-01-01T00:00:00Z'},
+        ]
+    )
+    def test_list_task_own_invalid_filters(self, params):
+        """
+        Тест на список задач исполнителя с невалидными параметрами фильтрации
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, params)
+        assert response.status_code == 400
 
     def test_list_task_own_unauthenticated_user(self):
         """
@@ -488,10 +891,10 @@ class TestTaskListAdminView:
         self.client.force_authenticate(self.admin)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert len(response.data) == len(self.tasks)
-        assert response.data[0]['title'] == task_data['title']
-        assert response.data[1]['assigned_to_email'] == self.user.email
-        assert response.data[2]['team_name'] == self.team.name
+        assert len(response.data['results']) == len(self.tasks)
+        assert response.data['results'][0]['title'] == task_data['title']
+        assert response.data['results'][1]['assigned_to_email'] == self.user.email
+        assert response.data['results'][2]['team_name'] == self.team.name
 
     def test_list_task_admin_comments(self):
         """
@@ -500,9 +903,9 @@ class TestTaskListAdminView:
         self.client.force_authenticate(self.admin)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert len(response.data[0]['comments']) == len(self.comments) / len(self.tasks)
-        assert response.data[0]['comments'][0]['author_email'] == self.admin.email
-        assert response.data[1]['comments'][-1]['text'] == 'test 0'
+        assert len(response.data['results'][0]['comments']) == len(self.comments) / len(self.tasks)
+        assert response.data['results'][0]['comments'][0]['author_email'] == self.admin.email
+        assert response.data['results'][1]['comments'][-1]['text'] == 'test 0'
 
     def test_list_task_admin_not_tasks(self, create_superuser, admin_user_data):
         """
@@ -517,8 +920,48 @@ class TestTaskListAdminView:
         self.client.force_authenticate(new_admin)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        assert len(response.data) == 0
-        assert response.data == []
+        assert len(response.data['results']) == 0
+        assert response.data['results'] == []
+
+    def test_list_task_admin_pagination(self):
+        """
+        Тест на курсорную пагинацию списка задач админа
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'page_size': 1})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['id'] == self.tasks[-1].id
+        seen = [response.data['results'][0]['id']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen.extend(t['id'] for t in response.data['results'])
+        assert seen == [t.id for t in reversed(self.tasks)]
+        previous_response = self.client.get(response.data['previous'])
+        assert previous_response.status_code == 200
+        assert previous_response.data['results'][0]['id'] == self.tasks[1].id
+
+    def test_list_task_admin_filter_assigned_to(self, create_user):
+        """
+        Тест на фильтрацию списка задач админа по исполнителю
+        """
+        other = create_user(email='other@example.com', first_name='other', last_name='user', team=self.team)
+        Task.objects.filter(pk=self.tasks[0].pk).update(assigned_to=other)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'assigned_to': other.email})
+        assert response.status_code == 200
+        assert [t['id'] for t in response.data['results']] == [self.tasks[0].id]
+
+    def test_list_task_admin_filter_team(self, create_team):
+        """
+        Тест на фильтрацию списка задач админа по команде
+        """
+        other_team = create_team(creator=self.admin, name='other team')
+        Task.objects.filter(pk=self.tasks[0].pk).update(team=other_team)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'team': self.team.id, 'ordering': 'created_at'})
+        assert response.status_code == 200
+        assert [t['id'] for t in response.data['results']] == [t.id for t in self.tasks[1:]]
 
     def test_list_task_admin_not_admin(self):
         """
@@ -534,3 +977,98 @@ class TestTaskListAdminView:
         """
         response = self.client.get(self.url)
         assert response.status_code == 401
+
+
+@pytest.mark.views
+@pytest.mark.django_db
+class TestTaskSearchView:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_team, team_data, create_task, task_data, create_user,
+              user_data, client):
+        self.admin = create_superuser(**admin_user_data)
+        team = create_team(creator=self.admin, **team_data)
+        self.user = create_user(team=team, **user_data)
+        self.task = create_task(created_by=self.admin, team=team, assigned_to=self.user,
+                                **{**task_data, 'title': 'Обновить документацию'})
+        Comment.objects.create(task=self.task, author=self.admin, text='Добавить раздел про развёртывание')
+        self.url = reverse('tasks:search')
+        self.client = client
+
+    @pytest.mark.parametrize('q', ['документация', 'развёртывания'])
+    def test_search_tasks_success(self, q):
+        """
+        Тест на успешный поиск задачи по названию и по комментарию
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'q': q})
+        assert response.status_code == 200
+        assert len(response.data) == 1
+        assert response.data[0]['id'] == self.task.id
+        assert response.data[0]['rank'] > 0
+
+    def test_search_tasks_not_found(self):
+        """
+        Тест на поиск без совпадений
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'q': 'бюджет'})
+        assert response.status_code == 200
+        assert response.data == []
+
+    @pytest.mark.parametrize('params', [{}, {'q': 'a'}, {'q': 'документация', 'limit': 0}])
+    def test_search_tasks_invalid_params(self, params):
+        """
+        Тест на поиск с невалидными параметрами
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, params)
+        assert response.status_code == 400
+
+    def test_search_tasks_unauthenticated_user(self):
+        """
+        Тест на поиск неавторизованным пользователем
+        """
+        response = self.client.get(self.url, {'q': 'документация'})
+        assert response.status_code == 401
+
+
+@pytest.mark.views
+@pytest.mark.django_db
+class TestTaskNotificationStatsView:
+    @pytest.fixture(autouse=True)
+    def setup(self, create_superuser, admin_user_data, create_user, user_data, client):
+        self.admin = create_superuser(**admin_user_data)
+        self.user = create_user(**user_data)
+        self.client = client
+        self.url = reverse('tasks:notification-stats')
+
+    def test_notification_stats_success(self, settings):
+        """
+        Тест на успешное получение счётчиков уведомлений
+        """
+        settings.SHARED_CACHE = True
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+        assert set(response.data) == {
+            'task_notifications_sent',
+            'task_notifications_dropped',
+            'task_notifications_duplicate',
+        }
+
+    def test_notification_stats_without_shared_cache(self, settings):
+        """
+        Тест на отказ в счётчиках без общего кэша вместо неполных значений
+        """
+        settings.SHARED_CACHE = False
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url)
+        assert response.status_code == 503
+
+    def test_notification_stats_not_admin(self):
+        """
+        Тест на получение счётчиков уведомлений не админом
+        """
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        assert response.status_code == 403
@@ -6,8 +6,12 @@ app_name = 'tasks'
 urlpatterns = [
     path('<int:team_id>/create/', views.TaskCreateView.as_view(), name='create'),
     path('<int:team_id>/update/<int:pk>/', views.TaskUpdateView.as_view(), name='update'),
+    path('<int:team_id>/bulk-create/', views.TaskBulkCreateView.as_view(), name='bulk-create'),
+    path('<int:team_id>/bulk-update/', views.TaskBulkUpdateView.as_view(), name='bulk-update'),
     path('<int:team_id>/delete/<int:pk>/', views.TaskDeleteView.as_view(), name='delete'),
     path('<int:task_id>/add/', views.CommentCreateView.as_view(), name='add-comment'),
     path('own-list/', views.TaskListOwnView.as_view(), name='own-list'),
     path('admin-list/', views.TaskListAdminView.as_view(), name='admin-list'),
+    path('search/', views.TaskSearchView.as_view(), name='search'),
+    path('notifications/stats/', views.TaskNotificationStatsView.as_view(), name='notification-stats'),
 ]
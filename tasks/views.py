@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db.models import F, Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework.generics import (
@@ -7,15 +8,26 @@ from rest_framework.generics import (
     ListAPIView
 )
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from final_project.metrics import get_counters
 from teams.models import Team
 from .models import Task, Comment
+from .pagination import TaskCursorPagination
 from .serializers import (
     TaskCreateSerializer,
     TaskUpdateSerializer,
+    TaskBulkCreateSerializer,
+    TaskBulkUpdateSerializer,
     CommentCreateSerializer,
     TaskListUserSerializer,
-    TaskListAdminSerializer
+    TaskListAdminSerializer,
+    TaskListQuerySerializer,
+    TaskListAdminQuerySerializer,
+    TaskSearchQuerySerializer,
+    TaskSearchSerializer
 )
 from .services import TaskService, CommentService
 
@@ -62,6 +74,53 @@ class TaskUpdateView(UpdateAPIView):
         serializer.save()
 
 
+class TaskBulkCreateView(APIView):
+    """
+    Массовое создание задач
+    """
+    permission_classes = (IsAdminUser,)
+
+    def post(self, request, team_id):
+        team = get_object_or_404(Team, pk=team_id)
+        serializer = TaskBulkCreateSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.TASK_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        tasks = TaskService.bulk_create_tasks(
+            created_by=request.user,
+            team=team,
+            tasks_data=serializer.validated_data
+        )
+        return Response(TaskBulkCreateSerializer(tasks, many=True).data, status=status.HTTP_201_CREATED)
+
+
+class TaskBulkUpdateView(APIView):
+    """
+    Массовое частичное обновление задач
+    """
+    permission_classes = (IsAdminUser,)
+
+    def patch(self, request, team_id):
+        serializer = TaskBulkUpdateSerializer(
+            Task.objects.filter(created_by=request.user, team_id=team_id),
+            data=request.data,
+            many=True,
+            partial=True,
+            allow_empty=False,
+            max_length=settings.TASK_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        tasks = TaskService.bulk_update_tasks(
+            team_id=team_id,
+            tasks=[serializer.instances[item['id']] for item in serializer.validated_data],
+            items=serializer.validated_data
+        )
+        return Response(TaskBulkUpdateSerializer(tasks, many=True).data)
+
+
 class TaskDeleteView(DestroyAPIView):
     """
     Удаление задачи
@@ -93,12 +152,27 @@ class CommentCreateView(CreateAPIView):
         )
 
 
-class TaskListOwnView(ListAPIView):
+class TaskListFilterMixin:
+    """
+    Фильтрация и выбор порядка списка задач по параметрам запроса
+    """
+    query_serializer_class = TaskListQuerySerializer
+
+    def filter_queryset(self, queryset):
+        serializer = self.query_serializer_class(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        self.list_ordering = params.pop('ordering')
+        return TaskService.filter_tasks(queryset, **params)
+
+
+class TaskListOwnView(TaskListFilterMixin, ListAPIView):
     """
     Просмотр списка своих задач
     """
     permission_classes = (IsAuthenticated,)
     serializer_class = TaskListUserSerializer
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         return (
@@ -125,12 +199,14 @@ class TaskListOwnView(ListAPIView):
         )
 
 
-class TaskListAdminView(ListAPIView):
+class TaskListAdminView(TaskListFilterMixin, ListAPIView):
     """
     Просмотр списка задач админом
     """
     permission_classes = (IsAdminUser,)
     serializer_class = TaskListAdminSerializer
+    query_serializer_class = TaskListAdminQuerySerializer
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         return (
@@ -155,3 +231,34 @@ class TaskListAdminView(ListAPIView):
                 'updated_at'
             )
         )
+
+
+class TaskSearchView(APIView):
+    """
+    Полнотекстовый поиск по задачам и комментариям
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        serializer = TaskSearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        tasks = TaskService.search_tasks(
+            user=request.user,
+            text=serializer.validated_data['q'],
+            limit=serializer.validated_data['limit'],
+        )
+        return Response(TaskSearchSerializer(tasks, many=True).data)
+
+
+class TaskNotificationStatsView(APIView):
+    """
+    Счётчики уведомлений о назначении задач
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_counters(
+            'task_notifications_sent',
+            'task_notifications_dropped',
+            'task_notifications_duplicate',
+        ))
@@ -1,3 +1,4 @@
+from functools import partial
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.core.exceptions import ValidationError
@@ -18,11 +19,12 @@ class TeamService:
             )
         user.team = team
         user.save(update_fields=['team'])
-        notify_user_team_change(
+        transaction.on_commit(partial(
+            notify_user_team_change.delay,
             user_email=user.email,
             team_name=team.name,
             action='added'
-        )
+        ))
 
     @staticmethod
     @transaction.atomic
@@ -34,11 +36,12 @@ class TeamService:
         team_name = user.team.name
         user.team = None
         user.save(update_fields=['team'])
-        notify_user_team_change(
+        transaction.on_commit(partial(
+            notify_user_team_change.delay,
             user_email=user.email,
             team_name=team_name,
             action='removed'
-        )
+        ))
 
     @staticmethod
     @transaction.atomic
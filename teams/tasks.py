@@ -1,16 +1,18 @@
 import logging
 from celery import shared_task
-from django.conf import settings
-from django.core.mail import send_mail
-from django.utils.html import strip_tags
 
-from .models import Team
+from final_project.mail import build_html_message, send_messages_in_chunks
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600, retry_jitter=True, max_retries=5)
 def notify_user_team_change(user_email, team_name, action):
+    """
+    Уведомление пользователя о добавлении в команду или удалении из неё через общие
+    почтовые функции. Ошибки соединения с почтовым сервером (в том числе SMTPException)
+    пробрасываются из send_messages_in_chunks и повторяются с экспоненциальной задержкой
+    """
     if action not in ('added', 'removed'):
         logger.error(f'Неверный action в notify_user_team_change: {action}')
         return
@@ -36,16 +38,6 @@ def notify_user_team_change(user_email, team_name, action):
         <p>С уважением,<br>Система управления бизнесом</p>
         </body>
         </html>"""
-    text = strip_tags(html_text)
-    try:
-        send_mail(
-            subject=subject,
-            message=text,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user_email],
-            fail_silently=False,
-            html_message=html_text,
-        )
-        logger.info(f'Уведомление о {action} в команду "{team_name}" отправлено на {user_email}')
-    except Exception as e:
-        logger.exception(f'Ошибка отправки уведомления о {action} в команду на {user_email}: {str(e)}')
+    message = build_html_message(subject, html_text, [user_email])
+    send_messages_in_chunks([message], fail_silently=False)
+    logger.info(f'Уведомление о {action} в команду "{team_name}" отправлено на {user_email}')
@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 
@@ -29,6 +30,18 @@ class TestAddUserToTeam:
             TeamService.add_user_to_team(second_team, regular_user)
         assert 'уже состоит' in str(exc.value)
 
+    def test_add_user_to_team_notifies_on_commit(self, team, regular_user, django_capture_on_commit_callbacks):
+        """
+        Тест на постановку уведомления в очередь только после фиксации транзакции
+        """
+        with patch('teams.services.notify_user_team_change.delay') as delay:
+            with django_capture_on_commit_callbacks() as callbacks:
+                TeamService.add_user_to_team(team, regular_user)
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(user_email=regular_user.email, team_name=team.name, action='added')
+
 
 @pytest.mark.services
 @pytest.mark.django_db
@@ -56,6 +69,18 @@ class TestRemoveUserFromTeam:
             TeamService.remove_user_from_team(regular_user)
         assert 'не состоит' in str(exc.value)
 
+    def test_remove_user_from_team_notifies_on_commit(self, team, regular_user, django_capture_on_commit_callbacks):
+        """
+        Тест на постановку уведомления в очередь только после фиксации транзакции
+        """
+        with patch('teams.services.notify_user_team_change.delay') as delay:
+            with django_capture_on_commit_callbacks() as callbacks:
+                TeamService.remove_user_from_team(regular_user)
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(user_email=regular_user.email, team_name=team.name, action='removed')
+
 
 @pytest.mark.services
 @pytest.mark.django_db
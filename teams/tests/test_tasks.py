@@ -0,0 +1,77 @@
+import pytest
+from smtplib import SMTPServerDisconnected
+from unittest.mock import patch
+from django.core.mail.backends.locmem import EmailBackend
+
+from final_project.mail import send_messages_in_chunks
+from teams.tasks import notify_user_team_change
+
+
+class FlakyEmailBackend(EmailBackend):
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyEmailBackend.failures:
+            FlakyEmailBackend.failures -= 1
+            raise SMTPServerDisconnected('SMTP недоступен')
+        return super().send_messages(messages)
+
+
+@pytest.mark.tasks
+class TestNotifyUserTeamChange:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, mailoutbox):
+        settings.EMAIL_BACKEND = 'teams.tests.test_tasks.FlakyEmailBackend'
+        self.mailoutbox = mailoutbox
+
+    @pytest.mark.parametrize('action', ['added', 'removed'])
+    def test_notify_success(self, action):
+        """
+        Тест на отправку уведомления об изменении команды
+        """
+        FlakyEmailBackend.failures = 0
+        notify_user_team_change.apply(kwargs={'user_email': 'user@example.com', 'team_name': 'team',
+                                              'action': action}).get()
+        assert len(self.mailoutbox) == 1
+        assert self.mailoutbox[0].to == ['user@example.com']
+
+    def test_notify_uses_shared_mail_helpers(self):
+        """
+        Тест на отправку уведомления через общие почтовые функции с пробросом ошибок
+        """
+        FlakyEmailBackend.failures = 0
+        with patch('teams.tasks.send_messages_in_chunks', wraps=send_messages_in_chunks) as send:
+            notify_user_team_change.apply(kwargs={'user_email': 'user@example.com', 'team_name': 'team',
+                                                  'action': 'added'}).get()
+        assert send.call_count == 1
+        assert send.call_args.kwargs == {'fail_silently': False}
+        assert self.mailoutbox[0].alternatives[0][1] == 'text/html'
+
+    def test_notify_retry_on_smtp_error(self):
+        """
+        Тест на повтор отправки уведомления после ошибки SMTP
+        """
+        FlakyEmailBackend.failures = 2
+        notify_user_team_change.apply(kwargs={'user_email': 'user@example.com', 'team_name': 'team',
+                                              'action': 'added'}).get()
+        assert FlakyEmailBackend.failures == 0
+        assert len(self.mailoutbox) == 1
+
+    def test_notify_gives_up_after_max_retries(self):
+        """
+        Тест на прекращение повторов после исчерпания попыток
+        """
+        FlakyEmailBackend.failures = notify_user_team_change.max_retries + 1
+        result = notify_user_team_change.apply(kwargs={'user_email': 'user@example.com', 'team_name': 'team',
+                                                       'action': 'added'})
+        assert isinstance(result.result, SMTPServerDisconnected)
+        assert FlakyEmailBackend.failures == 0
+        assert len(self.mailoutbox) == 0
+
+    def test_notify_invalid_action(self):
+        """
+        Тест на неверный action
+        """
+        notify_user_team_change.apply(kwargs={'user_email': 'user@example.com', 'team_name': 'team',
+                                              'action': 'moved'}).get()
+        assert len(self.mailoutbox) == 0
@@ -1,10 +1,13 @@
 from datetime import date
 
 import pytest
+from unittest.mock import patch
+from django.core import mail
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from teams.models import Team
+from teams.tasks import notify_user_team_change
 
 User = get_user_model()
 
@@ -185,6 +188,22 @@ class TestTeamAddUserView:
         self.regular_user.refresh_from_db()
         assert self.regular_user.team == self.team
 
+    def test_add_user_does_not_wait_for_mail(self, celery_eager, django_capture_on_commit_callbacks):
+        """
+        Тест на постановку уведомления в очередь после фиксации транзакции без отправки письма в запросе
+        """
+        self.client.force_authenticate(self.admin_user)
+        with patch('teams.services.notify_user_team_change.delay', wraps=notify_user_team_change.delay) as delay:
+            with django_capture_on_commit_callbacks() as callbacks:
+                response = self.client.post(self.url, data={'user_email': self.regular_user.email})
+            assert response.status_code == 200
+            assert mail.outbox == []
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(user_email=self.regular_user.email, team_name=self.team.name, action='added')
+        assert [message.to for message in mail.outbox] == [[self.regular_user.email]]
+
     def test_add_user_already_in_team(self):
         """
         Тест на добавление пользователя, состоящего в команде
@@ -239,6 +258,7 @@ class TestTeamRemoveUserView:
         self.regular_user = regular_user
         self.regular_user.team = team
         self.regular_user.save()
+        self.team = team
 
     def test_remove_user_success(self):
         """
@@ -250,6 +270,22 @@ class TestTeamRemoveUserView:
         self.regular_user.refresh_from_db()
         assert self.regular_user.team is None
 
+    def test_remove_user_does_not_wait_for_mail(self, celery_eager, django_capture_on_commit_callbacks):
+        """
+        Тест на постановку уведомления в очередь после фиксации транзакции без отправки письма в запросе
+        """
+        self.client.force_authenticate(self.admin_user)
+        with patch('teams.services.notify_user_team_change.delay', wraps=notify_user_team_change.delay) as delay:
+            with django_capture_on_commit_callbacks() as callbacks:
+                response = self.client.post(self.url, data={'user_email': self.regular_user.email})
+            assert response.status_code == 200
+            assert mail.outbox == []
+            delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+        delay.assert_called_once_with(user_email=self.regular_user.email, team_name=self.team.name, action='removed')
+        assert [message.to for message in mail.outbox] == [[self.regular_user.email]]
+
     def test_remove_user_without_team(self):
         """
         Тест на удаление пользователя без команды
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import user_cache_key
+
+User = get_user_model()
+
+CLAIM_FIELDS = ('role', 'team_id', 'is_staff')
+CACHED_FIELDS = tuple(f.attname for f in User._meta.concrete_fields if f.attname != 'password')
+
+
+def set_user_claims(token, user):
+    """
+    Запись в токен полей пользователя для клиентов. Аутентификация этим полям не доверяет
+    """
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+
+
+def _build_user(values):
+    """
+    Пользователь из полной строки без пароля. Пароль отложен и загружается из БД при обращении,
+    save() такого пользователя записывает только загруженные поля
+    """
+    return User.from_db(router.db_for_read(User), list(values), list(values.values()))
+
+
+class CachedUserJWTAuthentication(JWTAuthentication):
+    """
+    Аутентификация по JWT с чтением строки пользователя из общего кэша. Строка сбрасывается
+    после фиксации любого изменения пользователя (save(), delete(), QuerySet.update(), удаление команды),
+    поэтому деактивация действует со следующего запроса. Без общего кэша (SHARED_CACHE) сброс
+    в одном процессе не виден остальным, поэтому пользователь всегда читается из БД
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken('Токен не содержит идентификатора пользователя') from e
+
+        if not settings.SHARED_CACHE:
+            return self._check_active(_build_user(self._load_values(user_id)))
+
+        values = cache.get(user_cache_key(user_id))
+        if values is None:
+            values = self._load_values(user_id)
+            cache.set(user_cache_key(user_id), values, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return self._check_active(_build_user(values))
+
+    @staticmethod
+    def _load_values(user_id):
+        values = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*CACHED_FIELDS).first()
+        if values is None:
+            raise AuthenticationFailed('Пользователь не найден', code='user_not_found')
+        return values
+
+    @staticmethod
+    def _check_active(user):
+        if not user.is_active:
+            raise AuthenticationFailed('Пользователь неактивен', code='user_inactive')
+        return user
@@ -0,0 +1,14 @@
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user_cache(*user_ids):
+    """
+    Сброс кэшированных строк пользователей, по которым проходит аутентификация.
+    Сигналы вызывают его при save() и delete(), UserQuerySet — при update()
+    """
+    if user_ids:
+        cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
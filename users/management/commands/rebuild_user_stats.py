@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from users.services import refresh_user_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Полный пересчёт статистики пользователей пачками. Нужен после ручных правок данных в обход сигналов
+    """
+    help = 'Пересчитывает статистику всех пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.USER_STATS_BATCH_SIZE,
+                            help='Количество пользователей в одном запросе')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not user_ids:
+                break
+            refresh_user_stats(user_ids)
+            total += len(user_ids)
+            last_id = user_ids[-1]
+        self.stdout.write(self.style.SUCCESS(f'Пересчитана статистика пользователей: {total}'))
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 04:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('users', '0003_alter_userwithemail_birthday'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    # Модель выданных токенов принадлежит rest_framework_simplejwt, поэтому индекс для очистки
+    # истёкших токенов создаётся SQL-запросом без блокировки записи в таблицу
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX CONCURRENTLY IF NOT EXISTS outstanding_token_expires_idx '
+                'ON token_blacklist_outstandingtoken (expires_at)',
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS outstanding_token_expires_idx',
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-18 03:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_stats(apps, schema_editor):
+    """
+    Заполнение статистики существующих пользователей
+    """
+    User = apps.get_model('users', 'UserWithEmail')
+    UserStats = apps.get_model('users', 'UserStats')
+    Task = apps.get_model('tasks', 'Task')
+    Evaluation = apps.get_model('evaluations', 'Evaluation')
+    schema_editor.execute(
+        f"""
+        INSERT INTO {UserStats._meta.db_table} (
+            user_id, tasks_done, evaluation_count, rank_sum, overdue_count, updated_at
+        )
+        SELECT
+            u.id,
+            count(t.id) FILTER (WHERE t.status = 'done'),
+            count(e.id),
+            coalesce(sum(e.rank), 0),
+            count(t.id) FILTER (WHERE t.status IN ('open', 'in_progress') AND t.deadline < now()),
+            now()
+        FROM {User._meta.db_table} AS u
+        LEFT JOIN {Task._meta.db_table} AS t ON t.assigned_to_id = u.id
+        LEFT JOIN {Evaluation._meta.db_table} AS e ON e.task_id = t.id
+        GROUP BY u.id
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_outstanding_token_expires_index'),
+        ('tasks', '0009_task_list_filter_indexes'),
+        ('evaluations', '0002_evaluation_unique_task_eval'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('tasks_done', models.PositiveIntegerField(default=0, verbose_name='Выполнено задач')),
+                ('evaluation_count', models.PositiveIntegerField(default=0, verbose_name='Количество оценок')),
+                ('rank_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')),
+                ('overdue_count', models.PositiveIntegerField(default=0, verbose_name='Просрочено задач')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
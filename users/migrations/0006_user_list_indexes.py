@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 03:54
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY не работает внутри транзакции
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('teams', '0002_alter_team_options_team_creator_team_description_and_more'),
+        ('users', '0005_userstats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='userwithemail',
+            index=models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userwithemail',
+            index=models.Index(fields=['role', 'email'], name='user_role_email_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userwithemail',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='user_email_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userwithemail',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='text_pattern_ops'), name='user_first_name_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='userwithemail',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='text_pattern_ops'), name='user_last_name_prefix_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0 on 2026-10-18 04:09
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def start_overdue_refresh(apps, schema_editor):
+    """
+    Отметка пересчёта просроченных задач и пересчёт просроченных задач относительно неё,
+    чтобы статистика, заполненная в 0005, совпадала с границей учёта просроченных задач
+    """
+    UserStats = apps.get_model('users', 'UserStats')
+    UserStatsRefresh = apps.get_model('users', 'UserStatsRefresh')
+    Task = apps.get_model('tasks', 'Task')
+    now = timezone.now()
+    UserStatsRefresh.objects.create(name='overdue', last_run=now)
+    schema_editor.execute(
+        f"""
+        UPDATE {UserStats._meta.db_table} AS s
+        SET overdue_count = (
+            SELECT count(*) FROM {Task._meta.db_table} AS t
+            WHERE t.assigned_to_id = s.user_id AND t.status IN ('open', 'in_progress') AND t.deadline < %s
+        )
+        """,
+        [now],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_user_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsRefresh',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False, verbose_name='Пересчёт')),
+                ('last_run', models.DateTimeField(verbose_name='Последний запуск')),
+            ],
+            options={
+                'verbose_name': 'Отметка пересчёта статистики',
+                'verbose_name_plural': 'Отметки пересчёта статистики',
+            },
+        ),
+        migrations.RunPython(start_overdue_refresh, migrations.RunPython.noop),
+    ]
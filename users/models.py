@@ -1,12 +1,31 @@
 from datetime import date
+from functools import partial
+from django.contrib.postgres.indexes import OpClass
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 
 from teams.models import Team
+from .cache import invalidate_user_cache
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Массовое обновление со сбросом кэша аутентификации изменённых пользователей после фиксации.
+        Строки блокируются до обновления, чтобы набор сбрасываемых id совпал с обновлёнными
+        """
+        with transaction.atomic(using=self.db):
+            user_ids = list(self.select_for_update().values_list('pk', flat=True))
+            updated = super().update(**kwargs)
+            transaction.on_commit(partial(invalidate_user_cache, *user_ids), using=self.db)
+        return updated
+
+    update.alters_data = True
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def _create_user(self, email, first_name, last_name, password, **extra_fields):
         if not email:
             raise ValueError('Email должен быть обязательно указан')
@@ -92,6 +111,13 @@ class UserWithEmail(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['email', '-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='user_created_idx'),
+            models.Index(fields=['role', 'email'], name='user_role_email_idx'),
+            models.Index(OpClass(Upper('email'), name='text_pattern_ops'), name='user_email_prefix_idx'),
+            models.Index(OpClass(Upper('first_name'), name='text_pattern_ops'), name='user_first_name_prefix_idx'),
+            models.Index(OpClass(Upper('last_name'), name='text_pattern_ops'), name='user_last_name_prefix_idx'),
+        ]
 
     def __str__(self):
         return f'{self.email} ({self.last_name} {self.first_name})'
@@ -99,3 +125,40 @@ class UserWithEmail(AbstractBaseUser, PermissionsMixin):
     @property
     def get_age(self):
         return _get_age(self.birthday)
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(UserWithEmail, on_delete=models.CASCADE, primary_key=True, related_name='stats',
+                                verbose_name='Пользователь')
+    tasks_done = models.PositiveIntegerField(default=0, verbose_name='Выполнено задач')
+    evaluation_count = models.PositiveIntegerField(default=0, verbose_name='Количество оценок')
+    rank_sum = models.PositiveIntegerField(default=0, verbose_name='Сумма оценок')
+    overdue_count = models.PositiveIntegerField(default=0, verbose_name='Просрочено задач')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.tasks_done} выполнено, средняя оценка {self.average_rank}'
+
+    @property
+    def average_rank(self):
+        if not self.evaluation_count:
+            return None
+        return self.rank_sum / self.evaluation_count
+
+
+class UserStatsRefresh(models.Model):
+    OVERDUE = 'overdue'
+
+    name = models.CharField(max_length=32, primary_key=True, verbose_name='Пересчёт')
+    last_run = models.DateTimeField(verbose_name='Последний запуск')
+
+    class Meta:
+        verbose_name = 'Отметка пересчёта статистики'
+        verbose_name_plural = 'Отметки пересчёта статистики'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_run}'
@@ -0,0 +1,17 @@
+from final_project.pagination import KeysetCursorPagination
+
+
+class UserCursorPagination(KeysetCursorPagination):
+    """
+    Курсорная пагинация списка пользователей по ключу из полей сортировки, по умолчанию по email
+    """
+    orderings = {
+        'email': ('email',),
+        '-email': ('-email',),
+        '-created_at': ('-created_at', '-id'),
+        'created_at': ('created_at', 'id'),
+    }
+    ordering = orderings['email']
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
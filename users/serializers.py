@@ -1,7 +1,15 @@
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import set_user_claims
+from .models import UserStats
+from .pagination import UserCursorPagination
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
@@ -39,7 +47,10 @@ class UserDetailSerializer(serializers.ModelSerializer):
     team_name = serializers.SerializerMethodField()
     age = serializers.SerializerMethodField()
     full_name = serializers.SerializerMethodField()
-    average_rank = serializers.FloatField(read_only=True)
+    average_rank = serializers.SerializerMethodField()
+    tasks_done = serializers.SerializerMethodField()
+    evaluation_count = serializers.SerializerMethodField()
+    overdue_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -51,6 +62,9 @@ class UserDetailSerializer(serializers.ModelSerializer):
             'role',
             'team_name',
             'average_rank',
+            'tasks_done',
+            'evaluation_count',
+            'overdue_count',
             'created_at'
         )
         read_only_fields = fields
@@ -60,6 +74,24 @@ class UserDetailSerializer(serializers.ModelSerializer):
             return None
         return obj.team.name
 
+    def _get_stats(self, obj):
+        try:
+            return obj.stats
+        except UserStats.DoesNotExist:
+            return UserStats(user=obj)
+
+    def get_average_rank(self, obj):
+        return self._get_stats(obj).average_rank
+
+    def get_tasks_done(self, obj):
+        return self._get_stats(obj).tasks_done
+
+    def get_evaluation_count(self, obj):
+        return self._get_stats(obj).evaluation_count
+
+    def get_overdue_count(self, obj):
+        return self._get_stats(obj).overdue_count
+
     def get_age(self, obj):
         if not obj.birthday:
             return None
@@ -84,6 +116,13 @@ class UserListSerializer(UserDetailSerializer):
         read_only_fields = fields
 
 
+class UserListQuerySerializer(serializers.Serializer):
+    search = serializers.CharField(max_length=100, required=False)
+    role = serializers.ChoiceField(choices=User.Role.choices, required=False)
+    team = serializers.IntegerField(min_value=1, required=False)
+    ordering = serializers.ChoiceField(choices=list(UserCursorPagination.orderings), default='email')
+
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -104,5 +143,34 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['role'] = user.role
+        set_user_claims(token, user)
         return token
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Обновление токенов с перечитыванием утверждений о пользователе из БД
+    и проверкой blacklist сначала в кэше. Если токен уже заблокирован параллельным
+    обновлением, новая пара не выдаётся
+    """
+    token_class = CachedBlacklistRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        set_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and not refresh.blacklist():
+                raise TokenError(_('Token is blacklisted'))
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
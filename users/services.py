@@ -1,20 +1,305 @@
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import (
     BlacklistedToken,
     OutstandingToken,
-    RefreshToken,
     TokenError,
 )
-from django.db import transaction
+
+from tasks.models import Task
+from .models import UserStats, UserStatsRefresh
+from .tokens import CachedBlacklistRefreshToken, remember_blacklisted
+
+User = get_user_model()
+
+STATS_COUNTERS = ('tasks_done', 'evaluation_count', 'rank_sum', 'overdue_count')
+ACTIVE_STATUSES = (Task.Status.OPEN, Task.Status.IN_PROGRESS)
+
+# Состояние задачи, от которого зависит статистика исполнителя
+TaskStatsState = namedtuple(
+    'TaskStatsState', ('assigned_to_id', 'status', 'deadline', 'evaluation_count', 'rank_sum'), defaults=(0, 0)
+)
 
 
 def blacklisted_refresh_token(refresh_token):
-    token = RefreshToken(refresh_token)
+    token = CachedBlacklistRefreshToken(refresh_token)
     token.blacklist()
 
 
 def blacklist_tokens(user):
+    """
+    Занесение всех выданных пользователю токенов в blacklist одним запросом INSERT ... SELECT.
+    Уже заблокированные токены пропускаются. Новые заблокированные токены запоминаются в кэше.
+    Возвращает количество заблокированных токенов
+    """
+    outstanding = OutstandingToken._meta
+    blacklisted = BlacklistedToken._meta
+    token_column = blacklisted.get_field('token').column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH inserted AS (
+                INSERT INTO {blacklisted.db_table} ({token_column}, {blacklisted.get_field('blacklisted_at').column})
+                SELECT {outstanding.pk.column}, %(now)s
+                FROM {outstanding.db_table}
+                WHERE {outstanding.get_field('user').column} = %(user_id)s
+                ON CONFLICT ({token_column}) DO NOTHING
+                RETURNING {token_column}
+            )
+            SELECT o.{outstanding.get_field('jti').column}, o.{outstanding.get_field('expires_at').column}
+            FROM {outstanding.db_table} AS o
+            JOIN inserted ON inserted.{token_column} = o.{outstanding.pk.column}
+            """,
+            {'now': timezone.now(), 'user_id': user.pk}
+        )
+        rows = cursor.fetchall()
+    remember_blacklisted((jti, expires_at.timestamp()) for jti, expires_at in rows)
+    return len(rows)
+
+
+def purge_expired_tokens(batch_size=None, now=None):
+    """
+    Удаление истёкших выданных токенов и их записей в blacklist пачками по batch_size,
+    каждая пачка — отдельной короткой транзакцией. Возвращает количество удалённых выданных токенов
+    """
+    batch_size = batch_size or settings.TOKEN_PURGE_BATCH_SIZE
+    now = now or timezone.now()
+    expired = OutstandingToken.objects.filter(expires_at__lt=now).order_by('expires_at')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[1].get(OutstandingToken._meta.label, 0)
+
+
+def _lock_user_stats(user_ids, now):
+    """
+    Создание недостающих строк статистики существующих пользователей и блокировка строк.
+    Параллельный пересчёт тех же пользователей ждёт фиксации и агрегирует уже новые данные,
+    поэтому более старый результат не перезапишет более новый. Возвращает id заблокированных строк
+    """
+    stats = UserStats._meta
+    users = User._meta
+    counters = ', '.join(stats.get_field(name).column for name in STATS_COUNTERS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {stats.db_table} ({stats.pk.column}, {counters}, {stats.get_field('updated_at').column})
+            SELECT {users.pk.column}, 0, 0, 0, 0, %(now)s
+            FROM {users.db_table}
+            WHERE {users.pk.column} = ANY(%(ids)s)
+            ON CONFLICT ({stats.pk.column}) DO NOTHING
+            """,
+            {'now': now, 'ids': list(user_ids)}
+        )
+    return set(
+        UserStats.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def _overdue_before(now):
+    """
+    Граница учёта просроченных задач в статистике — отметка последнего пересчёта просроченных задач.
+    Задачи, срок которых истёк позже, учитывает следующий пересчёт
+    """
+    state, _ = UserStatsRefresh.objects.get_or_create(
+        pk=UserStatsRefresh.OVERDUE,
+        defaults={'last_run': now - timedelta(seconds=settings.USER_STATS_OVERDUE_WINDOW)},
+    )
+    return state.last_run
+
+
+def refresh_user_stats(user_ids, now=None, overdue_before=None):
+    """
+    Пересчёт статистики указанных пользователей одним агрегирующим запросом по их задачам
+    и запись через upsert под блокировкой строк статистики. Пользователи без задач получают нулевую статистику.
+    Просроченными считаются активные задачи со сроком до overdue_before, по умолчанию до отметки
+    последнего пересчёта просроченных задач
+    """
+    if not user_ids:
+        return
+    now = now or timezone.now()
     with transaction.atomic():
-        outstanding_tokens = OutstandingToken.objects.filter(user=user)
-        blacklisted_tokens = [BlacklistedToken(token=token) for token in outstanding_tokens]
-        if blacklisted_tokens:
-            BlacklistedToken.objects.bulk_create(blacklisted_tokens, ignore_conflicts=True)
+        _write_user_stats(_lock_user_stats(user_ids, now), overdue_before or _overdue_before(now))
+
+
+def _write_user_stats(user_ids, overdue_before):
+    stats = {user_id: UserStats(user_id=user_id) for user_id in user_ids}
+    rows = (
+        Task.objects.filter(assigned_to__in=user_ids)
+        .order_by()
+        .values('assigned_to')
+        .annotate(
+            tasks_done=Count('pk', filter=Q(status=Task.Status.DONE)),
+            evaluation_count=Count('task_evaluation'),
+            rank_sum=Coalesce(Sum('task_evaluation__rank'), 0),
+            overdue_count=Count('pk', filter=Q(status__in=ACTIVE_STATUSES, deadline__lt=overdue_before)),
+        )
+    )
+    for row in rows:
+        user_id = row.pop('assigned_to')
+        stats[user_id] = UserStats(user_id=user_id, **row)
+    UserStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=[*STATS_COUNTERS, 'updated_at'],
+    )
+
+
+def task_stats_state(task, evaluations=(0, 0)):
+    """
+    Текущее состояние задачи для статистики. evaluations — количество и сумма оценок задачи
+    """
+    return TaskStatsState(task.assigned_to_id, task.status, task.deadline, *evaluations)
+
+
+def evaluation_totals(task_ids):
+    """
+    Количество и сумма оценок задач одним запросом
+    """
+    rows = (
+        Task.objects.filter(pk__in=task_ids)
+        .annotate(evaluation_count=Count('task_evaluation'), rank_sum=Coalesce(Sum('task_evaluation__rank'), 0))
+        .values_list('pk', 'evaluation_count', 'rank_sum')
+    )
+    return {task_id: (count, rank_sum) for task_id, count, rank_sum in rows}
+
+
+def _task_counters(state, overdue_before):
+    return {
+        'tasks_done': int(state.status == Task.Status.DONE),
+        'evaluation_count': state.evaluation_count,
+        'rank_sum': state.rank_sum,
+        'overdue_count': int(
+            overdue_before is not None and state.status in ACTIVE_STATUSES and state.deadline < overdue_before
+        ),
+    }
+
+
+def apply_task_stats_changes(changes, now=None):
+    """
+    Применение изменений задач к статистике исполнителей приращениями F() без агрегирующих запросов.
+    changes — пары (прежнее, новое) TaskStatsState, None для созданной или удалённой задачи.
+    Вызывается в транзакции изменения задач: полный пересчёт тех же пользователей либо ждёт её фиксации
+    и видит изменения, либо завершается раньше, и приращения применяются поверх него.
+    Статистика пользователей без строки статистики пересчитывается полностью
+    """
+    now = now or timezone.now()
+    changes = [
+        (old, new) for old, new in changes
+        if old != new and (old and old.assigned_to_id or new and new.assigned_to_id)
+    ]
+    if not changes:
+        return
+    states = [state for pair in changes for state in pair if state and state.assigned_to_id]
+    user_ids = {state.assigned_to_id for state in states}
+    with transaction.atomic():
+        overdue_before = None
+        if any(state.status in ACTIVE_STATUSES and state.deadline < now for state in states):
+            # Отметка читается после блокировки строк, чтобы не разойтись с параллельным пересчётом просроченных
+            list(UserStats.objects.select_for_update().filter(pk__in=user_ids).order_by('pk').values_list('pk'))
+            overdue_before = _overdue_before(now)
+        deltas = defaultdict(Counter)
+        for old, new in changes:
+            if old and old.assigned_to_id:
+                deltas[old.assigned_to_id].subtract(_task_counters(old, overdue_before))
+            if new and new.assigned_to_id:
+                deltas[new.assigned_to_id].update(_task_counters(new, overdue_before))
+        grouped = defaultdict(list)
+        for user_id, delta in deltas.items():
+            values = tuple(delta[name] for name in STATS_COUNTERS)
+            if any(values):
+                grouped[values].append(user_id)
+        missing = set()
+        for values, ids in sorted(grouped.items(), key=lambda item: min(item[1])):
+            updated = UserStats.objects.filter(pk__in=ids).update(
+                updated_at=now,
+                **{
+                    name: F(name) + value if value > 0 else Greatest(F(name) + value, 0)
+                    for name, value in zip(STATS_COUNTERS, values) if value
+                },
+            )
+            if updated < len(ids):
+                missing.update(set(ids) - set(UserStats.objects.filter(pk__in=ids).values_list('pk', flat=True)))
+        if missing:
+            refresh_user_stats(missing, now=now)
+
+
+def refresh_overdue_since_last_run(now=None):
+    """
+    Пересчёт просроченных задач с момента предыдущего запуска. Отметка хранится в БД и
+    сдвигается в той же транзакции, поэтому пропущенные или опоздавшие запуски не теряют
+    переходы, а параллельные запуски не пересекаются. Первый запуск смотрит назад на
+    USER_STATS_OVERDUE_WINDOW. Возвращает количество пользователей
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        state, _ = UserStatsRefresh.objects.select_for_update().get_or_create(
+            pk=UserStatsRefresh.OVERDUE,
+            defaults={'last_run': now - timedelta(seconds=settings.USER_STATS_OVERDUE_WINDOW)},
+        )
+        refreshed = refresh_overdue_user_stats(state.last_run, now=now)
+        state.last_run = now
+        state.save(update_fields=['last_run'])
+    return refreshed
+
+
+def refresh_overdue_user_stats(since, now=None):
+    """
+    Пересчёт статистики исполнителей активных задач, срок которых истёк в промежутке [since, now),
+    с учётом просроченных задач до now. Возвращает количество пользователей
+    """
+    now = now or timezone.now()
+    user_ids = set(
+        Task.objects.filter(
+            status__in=ACTIVE_STATUSES,
+            assigned_to__isnull=False,
+            deadline__gte=since,
+            deadline__lt=now,
+        ).values_list('assigned_to_id', flat=True).distinct()
+    )
+    refresh_user_stats(user_ids, now=now, overdue_before=now)
+    return len(user_ids)
+
+
+def _refresh_scheduled_user_stats(user_ids, task_ids):
+    if task_ids:
+        user_ids |= set(Task.objects.filter(pk__in=task_ids).values_list('assigned_to_id', flat=True))
+    user_ids.discard(None)
+    refresh_user_stats(user_ids)
+
+
+def schedule_user_stats_refresh(*user_ids, task_ids=()):
+    """
+    Полный пересчёт статистики пользователей после фиксации текущей транзакции, когда прежнее
+    состояние задачи неизвестно. Исполнители задач task_ids определяются в момент пересчёта
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+    if user_ids or task_ids:
+        transaction.on_commit(partial(_refresh_scheduled_user_stats, user_ids, set(task_ids)))
+
+
+def filter_users(queryset, *, search=None, role=None, team=None):
+    """
+    Фильтрация списка пользователей по роли, команде и поиску по началу email, имени или фамилии.
+    Каждое слово поискового запроса должно быть началом одного из этих полей
+    """
+    if role is not None:
+        queryset = queryset.filter(role=role)
+    if team is not None:
+        queryset = queryset.filter(team_id=team)
+    for word in (search or '').split():
+        queryset = queryset.filter(
+            Q(email__istartswith=word) | Q(first_name__istartswith=word) | Q(last_name__istartswith=word)
+        )
+    return queryset
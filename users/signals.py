@@ -0,0 +1,29 @@
+from functools import partial
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from teams.models import Team
+from .cache import invalidate_user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_on_change(sender, instance, **kwargs):
+    """
+    Сброс кэша аутентификации при изменении или удалении пользователя
+    """
+    transaction.on_commit(partial(invalidate_user_cache, instance.pk))
+
+
+@receiver(pre_delete, sender=Team)
+def invalidate_team_members(sender, instance, **kwargs):
+    """
+    Сброс кэша аутентификации участников удаляемой команды: их team_id обнуляется без сигналов
+    """
+    member_ids = list(instance.members.values_list('pk', flat=True))
+    transaction.on_commit(partial(invalidate_user_cache, *member_ids))
+
@@ -0,0 +1,27 @@
+import logging
+from celery import shared_task
+
+from .services import purge_expired_tokens, refresh_overdue_since_last_run
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_expired_tokens():
+    """
+    Периодическая очистка истёкших выданных и заблокированных токенов
+    """
+    deleted = purge_expired_tokens()
+    logger.info('Удалено истёкших токенов: %d', deleted)
+    return deleted
+
+
+@shared_task
+def refresh_overdue_stats():
+    """
+    Периодический пересчёт количества просроченных задач у исполнителей задач,
+    срок которых истёк после предыдущего запуска
+    """
+    refreshed = refresh_overdue_since_last_run()
+    logger.info('Пересчитана статистика пользователей: %d', refreshed)
+    return refreshed
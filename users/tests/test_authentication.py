@@ -0,0 +1,175 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from users.authentication import CachedUserJWTAuthentication
+from users.serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer
+
+User = get_user_model()
+
+
+@pytest.mark.services
+@pytest.mark.django_db
+class TestCachedUserJWTAuthentication:
+    @pytest.fixture(autouse=True)
+    def setup(self, team, create_user, user_data, django_capture_on_commit_callbacks, settings):
+        cache.clear()
+        settings.SHARED_CACHE = True
+        self.settings = settings
+        user_data.pop('password2')
+        self.team = team
+        self.user = create_user(team=team, **user_data)
+        self.auth = CachedUserJWTAuthentication()
+        self.capture_on_commit = django_capture_on_commit_callbacks
+        yield
+        cache.clear()
+
+    def _claims_token(self, user):
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return AccessToken(str(refresh.access_token))
+
+    def test_authenticate_cached_without_queries(self, django_assert_num_queries):
+        """
+        Тест на аутентификацию по кэшированной строке пользователя без запросов к БД
+        """
+        token = self._claims_token(self.user)
+        with django_assert_num_queries(1):
+            self.auth.get_user(token)
+        with django_assert_num_queries(0):
+            user = self.auth.get_user(token)
+            assert user.pk == self.user.pk
+            assert user.email == self.user.email
+            assert user.first_name == self.user.first_name
+            assert user.role == self.user.role
+            assert user.team_id == self.team.id
+            assert user.is_staff is False
+            assert user.is_authenticated
+
+    def test_authenticated_request_without_auth_queries(self, client, django_assert_num_queries):
+        """
+        Тест на запрос с кэшированным пользователем без запросов аутентификации
+        """
+        with self.capture_on_commit(execute=True):
+            self.user.team = None
+            self.user.save()
+        token = self._claims_token(self.user)
+        self.auth.get_user(token)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with django_assert_num_queries(0):
+            response = client.get(reverse('teams:detail'))
+        assert response.status_code == 404
+
+    def test_authenticate_ignores_token_claims(self):
+        """
+        Тест на чтение полей пользователя из строки, а не из утверждений токена
+        """
+        token = self._claims_token(self.user)
+        token['role'] = User.Role.ADMIN
+        token['is_staff'] = True
+        user = self.auth.get_user(token)
+        assert user.role == self.user.role
+        assert user.is_staff is False
+
+    def test_authenticate_after_user_change(self):
+        """
+        Тест на сброс кэшированной строки после изменения пользователя
+        """
+        token = self._claims_token(self.user)
+        self.auth.get_user(token)
+        self.user.role = User.Role.MANAGER
+        self.user.team = None
+        with self.capture_on_commit(execute=True):
+            self.user.save(update_fields=['role', 'team'])
+        user = self.auth.get_user(token)
+        assert user.role == User.Role.MANAGER
+        assert user.team_id is None
+
+    def test_authenticate_after_bulk_deactivation(self):
+        """
+        Тест на сброс кэшированной строки при массовом обновлении пользователей через QuerySet.update()
+        """
+        token = self._claims_token(self.user)
+        self.auth.get_user(token)
+        with self.capture_on_commit(execute=True):
+            assert User.objects.filter(team=self.team).update(is_active=False) == 1
+        with pytest.raises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+    def test_authenticate_after_team_delete(self):
+        """
+        Тест на сброс кэша участников удалённой команды
+        """
+        token = RefreshToken.for_user(self.user).access_token
+        assert self.auth.get_user(token).team_id == self.team.id
+        with self.capture_on_commit(execute=True):
+            self.team.delete()
+        assert self.auth.get_user(token).team_id is None
+
+    def test_authenticate_inactive_user(self):
+        """
+        Тест на аутентификацию деактивированного пользователя
+        """
+        token = self._claims_token(self.user)
+        self.user.is_active = False
+        with self.capture_on_commit(execute=True):
+            self.user.save()
+        with pytest.raises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+    def test_authenticate_deleted_user(self):
+        """
+        Тест на аутентификацию удалённого пользователя
+        """
+        token = self._claims_token(self.user)
+        with self.capture_on_commit(execute=True):
+            self.user.delete()
+        with pytest.raises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+    def test_authenticate_without_shared_cache(self, django_assert_num_queries):
+        """
+        Тест на чтение пользователя из БД при отсутствии общего кэша: сброс кэша
+        не виден другим процессам
+        """
+        self.settings.SHARED_CACHE = False
+        token = self._claims_token(self.user)
+        User.objects.filter(pk=self.user.pk).update(role=User.Role.MANAGER, is_staff=True)
+        with django_assert_num_queries(1):
+            user = self.auth.get_user(token)
+        assert user.role == User.Role.MANAGER
+        assert user.is_staff is True
+
+    def test_authenticate_inactive_without_shared_cache(self):
+        """
+        Тест на отказ деактивированному пользователю при отсутствии общего кэша
+        """
+        self.settings.SHARED_CACHE = False
+        token = self._claims_token(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with pytest.raises(AuthenticationFailed):
+            self.auth.get_user(token)
+
+    def test_refresh_updates_claims(self):
+        """
+        Тест на перечитывание утверждений из БД при обновлении токенов
+        """
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        User.objects.filter(pk=self.user.pk).update(role=User.Role.MANAGER)
+        serializer = CustomTokenRefreshSerializer(data={'refresh': str(refresh)})
+        assert serializer.is_valid()
+        access = AccessToken(serializer.validated_data['access'])
+        assert access['role'] == User.Role.MANAGER
+        assert RefreshToken(serializer.validated_data['refresh'])['role'] == User.Role.MANAGER
+
+    def test_refresh_inactive_user(self):
+        """
+        Тест на обновление токенов деактивированного пользователя
+        """
+        refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        serializer = CustomTokenRefreshSerializer(data={'refresh': str(refresh)})
+        with pytest.raises(AuthenticationFailed):
+            serializer.is_valid()
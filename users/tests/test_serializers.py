@@ -96,7 +96,10 @@ class TestUserDetailSerializer:
         Тест на верное отображение данных
         """
         serializer = UserDetailSerializer(instance=self.user)
-        expected_fields = {'email', 'full_name', 'birthday', 'age', 'role', 'team_name', 'created_at'}
+        expected_fields = {
+            'email', 'full_name', 'birthday', 'age', 'role', 'team_name', 'average_rank',
+            'tasks_done', 'evaluation_count', 'overdue_count', 'created_at'
+        }
         assert set(serializer.data.keys()) == expected_fields
         assert serializer.data['email'] == self.user.email
         assert serializer.data['birthday'] == str(self.user.birthday)
@@ -1,5 +1,7 @@
+import os
 import pytest
-from datetime import datetime, timezone
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
 from rest_framework_simplejwt.tokens import (
     RefreshToken,
     BlacklistedToken,
@@ -7,7 +9,27 @@ from rest_framework_simplejwt.tokens import (
     OutstandingToken
 )
 
-from users.services import blacklisted_refresh_token, blacklist_tokens
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from evaluations.models import Evaluation
+from tasks.models import Task
+from tasks.services import TaskService
+from users.models import UserStats, UserStatsRefresh
+from users.services import (
+    blacklisted_refresh_token,
+    blacklist_tokens,
+    purge_expired_tokens,
+    refresh_overdue_since_last_run,
+    refresh_overdue_user_stats,
+    refresh_user_stats,
+)
+from users.tokens import CachedBlacklistRefreshToken
+
+User = get_user_model()
 
 
 @pytest.mark.services
@@ -15,8 +37,10 @@ from users.services import blacklisted_refresh_token, blacklist_tokens
 class TestBlacklistedRefreshToken:
     @pytest.fixture(autouse=True)
     def setup(self, user_data, create_user):
+        cache.clear()
         user_data.pop('password2')
-        self.refresh = RefreshToken.for_user(create_user(**user_data))
+        self.user = create_user(**user_data)
+        self.refresh = RefreshToken.for_user(self.user)
 
     def test_blacklisted_refresh_token_success(self):
         """
@@ -34,6 +58,45 @@ class TestBlacklistedRefreshToken:
             blacklisted_refresh_token(str(self.refresh))
         assert BlacklistedToken.objects.filter(token__jti=self.refresh['jti']).count() == 1
 
+    def test_blacklisted_refresh_token_cached(self, django_assert_num_queries):
+        """
+        Тест на отклонение заблокированного токена по кэшу без запросов к БД
+        """
+        blacklisted_refresh_token(str(self.refresh))
+        with django_assert_num_queries(0):
+            with pytest.raises(TokenError):
+                blacklisted_refresh_token(str(self.refresh))
+
+    def test_blacklisted_refresh_token_cache_miss(self):
+        """
+        Тест на проверку blacklist в БД при отсутствии токена в кэше
+        """
+        blacklisted_refresh_token(str(self.refresh))
+        cache.clear()
+        with pytest.raises(TokenError):
+            blacklisted_refresh_token(str(self.refresh))
+
+    def test_blacklisted_refresh_token_evicted_key(self, django_assert_num_queries):
+        """
+        Тест на проверку blacklist в БД, если ключ токена вытеснен из кэша
+        """
+        blacklisted_refresh_token(str(self.refresh))
+        cache.delete(f'auth:blacklisted:{self.refresh["jti"]}')
+        with django_assert_num_queries(1):
+            with pytest.raises(TokenError):
+                CachedBlacklistRefreshToken(str(self.refresh))
+        with django_assert_num_queries(0):
+            with pytest.raises(TokenError):
+                CachedBlacklistRefreshToken(str(self.refresh))
+
+    def test_blacklist_returns_created(self):
+        """
+        Тест на признак добавления токена в blacklist при повторной блокировке
+        """
+        token = CachedBlacklistRefreshToken(str(self.refresh))
+        assert token.blacklist() is True
+        assert token.blacklist() is False
+
     def test_blacklisted_refresh_invalid_token(self):
         """
         Тест на добавление недействительного токена в blacklist
@@ -100,3 +163,274 @@ class TestBlacklistToken:
         assert OutstandingToken.objects.filter(user=self.user).count() == 0
         blacklist_tokens(self.user)
         assert BlacklistedToken.objects.filter(token__user=self.user).count() == 0
+
+    def test_blacklist_tokens_single_query(self, django_assert_num_queries):
+        """
+        Тест на занесение токенов в blacklist одним запросом с пропуском уже заблокированных
+        """
+        self.create_n_tokens(self.user, 5)
+        blacklisted_refresh_token(str(RefreshToken.for_user(self.user)))
+        with django_assert_num_queries(1):
+            assert blacklist_tokens(self.user) == 5
+        assert BlacklistedToken.objects.filter(token__user=self.user).count() == 6
+
+    def test_blacklist_tokens_cached(self, django_assert_num_queries):
+        """
+        Тест на запоминание заблокированных токенов пользователя в кэше
+        """
+        cache.clear()
+        token = RefreshToken.for_user(self.user)
+        blacklist_tokens(self.user)
+        with django_assert_num_queries(0):
+            with pytest.raises(TokenError):
+                CachedBlacklistRefreshToken(str(token))
+
+
+@pytest.mark.services
+@pytest.mark.django_db
+class TestPurgeExpiredTokens:
+    @pytest.fixture(autouse=True)
+    def setup(self, user_data, create_user):
+        user_data.pop('password2')
+        self.user = create_user(**user_data)
+        self.now = datetime.now(timezone.utc)
+        self.expired = [RefreshToken.for_user(self.user) for _ in range(5)]
+        self.valid = RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti__in=[t['jti'] for t in self.expired]).update(
+            expires_at=self.now - timedelta(hours=1)
+        )
+        blacklist_tokens(self.user)
+
+    def test_purge_expired_tokens_success(self):
+        """
+        Тест на удаление истёкших выданных токенов и их записей в blacklist пачками
+        """
+        assert purge_expired_tokens(batch_size=2, now=self.now) == 5
+        assert list(OutstandingToken.objects.values_list('jti', flat=True)) == [self.valid['jti']]
+        assert list(BlacklistedToken.objects.values_list('token__jti', flat=True)) == [self.valid['jti']]
+
+    def test_purge_expired_tokens_nothing_expired(self):
+        """
+        Тест на очистку без истёкших токенов
+        """
+        assert purge_expired_tokens(now=self.now - timedelta(days=1)) == 0
+        assert OutstandingToken.objects.count() == 6
+
+
+@pytest.mark.services
+@pytest.mark.django_db
+class TestUserStats:
+    @pytest.fixture(autouse=True)
+    def setup(self, user_data, create_user, create_task, team, django_capture_on_commit_callbacks):
+        user_data.pop('password2')
+        self.user = create_user(team=team, **user_data)
+        self.other = create_user(email='other@example.com', first_name='other', last_name='other', team=team)
+        self.team = team
+        self.create_task = create_task
+        self.now = datetime.now(timezone.utc)
+        self.capture_on_commit = django_capture_on_commit_callbacks
+        refresh_user_stats([self.user.pk, self.other.pk])
+
+    def _task(self, days, status=Task.Status.OPEN, assigned_to=None):
+        task = self.create_task(title='task', deadline=self.now + timedelta(days=abs(days)), status=status,
+                                created_by=self.user, assigned_to=assigned_to or self.user, team=self.team)
+        if days < 0:
+            task.deadline = self.now + timedelta(days=days)
+            Task.objects.filter(pk=task.pk).update(deadline=task.deadline)
+        return task
+
+    def _stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_refresh_user_stats_success(self, django_assert_num_queries):
+        """
+        Тест на пересчёт статистики пользователей агрегирующим запросом и upsert.
+        Запросы: точка сохранения, создание недостающих строк, блокировка строк, отметка пересчёта
+        просроченных задач, агрегация, upsert и освобождение точки сохранения
+        """
+        for rank in (2, 5):
+            Evaluation.objects.create(task=self._task(-3, Task.Status.DONE), rank=rank)
+        self._task(-1, Task.Status.DONE)
+        self._task(-1)
+        self._task(-1, Task.Status.IN_PROGRESS)
+        self._task(1)
+        UserStats.objects.all().delete()
+        with django_assert_num_queries(7):
+            refresh_user_stats([self.user.pk, self.other.pk], now=self.now)
+        stats = self._stats(self.user)
+        assert (stats.tasks_done, stats.evaluation_count, stats.rank_sum, stats.overdue_count) == (3, 2, 7, 2)
+        assert stats.average_rank == 3.5
+        other = self._stats(self.other)
+        assert (other.tasks_done, other.evaluation_count, other.overdue_count) == (0, 0, 0)
+        assert other.average_rank is None
+
+    def test_refresh_user_stats_deleted_user(self):
+        """
+        Тест на пересчёт статистики удалённого пользователя
+        """
+        user_id = self.other.pk
+        self.other.delete()
+        refresh_user_stats([user_id])
+        assert not UserStats.objects.filter(user_id=user_id).exists()
+
+    def test_stats_follow_task_changes(self):
+        """
+        Тест на пересчёт статистики прежнего и нового исполнителя после фиксации транзакции
+        """
+        with self.capture_on_commit(execute=True):
+            task = self._task(1, Task.Status.DONE)
+            Evaluation.objects.create(task=task, rank=4)
+        assert self._stats(self.user).tasks_done == 1
+        assert self._stats(self.user).evaluation_count == 1
+        task.assigned_to = self.other
+        with self.capture_on_commit(execute=True):
+            task.save()
+        assert self._stats(self.user).tasks_done == 0
+        assert self._stats(self.other).average_rank == 4
+        with self.capture_on_commit(execute=True):
+            task.delete()
+        assert self._stats(self.other).tasks_done == 0
+        assert self._stats(self.other).evaluation_count == 0
+
+    def test_stats_incremental_on_task_change(self):
+        """
+        Тест на изменение статистики приращениями без агрегирующих запросов при изменении задачи
+        """
+        task = self._task(1)
+        task.status = Task.Status.DONE
+        with CaptureQueriesContext(connection) as context:
+            task.save()
+        assert not any('COUNT(' in query['sql'] for query in context.captured_queries)
+        assert self._stats(self.user).tasks_done == 1
+        evaluation = Evaluation.objects.create(task=task, rank=2)
+        evaluation.rank = 5
+        evaluation.save()
+        stats = self._stats(self.user)
+        assert (stats.evaluation_count, stats.rank_sum) == (1, 5)
+        evaluation.delete()
+        stats = self._stats(self.user)
+        assert (stats.tasks_done, stats.evaluation_count, stats.rank_sum) == (1, 0, 0)
+
+    def test_stats_overdue_task_deleted(self):
+        """
+        Тест на вычитание учтённой просроченной задачи и пропуск ещё не учтённой при удалении
+        """
+        counted = self._task(-1)
+        recent = self._task(1)
+        Task.objects.filter(pk=recent.pk).update(deadline=self.now - timedelta(minutes=1))
+        UserStatsRefresh.objects.update(last_run=self.now - timedelta(minutes=10))
+        refresh_user_stats([self.user.pk], now=self.now)
+        assert self._stats(self.user).overdue_count == 1
+        Task.objects.get(pk=recent.pk).delete()
+        assert self._stats(self.user).overdue_count == 1
+        Task.objects.get(pk=counted.pk).delete()
+        assert self._stats(self.user).overdue_count == 0
+
+    def test_stats_without_row_recomputed(self):
+        """
+        Тест на полный пересчёт статистики пользователя без строки статистики
+        """
+        self._task(1, Task.Status.DONE)
+        UserStats.objects.filter(user=self.user).delete()
+        self._task(1, Task.Status.DONE)
+        assert self._stats(self.user).tasks_done == 2
+
+    def test_stats_bulk_create_tasks(self):
+        """
+        Тест на статистику и уведомление исполнителей при массовом создании задач
+        """
+        tasks_data = [
+            {'title': 'done', 'deadline': self.now + timedelta(days=1), 'status': Task.Status.DONE,
+             'assigned_to': self.user},
+            {'title': 'open', 'deadline': self.now + timedelta(days=1), 'assigned_to': self.other},
+        ]
+        with patch('tasks.signals.notify_assigned_to_batch.delay') as delay:
+            with self.capture_on_commit(execute=True):
+                tasks = TaskService.bulk_create_tasks(created_by=self.team.creator, team=self.team,
+                                                      tasks_data=tasks_data)
+        assert self._stats(self.user).tasks_done == 1
+        assert self._stats(self.other).tasks_done == 0
+        delay.assert_called_once_with([task.pk for task in tasks], [self.user.pk, self.other.pk])
+
+    def test_stats_bulk_reassign_moves_evaluations(self):
+        """
+        Тест на перенос выполненной задачи и её оценок к новому исполнителю при массовом обновлении
+        """
+        task = self._task(1, Task.Status.DONE)
+        Evaluation.objects.create(task=task, rank=4)
+        tasks = list(Task.objects.filter(pk=task.pk))
+        with patch('tasks.signals.notify_assigned_to_batch.delay') as delay:
+            with self.capture_on_commit(execute=True):
+                TaskService.bulk_update_tasks(team_id=self.team.pk, tasks=tasks,
+                                              items=[{'id': task.pk, 'assigned_to': self.other}])
+        old, new = self._stats(self.user), self._stats(self.other)
+        assert (old.tasks_done, old.evaluation_count, old.rank_sum) == (0, 0, 0)
+        assert (new.tasks_done, new.evaluation_count, new.rank_sum) == (1, 1, 4)
+        delay.assert_called_once_with([task.pk], [self.other.pk])
+        refresh_user_stats([self.user.pk, self.other.pk])
+        assert (self._stats(self.other).evaluation_count, self._stats(self.other).rank_sum) == (1, 4)
+
+    def test_stats_skip_unrelated_update(self):
+        """
+        Тест на отсутствие пересчёта при изменении полей, не влияющих на статистику
+        """
+        with self.capture_on_commit(execute=True):
+            task = self._task(1)
+        updated_at = self._stats(self.user).updated_at
+        task.title = 'new title'
+        with self.capture_on_commit(execute=True):
+            task.save(update_fields=['title'])
+        assert self._stats(self.user).updated_at == updated_at
+
+    def test_refresh_overdue_user_stats(self):
+        """
+        Тест на пересчёт просроченных задач у исполнителей задач с истёкшим в окне сроком
+        """
+        with self.capture_on_commit(execute=True):
+            task = self._task(1)
+            self._task(-2, assigned_to=self.other)
+        UserStats.objects.filter(user=self.other).update(overdue_count=0)
+        later = task.deadline + timedelta(minutes=5)
+        assert self._stats(self.user).overdue_count == 0
+        assert refresh_overdue_user_stats(since=later - timedelta(minutes=15), now=later) == 1
+        assert self._stats(self.user).overdue_count == 1
+        assert self._stats(self.other).overdue_count == 0
+
+    def test_refresh_overdue_since_last_run(self, settings):
+        """
+        Тест на пересчёт просроченных задач от отметки предыдущего запуска при опоздавшем запуске
+        """
+        UserStatsRefresh.objects.all().delete()
+        with self.capture_on_commit(execute=True):
+            task = self._task(1)
+        first = task.deadline - timedelta(hours=1)
+        assert refresh_overdue_since_last_run(now=first) == 0
+        assert UserStatsRefresh.objects.get(pk=UserStatsRefresh.OVERDUE).last_run == first
+        later = task.deadline + timedelta(seconds=settings.USER_STATS_OVERDUE_WINDOW * 10)
+        assert refresh_overdue_since_last_run(now=later) == 1
+        assert self._stats(self.user).overdue_count == 1
+        assert UserStatsRefresh.objects.get(pk=UserStatsRefresh.OVERDUE).last_run == later
+
+    def test_refresh_overdue_first_run_window(self, settings):
+        """
+        Тест на окно первого пересчёта просроченных задач без отметки предыдущего запуска
+        """
+        UserStatsRefresh.objects.all().delete()
+        with self.capture_on_commit(execute=True):
+            task = self._task(1)
+        UserStats.objects.filter(user=self.user).update(overdue_count=0)
+        later = task.deadline + timedelta(seconds=settings.USER_STATS_OVERDUE_WINDOW + 60)
+        assert refresh_overdue_since_last_run(now=later) == 0
+        assert self._stats(self.user).overdue_count == 0
+
+    def test_rebuild_user_stats_command(self):
+        """
+        Тест на полный пересчёт статистики пачками
+        """
+        self._task(-1, Task.Status.DONE)
+        self._task(-1, assigned_to=self.other)
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', batch_size=1, stdout=open(os.devnull, 'w'))
+        assert UserStats.objects.count() == User.objects.count()
+        assert self._stats(self.user).tasks_done == 1
+        assert self._stats(self.other).overdue_count == 1
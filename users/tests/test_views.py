@@ -1,10 +1,21 @@
 import pytest
+from unittest.mock import patch
+from datetime import timedelta
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import (
+    OutstandingToken,
     RefreshToken
 )
 
+from evaluations.models import Evaluation
+from tasks.models import Task
+from users.models import UserStats
+from users.services import refresh_user_stats
+from users.tokens import CachedBlacklistRefreshToken
+
 User = get_user_model()
 
 
@@ -184,6 +195,40 @@ class TestTokenRefreshView:
         assert 'access' in response.data
         assert 'refresh' in response.data
 
+    def test_refresh_rotated_token_cached(self, django_assert_num_queries):
+        """
+        Тест на повторное обновление по уже использованному токену: отказ по кэшу без запросов к БД
+        """
+        cache.clear()
+        response = self.client.post(self.url, data={'refresh': self.refresh_token})
+        assert response.status_code == 200
+        with django_assert_num_queries(0):
+            response = self.client.post(self.url, data={'refresh': self.refresh_token})
+        assert response.status_code == 401
+
+    def test_refresh_queries(self, django_assert_num_queries):
+        """
+        Тест на запросы обновления: проверка blacklist, чтение пользователя, блокировка старого
+        и запись нового токена — по одному запросу
+        """
+        cache.clear()
+        with django_assert_num_queries(4):
+            response = self.client.post(self.url, data={'refresh': self.refresh_token})
+        assert response.status_code == 200
+        assert OutstandingToken.objects.filter(token=response.data['refresh']).exists()
+
+    def test_refresh_concurrent_rotation(self):
+        """
+        Тест на отказ второму параллельному обновлению тем же токеном: оба прошли проверку blacklist,
+        но новую пару получает только заблокировавший токен первым
+        """
+        with patch.object(CachedBlacklistRefreshToken, 'check_blacklist'):
+            first = self.client.post(self.url, data={'refresh': self.refresh_token})
+            second = self.client.post(self.url, data={'refresh': self.refresh_token})
+        assert first.status_code == 200
+        assert second.status_code == 401
+        assert OutstandingToken.objects.filter(user=self.user).count() == 2
+
     def test_refresh_invalid_token(self):
         """
         Тест на обновление с невалидным токеном
@@ -266,7 +311,10 @@ class TestUserDetailView:
         self.client.force_authenticate(self.user)
         response = self.client.get(self.url)
         assert response.status_code == 200
-        expected_fields = {'email', 'full_name', 'birthday', 'age', 'role', 'team_name', 'average_rank', 'created_at'}
+        expected_fields = {
+            'email', 'full_name', 'birthday', 'age', 'role', 'team_name', 'average_rank',
+            'tasks_done', 'evaluation_count', 'overdue_count', 'created_at'
+        }
         assert set(response.data.keys()) == expected_fields
         assert response.data['email'] == self.user.email
         assert response.data['full_name'] == f'{self.user.first_name} {self.user.last_name}'
@@ -296,6 +344,40 @@ class TestUserDetailView:
         assert response.status_code == 200
         assert not response.data['email'] == 'other@example.com'
 
+    def test_read_detail_stats(self, create_task, django_assert_num_queries, django_capture_on_commit_callbacks):
+        """
+        Тест на отображение статистики пользователя одним запросом
+        """
+        deadline = timezone.now() + timedelta(days=1)
+        with django_capture_on_commit_callbacks(execute=True):
+            for rank in (3, 4):
+                task = create_task(title='done', deadline=deadline, status=Task.Status.DONE, created_by=self.user,
+                                   assigned_to=self.user, team=self.user.team)
+                Evaluation.objects.create(task=task, rank=rank)
+            overdue = create_task(title='overdue', deadline=deadline, created_by=self.user, assigned_to=self.user,
+                                  team=self.user.team)
+            Task.objects.filter(pk=overdue.pk).update(deadline=timezone.now() - timedelta(days=1))
+        refresh_user_stats([self.user.pk])
+        self.client.force_authenticate(self.user)
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url)
+        assert response.status_code == 200
+        assert response.data['average_rank'] == 3.5
+        assert response.data['tasks_done'] == 2
+        assert response.data['evaluation_count'] == 2
+        assert response.data['overdue_count'] == 1
+
+    def test_read_detail_without_stats(self):
+        """
+        Тест на отображение пользователя без строки статистики
+        """
+        UserStats.objects.filter(user=self.user).delete()
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url)
+        assert response.status_code == 200
+        assert response.data['average_rank'] is None
+        assert response.data['tasks_done'] == 0
+
 
 @pytest.mark.views
 @pytest.mark.django_db
@@ -328,12 +410,95 @@ class TestUserListView:
         response = self.client.get(self.url)
         assert response.status_code == 200
         assert User.objects.count() == 6
+        results = response.data['results']
         expected_fields = {'id', 'email', 'full_name', 'birthday', 'age', 'role', 'team_name', 'created_at'}
-        assert set(response.data[0].keys()) == expected_fields
-        assert response.data[1]['id'] == self.users[0].id
-        assert response.data[2]['email'] == self.users[1].email
-        assert response.data[3]['full_name'] == f'{self.users[2].first_name} {self.users[2].last_name}'
-        assert 'password' not in response.data[1]
+        assert set(results[0].keys()) == expected_fields
+        assert results[1]['id'] == self.users[0].id
+        assert results[2]['email'] == self.users[1].email
+        assert results[3]['full_name'] == f'{self.users[2].first_name} {self.users[2].last_name}'
+        assert 'password' not in results[1]
+
+    def test_read_list_pagination(self, django_assert_num_queries):
+        """
+        Тест на курсорную пагинацию списка пользователей
+        """
+        self.client.force_authenticate(self.admin)
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url, {'page_size': 4})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 4
+        next_response = self.client.get(response.data['next'])
+        emails = [u['email'] for u in response.data['results'] + next_response.data['results']]
+        assert emails == [self.admin.email] + [u.email for u in self.users]
+        assert next_response.data['next'] is None
+
+    def test_read_list_ordering_created_at(self):
+        """
+        Тест на сортировку списка пользователей по дате регистрации
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'ordering': '-created_at'})
+        assert response.status_code == 200
+        assert [u['id'] for u in response.data['results']] == [u.id for u in reversed(self.users)] + [self.admin.id]
+
+    @pytest.mark.parametrize(
+        'search, expected',
+        [
+            ('TEST3', [3]),
+            ('test', [0, 1, 2, 3, 4]),
+            ('test1 test1', [1]),
+            ('est', []),
+            ('%', []),
+        ]
+    )
+    def test_read_list_search(self, search, expected):
+        """
+        Тест на поиск пользователей по началу email, имени или фамилии без учёта регистра
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'search': search})
+        assert response.status_code == 200
+        assert [u['id'] for u in response.data['results']] == [self.users[i].id for i in expected]
+
+    def test_read_list_search_by_name(self):
+        """
+        Тест на поиск пользователя по имени и фамилии
+        """
+        User.objects.filter(pk=self.users[2].pk).update(first_name='Иван', last_name='Петров')
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'search': 'петр ив'})
+        assert response.status_code == 200
+        assert [u['id'] for u in response.data['results']] == [self.users[2].id]
+
+    def test_read_list_filter_role_and_team(self, create_team):
+        """
+        Тест на фильтрацию списка пользователей по роли и команде
+        """
+        other_team = create_team(name='other team', creator=self.admin)
+        User.objects.filter(pk__in=[self.users[0].pk, self.users[1].pk]).update(role=User.Role.MANAGER)
+        User.objects.filter(pk=self.users[1].pk).update(team=other_team)
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, {'role': 'manager'})
+        assert [u['id'] for u in response.data['results']] == [self.users[0].id, self.users[1].id]
+        response = self.client.get(self.url, {'role': 'manager', 'team': other_team.id})
+        assert [u['id'] for u in response.data['results']] == [self.users[1].id]
+
+    @pytest.mark.parametrize(
+        'params',
+        [
+            {'role': 'unknown'},
+            {'team': 'abc'},
+            {'ordering': 'password'},
+            {'search': 'a' * 101},
+        ]
+    )
+    def test_read_list_invalid_filters(self, params):
+        """
+        Тест на список пользователей с невалидными параметрами фильтрации
+        """
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(self.url, params)
+        assert response.status_code == 400
 
     def test_read_list_unauthenticated(self):
         """
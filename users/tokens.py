@@ -0,0 +1,100 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import BlacklistedToken, OutstandingToken, RefreshToken, TokenError
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+def _blacklist_key(jti):
+    return f'auth:blacklisted:{jti}'
+
+
+def remember_blacklisted(jti_expires):
+    """
+    Запоминание заблокированных токенов в кэше до истечения их срока действия.
+    jti_expires — пары (jti, время истечения в секундах Unix)
+    """
+    now = time.time()
+    by_timeout = {}
+    for jti, expires in jti_expires:
+        timeout = int(expires - now)
+        if timeout > 0:
+            by_timeout.setdefault(timeout, {})[_blacklist_key(jti)] = True
+    for timeout, keys in by_timeout.items():
+        cache.set_many(keys, timeout=timeout)
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """
+    Refresh-токен, проверяющий blacklist сначала в кэше. В кэше хранятся только заблокированные
+    токены, поэтому промах (в том числе вытеснение ключа) проверяется в БД. Добавление в blacklist
+    и в список выданных токенов — по одному запросу INSERT ... ON CONFLICT
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if cache.get(_blacklist_key(jti)):
+            raise TokenError(_('Token is blacklisted'))
+        try:
+            super().check_blacklist()
+        except TokenError:
+            remember_blacklisted([(jti, self.payload['exp'])])
+            raise
+
+    def _outstanding_values_sql(self):
+        outstanding = OutstandingToken._meta
+        User = get_user_model()
+        user_column = User._meta.get_field(api_settings.USER_ID_FIELD).column
+        columns = ', '.join(
+            outstanding.get_field(name).column for name in ('jti', 'token', 'created_at', 'expires_at', 'user')
+        )
+        sql = f"""
+            INSERT INTO {outstanding.db_table} ({columns})
+            VALUES (
+                %(jti)s, %(token)s, %(now)s, %(expires_at)s,
+                (SELECT {User._meta.pk.column} FROM {User._meta.db_table} WHERE {user_column} = %(user_id)s)
+            )
+            ON CONFLICT ({outstanding.get_field('jti').column}) DO NOTHING
+        """
+        params = {
+            'jti': self.payload[api_settings.JTI_CLAIM],
+            'token': str(self),
+            'now': self.current_time,
+            'expires_at': datetime_from_epoch(self.payload['exp']),
+            'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+        }
+        return sql, params
+
+    def blacklist(self):
+        """
+        Добавление токена в blacklist. Возвращает False, если токен уже был заблокирован,
+        в том числе параллельным запросом
+        """
+        outstanding = OutstandingToken._meta
+        blacklisted = BlacklistedToken._meta
+        token_column = blacklisted.get_field('token').column
+        insert_sql, params = self._outstanding_values_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH outstanding AS ({insert_sql} RETURNING {outstanding.pk.column})
+                INSERT INTO {blacklisted.db_table} ({token_column}, {blacklisted.get_field('blacklisted_at').column})
+                SELECT {outstanding.pk.column}, %(now)s FROM outstanding
+                UNION ALL
+                SELECT {outstanding.pk.column}, %(now)s FROM {outstanding.db_table}
+                WHERE {outstanding.get_field('jti').column} = %(jti)s
+                ON CONFLICT ({token_column}) DO NOTHING
+                """,
+                params
+            )
+            created = cursor.rowcount > 0
+        remember_blacklisted([(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])])
+        return created
+
+    def outstand(self):
+        sql, params = self._outstanding_values_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
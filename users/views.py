@@ -11,15 +11,16 @@ from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import TokenError
-from django.db.models import Q, Avg
 
 from .serializers import (
     UserRegisterSerializer,
     UserDetailSerializer,
     UserListSerializer,
+    UserListQuerySerializer,
     UserUpdateSerializer
 )
-from .services import blacklist_tokens, blacklisted_refresh_token
+from .pagination import UserCursorPagination
+from .services import blacklist_tokens, blacklisted_refresh_token, filter_users
 
 User = get_user_model()
 
@@ -62,19 +63,18 @@ class UserDetailView(RetrieveAPIView):
     """
     permission_classes = (IsAuthenticated,)
     serializer_class = UserDetailSerializer
-    queryset = User.objects.select_related('team').annotate(
-        average_rank=Avg(
-            'assigned_tasks__task_evaluation__rank',
-            filter=Q(assigned_tasks__status='done')
-        )
-    ).only(
+    queryset = User.objects.select_related('team', 'stats').only(
         'email',
         'first_name',
         'last_name',
         'birthday',
         'role',
         'team',
-        'created_at'
+        'created_at',
+        'stats__tasks_done',
+        'stats__evaluation_count',
+        'stats__rank_sum',
+        'stats__overdue_count'
     )
 
     def get_object(self):
@@ -83,13 +83,22 @@ class UserDetailView(RetrieveAPIView):
 
 class UserListView(ListAPIView):
     """
-    Просмотр информации о пользователях. Строго для администратора
+    Просмотр информации о пользователях с поиском, фильтрами по роли и команде
+    и курсорной пагинацией. Строго для администратора
     """
     permission_classes = (IsAdminUser,)
     serializer_class = UserListSerializer
+    pagination_class = UserCursorPagination
     queryset = User.objects.select_related('team').only('id', 'email', 'first_name', 'last_name', 'birthday', 'role',
                                                         'team', 'created_at')
 
+    def filter_queryset(self, queryset):
+        serializer = UserListQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = dict(serializer.validated_data)
+        self.list_ordering = params.pop('ordering')
+        return filter_users(queryset, **params)
+
 
 class UserUpdateView(UpdateAPIView):
     """
@@ -100,7 +109,7 @@ class UserUpdateView(UpdateAPIView):
     queryset = User.objects.only('first_name', 'last_name', 'birthday')
 
     def get_object(self):
-        return self.request.user
+        return self.get_queryset().get(pk=self.request.user.pk)
 
 
 class UserDeleteView(APIView):